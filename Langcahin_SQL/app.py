@@ -1,18 +1,29 @@
 import streamlit as st
 from pathlib import Path
-from langchain.agents import create_sql_agent
-from langchain.sql_database import SQLDatabase
-from langchain.agents.agent_types import AgentType
 from langchain.callbacks import StreamlitCallbackHandler
-from langchain.agents.agent_toolkits import SQLDatabaseToolkit
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 import os
+import sys
+## shared helpers (instrumentation, ...) live in the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import StageCallbackHandler
+from embedding_cache import CachedEmbeddings
+from sql_agent import build_sql_agent
+from schema_cache import get_database
+from table_selector import TableSelector
+from sql_plan_cache import SQLFastPath, SQLPlanCache, QueryRecorder, answer_markdown
+from result_guard import fetch_page, result_bytes_budget
+from contextlib import nullcontext
 
 
 st.set_page_config(page_title="SQL Agent with Groq", page_icon="🦜", layout="wide")
 st.title("🦜SQL Agent with Groq")
 
+## the agent's model and its context window; query results handed to it are capped to fit
+MODEL = "Llama3-8b-8192"
+RESULT_MAX_BYTES = result_bytes_budget(8192)
+
 LOCALDB="USE_LOCAL_DB"
 MYSQL = "USE_MYSQL"
 
@@ -32,43 +43,71 @@ else:
 
 api_key= st.sidebar.text_input(label="Enter your Groq API Key", type="password")
 
+## give the agent only the most relevant tables, with their DDL already attached
+use_table_selection = st.sidebar.checkbox("Pre-select relevant tables", value=False)
+top_k_tables = st.sidebar.number_input("Tables to pre-select", min_value=1, max_value=50, value=5)
+## answer from cached SQL plans or one generated query, the agent only runs as a fallback (needs local embeddings)
+use_fast_path = st.sidebar.checkbox("SQL plan cache and single-shot fast path", value=False)
+
 if not db_uri:
     st.error("Please select a database option.")
 if not api_key:
     st.error("Please provide your Groq API Key.")
     st.stop()
     
-##LLM model 
-llm = ChatGroq(groq_api_key=api_key, model="Llama3-8b-8192", streaming=True)
-
 def configure_db(db_uri, mysql_host=None, mysql_user=None, mysql_password=None, mysql_db=None):
+    """Connection string for the selected option."""
     if db_uri == LOCALDB:
         # Connect to SQLite database
         dbfile_path = (Path(__file__).parent / "students.db").absolute()   
-        print(f"Database path: {dbfile_path}")
         # Use a direct connection string instead of lambda
-        return SQLDatabase.from_uri(f"sqlite:///{dbfile_path}")
+        return f"sqlite:///{dbfile_path}"
     elif db_uri == MYSQL:
         if not mysql_host or not mysql_user or not mysql_password or not mysql_db:
             st.error("Please provide all MySQL connection details.")
             st.stop()
-        return SQLDatabase.from_uri(f"mysql+mysqlconnector://{mysql_user}:{mysql_password}@{mysql_host}/{mysql_db}")
+        return f"mysql+mysqlconnector://{mysql_user}:{mysql_password}@{mysql_host}/{mysql_db}"
+
+@st.cache_resource
+def get_llm(api_key):
+    ##LLM model 
+    return ChatGroq(groq_api_key=api_key, model=MODEL, streaming=True)
+
+@st.cache_resource
+def get_agent(api_key, connection_uri):
+    """LLM, toolkit and agent are built once per API key and database, not on every rerun."""
+    return build_sql_agent(get_llm(api_key), get_database(connection_uri, max_bytes=RESULT_MAX_BYTES))
+
+@st.cache_resource
+def get_embeddings():
+    """Local sentence embeddings, cached on disk next to the other apps' vectors."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
+        path=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embedding_cache.sqlite"),
+    )
+
+@st.cache_resource
+def get_table_selector(connection_uri):
+    """Local embedding index over table and column names, built once per database."""
+    return TableSelector(get_database(connection_uri, max_bytes=RESULT_MAX_BYTES), get_embeddings())
+
+@st.cache_resource
+def get_fast_path(api_key, connection_uri):
+    """Plan cache shared by every session; plans are scoped to the database and its schema fingerprint."""
+    cache = SQLPlanCache(path=str(Path(__file__).parent / "sql_plans.sqlite"), embeddings=get_embeddings())
+    return SQLFastPath(get_llm(api_key), get_database(connection_uri, max_bytes=RESULT_MAX_BYTES), cache, max_bytes=RESULT_MAX_BYTES)
     
 if db_uri == MYSQL:
-    db = configure_db(db_uri, mysql_host=mysql_host, mysql_user=mysql_user, mysql_password=mysql_password, mysql_db=mysql_db)
+    connection_uri = configure_db(db_uri, mysql_host=mysql_host, mysql_user=mysql_user, mysql_password=mysql_password, mysql_db=mysql_db)
 else:
-    db = configure_db(db_uri)
+    connection_uri = configure_db(db_uri)
 
-## Create SQL toolkit and agent
-toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+## pooled engine and schema cache shared by every session using this database
+db = get_database(connection_uri, max_bytes=RESULT_MAX_BYTES)
 
-agent = create_sql_agent(
-    llm=llm,
-    toolkit=toolkit,
-    agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True
-)
+## Create SQL toolkit and agent
+agent = get_agent(api_key, connection_uri)
 
 ## Streamlit UI
 st.subheader("Ask questions about your database")
@@ -94,8 +133,34 @@ if prompt := st.chat_input("What would you like to know about the database?"):
     with st.chat_message("assistant"):
         st_callback = StreamlitCallbackHandler(st.container())
         try:
-            response = agent.run(prompt, callbacks=[st_callback])
+            handler = StageCallbackHandler(app="sql_agent")
+            fast_path = get_fast_path(api_key, connection_uri) if use_fast_path else None
+            answer = None
+            if use_fast_path:
+                with handler.stage("plan_cache"):
+                    answer = fast_path.from_cache(prompt)
+            if answer is None:
+                agent_input, tables = prompt, None
+                if use_table_selection:
+                    with handler.stage("table_selection"):
+                        tables, agent_input = get_table_selector(connection_uri).prepare(prompt, k=top_k_tables)
+                    st.caption(f"Tables given to the agent: {', '.join(tables)}")
+                with db.scope_tables(tables) if tables else nullcontext():
+                    if use_fast_path:
+                        answer = fast_path.single_shot(prompt, callbacks=[handler])
+                    if answer is None:
+                        recorder = QueryRecorder()
+                        response = agent.run(agent_input, callbacks=[st_callback, handler, recorder])
+                        ## cache the agent's query (if it clearly answered with one) so the next identical question skips the agent
+                        if use_fast_path:
+                            fast_path.remember(prompt, recorder.final_sql)
+                        st.session_state.last_sql = recorder.last_sql
+            if answer is not None:
+                response = answer_markdown(answer)
+                st.session_state.last_sql = answer.sql
             st.markdown(response)
+            with st.expander("Stage timings"):
+                st.table(handler.rows())
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": response})
         except Exception as e:
@@ -103,6 +168,20 @@ if prompt := st.chat_input("What would you like to know about the database?"):
             st.error(error_message)
             st.session_state.messages.append({"role": "assistant", "content": error_message})
 
+## the LLM only ever sees a capped or summarized result, the full one is fetched page by page here
+if st.session_state.get("last_sql"):
+    with st.expander("Browse the full result of the last query"):
+        st.code(st.session_state.last_sql, language="sql")
+        page_size = 50
+        page = st.number_input("Page", min_value=1, value=1, step=1)
+        try:
+            columns, rows = fetch_page(db._engine, st.session_state.last_sql, page - 1, page_size)
+            st.dataframe([dict(zip(columns, row)) for row in rows])
+            if len(rows) < page_size:
+                st.caption("Last page.")
+        except Exception as e:
+            st.error(f"Error fetching page: {str(e)}")
+
 # Add some helpful information
 with st.sidebar:
     st.markdown("---")
@@ -115,6 +194,9 @@ with st.sidebar:
     - How many students are there per grade?
     """)
     
+    if use_fast_path:
+        st.caption(f"Plan cache: {get_fast_path(api_key, connection_uri).cache.metrics()}")
+
     if st.button("Show Database Schema"):
         try:
             schema_info = db.get_table_info()
@@ -1,100 +1,213 @@
 """
 Array Operations: Combine two arrays and remove zeros from the first array
+
+The five methods below work on small Python lists. For large numeric data use
+`combine_arrays_remove_zeros_np` (NumPy arrays or any array-like, one masked
+pass into a preallocated output) or `combine_arrays_remove_zeros_chunked`
+(np.memmap inputs larger than RAM, processed chunk by chunk into an on-disk
+output). benchmarks/bench_array_operations.py compares all of them.
 """
+import os
 
-# Example arrays
-array1 = [1, 0, 3, 0, 5, 0, 7, 0, 9, 0]  # Array with zeros
-array2 = [2, 4, 6, 8, 10]  # Array with numbers
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-print("Original Arrays:")
-print(f"Array 1 (with zeros): {array1}")
-print(f"Array 2 (numbers): {array2}")
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
 
-# Method 1: Remove zeros from array1, then combine
-print("\n" + "="*50)
-print("METHOD 1: Remove zeros first, then combine")
-print("="*50)
 
-# Remove zeros from array1
-array1_no_zeros = [x for x in array1 if x != 0]
-print(f"Array 1 without zeros: {array1_no_zeros}")
+# Method 1: Remove zeros from array1, then combine
+def remove_zeros_then_combine(arr1, arr2):
+    arr1_no_zeros = [x for x in arr1 if x != 0]
+    return arr1_no_zeros + arr2
 
-# Combine arrays
-combined_method1 = array1_no_zeros + array2
-print(f"Combined result: {combined_method1}")
 
 # Method 2: Using filter() to remove zeros
-print("\n" + "="*50)
-print("METHOD 2: Using filter() function")
-print("="*50)
+def combine_with_filter(arr1, arr2):
+    return list(filter(lambda x: x != 0, arr1)) + arr2
 
-array1_filtered = list(filter(lambda x: x != 0, array1))
-combined_method2 = array1_filtered + array2
-print(f"Array 1 filtered: {array1_filtered}")
-print(f"Combined result: {combined_method2}")
 
 # Method 3: Using numpy arrays (if you prefer numpy)
-print("\n" + "="*50)
-print("METHOD 3: Using NumPy arrays")
-print("="*50)
+def combine_with_numpy(arr1, arr2):
+    np_array1 = np.array(arr1)
+    np_array2 = np.array(arr2)
+    return np.concatenate([np_array1[np_array1 != 0], np_array2])
 
-try:
-    import numpy as np
-    
-    # Convert to numpy arrays
-    np_array1 = np.array(array1)
-    np_array2 = np.array(array2)
-    
-    # Remove zeros from array1
-    np_array1_no_zeros = np_array1[np_array1 != 0]
-    print(f"Array 1 without zeros (numpy): {np_array1_no_zeros}")
-    
-    # Combine arrays
-    combined_numpy = np.concatenate([np_array1_no_zeros, np_array2])
-    print(f"Combined result (numpy): {combined_numpy}")
-    
-except ImportError:
-    print("NumPy not installed. Skipping numpy method.")
 
 # Method 4: One-liner approach
-print("\n" + "="*50)
-print("METHOD 4: One-liner approach")
-print("="*50)
+def combine_oneliner(arr1, arr2):
+    return [x for x in arr1 if x != 0] + arr2
 
-combined_oneliner = [x for x in array1 if x != 0] + array2
-print(f"Combined result (one-liner): {combined_oneliner}")
 
 # Method 5: If you want to sort the final result
-print("\n" + "="*50)
-print("METHOD 5: Combined and sorted")
-print("="*50)
+def combine_and_sort(arr1, arr2):
+    return sorted([x for x in arr1 if x != 0] + arr2)
 
-combined_sorted = sorted([x for x in array1 if x != 0] + array2)
-print(f"Combined and sorted result: {combined_sorted}")
 
 # Function to make it reusable
 def combine_arrays_remove_zeros(arr1, arr2):
     """
     Combine two arrays and remove all zeros from the first array
-    
+
     Args:
         arr1: First array (zeros will be removed from this)
         arr2: Second array (will be added as-is)
-    
+
     Returns:
-        Combined array with zeros removed from arr1
+        Combined array with zeros removed from arr1 (a NumPy array if either input is one)
     """
-    return [x for x in arr1 if x != 0] + arr2
+    if np is not None and (isinstance(arr1, np.ndarray) or isinstance(arr2, np.ndarray)):
+        return combine_arrays_remove_zeros_np(arr1, arr2)
+    return [x for x in arr1 if x != 0] + list(arr2)
 
-# Test the function
-print("\n" + "="*50)
-print("REUSABLE FUNCTION TEST")
-print("="*50)
 
-test_array1 = [10, 0, 20, 0, 30, 0]
-test_array2 = [40, 50, 60]
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for the vectorized array operations: pip install numpy")
 
-result = combine_arrays_remove_zeros(test_array1, test_array2)
-print(f"Test Array 1: {test_array1}")
-print(f"Test Array 2: {test_array2}")
-print(f"Function Result: {result}")
+
+def combine_arrays_remove_zeros_np(arr1, arr2, out=None):
+    """
+    Vectorized combine: the non-zero values of arr1 followed by arr2, as one flat NumPy array.
+
+    Args:
+        arr1: array-like, zeros are removed
+        arr2: array-like, added as-is
+        out: optional preallocated 1-D array of exactly the result size
+
+    Returns:
+        The result array (`out` if given). The output is allocated once and
+        both parts are written straight into it, with no intermediate lists or
+        concatenation copies.
+    """
+    _require_numpy()
+    a = np.asarray(arr1).ravel()
+    b = np.asarray(arr2).ravel()
+    mask = a != 0
+    kept = int(np.count_nonzero(mask))
+    size = kept + b.size
+    if out is None:
+        out = np.empty(size, dtype=np.result_type(a, b))
+    elif out.shape != (size,):
+        raise ValueError(f"out must have shape ({size},), got {out.shape}")
+    if out.dtype == a.dtype:
+        np.compress(mask, a, out=out[:kept])
+    else:
+        out[:kept] = a[mask]
+    out[kept:] = b
+    return out
+
+
+def combine_arrays_remove_zeros_chunked(arr1, arr2, out_path, chunk_size=DEFAULT_CHUNK_SIZE, dtype=None):
+    """
+    Out-of-core combine for inputs larger than RAM, e.g. np.memmap arrays.
+
+    Both inputs are read `chunk_size` elements at a time and the result is
+    written to a raw memmap file at `out_path` in a single pass, so memory use
+    stays around one chunk regardless of the input size. The file is sized for
+    the worst case (no zeros) up front and truncated to the real length at the
+    end.
+
+    Returns:
+        A read-only np.memmap over `out_path` with the result.
+    """
+    _require_numpy()
+    a = arr1 if isinstance(arr1, np.ndarray) else np.asarray(arr1)
+    b = arr2 if isinstance(arr2, np.ndarray) else np.asarray(arr2)
+    a = a.reshape(-1)
+    b = b.reshape(-1)
+    dtype = np.dtype(dtype or np.result_type(a, b))
+
+    capacity = a.size + b.size
+    if capacity == 0:
+        open(out_path, "wb").close()
+        return np.empty(0, dtype=dtype)
+    out = np.memmap(out_path, dtype=dtype, mode="w+", shape=(capacity,))
+    position = 0
+    for start in range(0, a.size, chunk_size):
+        chunk = np.asarray(a[start:start + chunk_size])
+        kept = chunk[chunk != 0]
+        out[position:position + kept.size] = kept
+        position += kept.size
+    for start in range(0, b.size, chunk_size):
+        chunk = np.asarray(b[start:start + chunk_size])
+        out[position:position + chunk.size] = chunk
+        position += chunk.size
+    out.flush()
+    del out
+
+    os.truncate(out_path, position * dtype.itemsize)
+    if position == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(out_path, dtype=dtype, mode="r", shape=(position,))
+
+
+def open_memmap_array(path, dtype, mode="r"):
+    """Open a raw binary file of `dtype` values as a 1-D np.memmap, e.g. a sensor dump."""
+    _require_numpy()
+    return np.memmap(path, dtype=dtype, mode=mode)
+
+
+if __name__ == "__main__":
+    # Example arrays
+    array1 = [1, 0, 3, 0, 5, 0, 7, 0, 9, 0]  # Array with zeros
+    array2 = [2, 4, 6, 8, 10]  # Array with numbers
+
+    print("Original Arrays:")
+    print(f"Array 1 (with zeros): {array1}")
+    print(f"Array 2 (numbers): {array2}")
+
+    print("\n" + "="*50)
+    print("METHOD 1: Remove zeros first, then combine")
+    print("="*50)
+
+    array1_no_zeros = [x for x in array1 if x != 0]
+    print(f"Array 1 without zeros: {array1_no_zeros}")
+    print(f"Combined result: {remove_zeros_then_combine(array1, array2)}")
+
+    print("\n" + "="*50)
+    print("METHOD 2: Using filter() function")
+    print("="*50)
+
+    print(f"Array 1 filtered: {list(filter(lambda x: x != 0, array1))}")
+    print(f"Combined result: {combine_with_filter(array1, array2)}")
+
+    print("\n" + "="*50)
+    print("METHOD 3: Using NumPy arrays")
+    print("="*50)
+
+    if np is not None:
+        np_array1 = np.array(array1)
+        print(f"Array 1 without zeros (numpy): {np_array1[np_array1 != 0]}")
+        print(f"Combined result (numpy): {combine_with_numpy(array1, array2)}")
+    else:
+        print("NumPy not installed. Skipping numpy method.")
+
+    print("\n" + "="*50)
+    print("METHOD 4: One-liner approach")
+    print("="*50)
+
+    print(f"Combined result (one-liner): {combine_oneliner(array1, array2)}")
+
+    print("\n" + "="*50)
+    print("METHOD 5: Combined and sorted")
+    print("="*50)
+
+    print(f"Combined and sorted result: {combine_and_sort(array1, array2)}")
+
+    # Test the function
+    print("\n" + "="*50)
+    print("REUSABLE FUNCTION TEST")
+    print("="*50)
+
+    test_array1 = [10, 0, 20, 0, 30, 0]
+    test_array2 = [40, 50, 60]
+
+    result = combine_arrays_remove_zeros(test_array1, test_array2)
+    print(f"Test Array 1: {test_array1}")
+    print(f"Test Array 2: {test_array2}")
+    print(f"Function Result: {result}")
+
+    if np is not None:
+        print(f"Vectorized Result: {combine_arrays_remove_zeros_np(np.array(test_array1), test_array2)}")
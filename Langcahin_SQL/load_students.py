@@ -0,0 +1,257 @@
+"""
+Bulk loader for scale fixtures of the students database.
+
+Generates reproducible synthetic students (or imports them from a CSV file)
+into a SQLite database fast enough for tens of millions of rows:
+batched `executemany` inside large transactions, WAL journal, relaxed
+synchronous mode and a big page cache on the loading connection, and indexes
+built only after the data is in. Rows per second are reported for the load
+and for the index build.
+
+The default target is students_bulk.db (gitignored), never the app's tracked
+students.db fixture. An existing table is only dropped with --replace.
+Generated rows appended with --append use the seed offset by the table's
+current row count, so they never repeat the rows already there.
+
+Two layouts match the two existing scripts:
+    app      STUDENTS(NAME, CLASS, SECTION, MARKS)       like sqlite.py, used by app.py
+    profile  students(id, name, age, grade, email)       like create_db.py
+
+Usage:
+    python load_students.py --rows 10000000 --db students_10m.db
+    python load_students.py --layout profile --rows 1000000 --db profiles.db
+    python load_students.py --csv students.csv --db students_csv.db --append
+    python load_students.py --rows 100000 --db students_bulk.db --replace
+    python load_students.py --db students_10m.db --explain-only
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+import sqlite3
+import time
+
+LAYOUTS = {
+    "app": {
+        "table": "STUDENTS",
+        "columns": ["NAME", "CLASS", "SECTION", "MARKS"],
+        "ddl": "CREATE TABLE IF NOT EXISTS STUDENTS(NAME VARCHAR(25),CLASS VARCHAR(25),SECTION VARCHAR(25),MARKS INT)",
+        "indexes": {
+            "idx_students_class_section": "CLASS, SECTION",
+            "idx_students_marks": "MARKS",
+        },
+        "check_queries": [
+            "SELECT CLASS, COUNT(*) FROM STUDENTS GROUP BY CLASS",
+            "SELECT COUNT(*) FROM STUDENTS WHERE CLASS = 'Data Science' AND SECTION = 'B'",
+            "SELECT NAME, MARKS FROM STUDENTS WHERE MARKS > 95 LIMIT 10",
+        ],
+    },
+    "profile": {
+        "table": "students",
+        "columns": ["id", "name", "age", "grade", "email"],
+        "ddl": (
+            "CREATE TABLE IF NOT EXISTS students ("
+            " id INTEGER PRIMARY KEY, name TEXT NOT NULL, age INTEGER, grade TEXT, email TEXT)"
+        ),
+        "indexes": {
+            "idx_students_grade": "grade",
+            "idx_students_age": "age",
+        },
+        "check_queries": [
+            "SELECT grade, COUNT(*) FROM students GROUP BY grade",
+            "SELECT COUNT(*) FROM students WHERE age BETWEEN 20 AND 22",
+            "SELECT AVG(age) FROM students WHERE grade = 'A'",
+        ],
+    },
+}
+
+FIRST_NAMES = [
+    "Sai", "Kiran", "Nag", "Ajay", "Mani", "Shiva", "Alice", "Bob", "Charlie", "Diana", "Eve", "Priya",
+    "Rahul", "Anita", "Vikram", "Meera", "Arjun", "Sara", "Omar", "Lena", "Ravi", "Maya", "Noah", "Zara",
+]
+LAST_NAMES = [
+    "Johnson", "Smith", "Brown", "Prince", "Wilson", "Reddy", "Sharma", "Patel", "Khan", "Garcia",
+    "Nguyen", "Kumar", "Singh", "Lee", "Martin", "Rao",
+]
+CLASSES = ["AI", "Data Science", "Devops", "Data Analytics", "App Development", "Cloud", "Cyber Security", "ML Ops"]
+SECTIONS = ["A", "B", "C", "D"]
+GRADES = ["A", "B", "C", "D", "E", "F"]
+
+## relaxed durability while loading; a crash mid-load just means re-running the loader.
+## synchronous, temp_store, cache_size and mmap_size only last as long as this connection
+LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA mmap_size=1073741824",
+]
+
+
+def generate_rows(layout, count, seed=42, start_id=1):
+    """Deterministic synthetic rows for `layout`; the same seed always gives the same data."""
+    rng = random.Random(seed)
+    choice, randint = rng.choice, rng.randint
+    for i in range(start_id, start_id + count):
+        name = f"{choice(FIRST_NAMES)} {choice(LAST_NAMES)}"
+        if layout == "app":
+            yield (name, choice(CLASSES), choice(SECTIONS), randint(30, 100))
+        else:
+            yield (i, name, randint(17, 30), choice(GRADES), f"{name.lower().replace(' ', '.')}{i}@example.com")
+
+
+def read_csv_rows(path, columns):
+    """Rows of a CSV file with a header, in `columns` order (header names are matched case-insensitively)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        missing = [column for column in columns if column.lower() not in header]
+        if missing:
+            raise SystemExit(f"{path} is missing columns: {', '.join(missing)}")
+        positions = [header.index(column.lower()) for column in columns]
+        for record in reader:
+            if record:
+                yield tuple(record[p] or None for p in positions)
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def table_exists(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE", (table,)
+        ).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def load(db_path, rows, layout="app", batch_size=50_000, rows_per_transaction=1_000_000, replace=False, log=print):
+    """Bulk insert `rows` and build the layout's indexes afterwards; returns timing stats.
+
+    With `replace` an existing table is dropped first, otherwise rows are added to it.
+    """
+    spec = LAYOUTS[layout]
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in LOAD_PRAGMAS:
+            conn.execute(pragma)
+        if replace:
+            conn.execute(f"DROP TABLE IF EXISTS {spec['table']}")
+        conn.execute(spec["ddl"])
+        ## inserting into indexed tables is much slower, so indexes go away during the load
+        for index in spec["indexes"]:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+        insert = (
+            f"INSERT INTO {spec['table']} ({', '.join(spec['columns'])}) "
+            f"VALUES ({', '.join('?' * len(spec['columns']))})"
+        )
+        loaded = 0
+        in_transaction = 0
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        for batch in batched(rows, batch_size):
+            conn.executemany(insert, batch)
+            loaded += len(batch)
+            in_transaction += len(batch)
+            if in_transaction >= rows_per_transaction:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN")
+                in_transaction = 0
+                elapsed = time.perf_counter() - start
+                log(f"  {loaded:,} rows  {loaded / elapsed:,.0f} rows/s")
+        conn.execute("COMMIT")
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for index, columns in spec["indexes"].items():
+            conn.execute(f"CREATE INDEX {index} ON {spec['table']}({columns})")
+        conn.execute("ANALYZE")
+        index_seconds = time.perf_counter() - start
+
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return {
+        "rows": loaded,
+        "load_seconds": load_seconds,
+        "rows_per_second": loaded / load_seconds if load_seconds else 0.0,
+        "index_seconds": index_seconds,
+    }
+
+
+def explain(db_path, queries):
+    """EXPLAIN QUERY PLAN of each query, to check that it uses the indexes instead of a full scan."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {query: [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")] for query in queries}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="students_bulk.db", help="SQLite file to load into")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="app")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="synthetic rows to generate")
+    parser.add_argument("--csv", default=None, help="import rows from this CSV file instead of generating them")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per executemany call")
+    parser.add_argument("--rows-per-transaction", type=int, default=1_000_000)
+    existing = parser.add_mutually_exclusive_group()
+    existing.add_argument("--append", action="store_true", help="keep the existing table and its rows")
+    existing.add_argument("--replace", action="store_true", help="drop the existing table before loading")
+    parser.add_argument("--explain", nargs="*", default=None, metavar="SQL",
+                        help="queries to EXPLAIN after loading (default: the layout's sample queries)")
+    parser.add_argument("--explain-only", action="store_true", help="skip loading, only print the query plans")
+    args = parser.parse_args()
+
+    spec = LAYOUTS[args.layout]
+    if not args.explain_only:
+        if not (args.append or args.replace) and os.path.exists(args.db) and table_exists(args.db, spec["table"]):
+            parser.error(f"{args.db} already has a {spec['table']} table; pass --replace to drop it or --append")
+        if args.csv:
+            rows = read_csv_rows(args.csv, spec["columns"])
+            print(f"Importing {args.csv} into {args.db} ({spec['table']})")
+        else:
+            start_id, seed = 1, args.seed
+            if args.append and os.path.exists(args.db) and table_exists(args.db, spec["table"]):
+                conn = sqlite3.connect(args.db)
+                try:
+                    (existing,) = conn.execute(f"SELECT COUNT(*) FROM {spec['table']}").fetchone()
+                    if args.layout == "profile":
+                        ## keep the generated primary keys unique when appending
+                        start_id = (conn.execute("SELECT MAX(id) FROM students").fetchone()[0] or 0) + 1
+                finally:
+                    conn.close()
+                ## the same seed would append exact copies of the rows already loaded
+                seed += existing
+            rows = generate_rows(args.layout, args.rows, seed=seed, start_id=start_id)
+            print(f"Generating {args.rows:,} rows into {args.db} ({spec['table']}, seed {seed})")
+        stats = load(
+            args.db, rows, layout=args.layout, batch_size=args.batch_size,
+            rows_per_transaction=args.rows_per_transaction, replace=args.replace,
+        )
+        print(
+            f"Loaded {stats['rows']:,} rows in {stats['load_seconds']:.1f}s "
+            f"({stats['rows_per_second']:,.0f} rows/s), indexes and ANALYZE in {stats['index_seconds']:.1f}s"
+        )
+
+    queries = args.explain if args.explain else spec["check_queries"]
+    for query, plan in explain(args.db, queries).items():
+        print(f"\n{query}")
+        for step in plan:
+            print(f"  {step}")
+
+
+if __name__ == "__main__":
+    main()
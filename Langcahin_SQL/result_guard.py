@@ -0,0 +1,236 @@
+"""
+Result-size guardrails for queries run by the SQL agent and the fast path.
+
+A "show me all rows" question on a multi-million-row table must not be
+materialized into one Python string and pasted into the LLM context. Queries
+go through `guarded_query`, which
+
+- injects a LIMIT (or clamps an existing one) so the database stops early,
+- streams the rows with a server-side cursor where the driver supports it,
+  stopping at a row cap and a byte cap sized from the model's context,
+- and returns a `QueryResult` that knows whether it was truncated.
+
+Truncated results are handed to the LLM as `summarize_result` text (row count,
+column stats, first rows); the full result can be browsed page by page with
+`fetch_page`. Counting and paging stay within the statement's own LIMIT/OFFSET
+and only ever run read-only statements.
+"""
+import re
+from collections import namedtuple
+
+from sqlalchemy import text
+
+## a result may take about a quarter of the model context, at ~4 bytes of row text per token
+RESULT_CONTEXT_SHARE = 0.25
+BYTES_PER_TOKEN = 4
+## Llama3-8b-8192, the model the SQL app runs
+DEFAULT_CONTEXT_TOKENS = 8192
+
+
+def result_bytes_budget(context_tokens, share=RESULT_CONTEXT_SHARE):
+    """Byte cap for a query result that keeps it within `share` of a `context_tokens` context."""
+    return int(context_tokens * share * BYTES_PER_TOKEN)
+
+
+DEFAULT_MAX_ROWS = 200
+DEFAULT_MAX_BYTES = result_bytes_budget(DEFAULT_CONTEXT_TOKENS)
+## truncated results are counted up to this many rows, never with an unbounded COUNT(*)
+DEFAULT_COUNT_LIMIT = 10_000
+## longest value shown in a summary preview, like SQLDatabase's max_string_length
+PREVIEW_VALUE_LENGTH = 100
+
+_SELECT = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_WRITES = re.compile(
+    r"\b(insert|update|delete|replace|merge|drop|alter|create|truncate|attach|detach|pragma|grant|vacuum)\b",
+    re.IGNORECASE,
+)
+## LIMIT n, LIMIT n OFFSET m, or MySQL's LIMIT m, n; group "count" is the row count
+_TRAILING_LIMIT = re.compile(
+    r"\s+limit\s+(?:(?P<skip>\d+)\s*,\s*)?(?P<count>\d+)(?:\s+offset\s+(?P<offset>\d+))?\s*$", re.IGNORECASE
+)
+
+QueryResult = namedtuple("QueryResult", ["columns", "rows", "truncated", "size_bytes"])
+
+
+def is_select(sql):
+    return bool(_SELECT.match(sql))
+
+
+def is_read_only(sql):
+    """Single SELECT/WITH statement without any write or DDL keyword."""
+    return is_select(sql) and ";" not in sql.strip().rstrip(";") and not _WRITES.search(sql)
+
+
+def inject_limit(sql, limit):
+    """`sql` with at most `limit` rows: an existing trailing LIMIT is clamped, otherwise one is appended."""
+    sql = sql.strip().rstrip(";").strip()
+    match = _TRAILING_LIMIT.search(sql)
+    if match is None:
+        return f"{sql} LIMIT {limit}"
+    if int(match.group("count")) <= limit:
+        return sql
+    return f"{sql[:match.start('count')]}{limit}{sql[match.end('count'):]}"
+
+
+def split_limit(sql):
+    """(`sql` without a trailing LIMIT/OFFSET, its row count or None, its offset)."""
+    sql = sql.strip().rstrip(";").strip()
+    match = _TRAILING_LIMIT.search(sql)
+    if match is None:
+        return sql, None, 0
+    offset = match.group("skip") or match.group("offset") or 0
+    return sql[:match.start()], int(match.group("count")), int(offset)
+
+
+def strip_limit(sql):
+    """`sql` without a trailing LIMIT/OFFSET."""
+    return split_limit(sql)[0]
+
+
+def with_window(sql, limit, offset=0):
+    """
+    Rows `offset` .. `offset + limit` of `sql`, kept inside the statement's own LIMIT/OFFSET.
+
+    The window is applied to the statement itself rather than to a derived
+    table, which fails on MySQL for joins returning duplicate column names.
+    """
+    base, own_limit, own_offset = split_limit(sql)
+    if own_limit is not None:
+        limit = max(0, min(limit, own_limit - offset))
+    offset += own_offset
+    return f"{base} LIMIT {int(limit)} OFFSET {int(offset)}" if offset else f"{base} LIMIT {int(limit)}"
+
+
+def _require_read_only(sql):
+    if not is_read_only(sql):
+        raise ValueError("Only a single read-only SELECT statement can be counted or paged.")
+
+
+def truncate_value(value, length=PREVIEW_VALUE_LENGTH):
+    """`value`, with strings and bytes cut to `length` characters."""
+    if isinstance(value, (str, bytes)) and len(value) > length:
+        return value[:length] + ("..." if isinstance(value, str) else b"...")
+    return value
+
+
+def guarded_query(engine, sql, max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES, parameters=None, batch_size=500):
+    """
+    Run a SELECT and keep at most `max_rows` rows and about `max_bytes` of row text.
+
+    One extra row is requested so a result of exactly `max_rows` rows isn't
+    reported as truncated. A first row that is larger than `max_bytes` on its
+    own has its values shortened, and the result is reported as truncated.
+    """
+    rows = []
+    size = 0
+    truncated = False
+    with engine.connect() as conn:
+        ## pysqlite always reads lazily; for MySQL this asks for an unbuffered cursor
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            text(inject_limit(sql, max_rows + 1)), parameters or {}
+        )
+        columns = list(result.keys())
+        while not truncated:
+            batch = result.fetchmany(min(batch_size, max_rows + 1))
+            if not batch:
+                break
+            for row in batch:
+                row = tuple(row)
+                row_size = len(repr(row))
+                if len(rows) >= max_rows or (rows and size + row_size > max_bytes):
+                    truncated = True
+                    break
+                if row_size > max_bytes:
+                    row = tuple(truncate_value(value, max(max_bytes // max(len(row), 1) - 8, 1)) for value in row)
+                    row_size = len(repr(row))
+                    truncated = True
+                rows.append(row)
+                size += row_size
+                if truncated:
+                    break
+        result.close()
+    return QueryResult(columns, rows, truncated, size)
+
+
+def count_rows(engine, sql, parameters=None, limit=DEFAULT_COUNT_LIMIT, batch_size=1000):
+    """
+    Rows `sql` returns (within its own LIMIT), counted up to `limit + 1`.
+
+    A result of `limit + 1` means "more than `limit`". The rows are streamed
+    and discarded, so the cost is bounded by `limit` rather than the table size.
+    """
+    _require_read_only(sql)
+    count = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            text(with_window(sql, limit + 1)), parameters or {}
+        )
+        while True:
+            batch = result.fetchmany(batch_size)
+            if not batch:
+                break
+            count += len(batch)
+        result.close()
+    return count
+
+
+def fetch_page(engine, sql, page, page_size=50, parameters=None):
+    """Rows of page `page` (0-based) of the result of `sql`, fetched on demand."""
+    _require_read_only(sql)
+    paged = with_window(sql, int(page_size), int(page) * int(page_size))
+    with engine.connect() as conn:
+        result = conn.execute(text(paged), parameters or {})
+        return list(result.keys()), [tuple(row) for row in result.fetchall()]
+
+
+def column_stats(columns, rows):
+    """Per-column summary of `rows`: nulls, and min/max/mean for numbers or distinct/sample values otherwise."""
+    stats = []
+    for i, name in enumerate(columns):
+        values = [row[i] for row in rows if row[i] is not None]
+        nulls = len(rows) - len(values)
+        numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        if values and len(numbers) == len(values):
+            stats.append(
+                f"- {name}: numeric, min {min(numbers)}, max {max(numbers)}, "
+                f"mean {sum(numbers) / len(numbers):.4g}, nulls {nulls}"
+            )
+        else:
+            distinct = list(dict.fromkeys(str(v) for v in values))
+            sample = ", ".join(repr(v[:40]) for v in distinct[:5])
+            stats.append(f"- {name}: {len(distinct)} distinct, nulls {nulls}, e.g. {sample}")
+    return stats
+
+
+def summarize_result(result, total_rows=None, preview_rows=10, count_limit=DEFAULT_COUNT_LIMIT,
+                     max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Compact text for the LLM in place of a truncated result; `total_rows` comes from `count_rows`.
+
+    Preview values are cut to PREVIEW_VALUE_LENGTH characters and the preview
+    stops at half of `max_bytes`.
+    """
+    if total_rows is None:
+        total = f"more than {len(result.rows)} rows"
+    elif count_limit is not None and total_rows > count_limit:
+        total = f"more than {count_limit} rows"
+    else:
+        total = f"{total_rows} rows in total"
+    preview, size = [], 0
+    for row in result.rows[:preview_rows]:
+        row = tuple(truncate_value(value) for value in row)
+        size += len(repr(row))
+        if preview and size > max_bytes // 2:
+            break
+        preview.append(row)
+    lines = [
+        f"The result is too large to return in full ({total}). "
+        f"Summary of the first {len(result.rows)} rows:",
+        f"Columns: {', '.join(result.columns)}",
+        "Column stats:",
+        *column_stats(result.columns, result.rows),
+        f"First {len(preview)} rows:",
+        str(preview),
+        "Use aggregation (COUNT, GROUP BY, AVG, ...) or a smaller LIMIT if you need exact values.",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,171 @@
+"""
+Long-lived pooled databases with a schema cache for the SQL agent.
+
+`get_database(uri)` returns one `CachedSQLDatabase` per connection URI for the
+whole process, so Streamlit reruns reuse the same pooled SQLAlchemy engine.
+`CachedSQLDatabase.get_table_info` (used by the `sql_db_schema` tool) caches
+the DDL and sample rows per set of tables and only rebuilds them when the
+schema actually changed, detected cheaply through SQLite's `schema_version`
+or MySQL's information_schema timestamps.
+
+`CachedSQLDatabase.scope_tables(names)` narrows the tables the agent sees
+(e.g. to the ones picked by table_selector.py) for the duration of a run.
+
+`CachedSQLDatabase.run` (used by the `sql_db_query` tool) streams SELECT
+results through result_guard.py, so large results reach the LLM as a summary.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from langchain_community.utilities import SQLDatabase
+from langchain_community.utilities.sql_database import truncate_word
+from sqlalchemy import text
+
+from result_guard import DEFAULT_COUNT_LIMIT, DEFAULT_MAX_BYTES, DEFAULT_MAX_ROWS, count_rows, guarded_query, is_select, summarize_result
+
+_databases = {}
+_databases_lock = threading.Lock()
+## tables visible to the current agent run, None means all of them
+_scoped_tables = ContextVar("scoped_tables", default=None)
+
+
+def schema_fingerprint(engine):
+    """Cheap value that changes whenever the DDL changes, or None if the dialect isn't supported."""
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            return str(conn.execute(text("PRAGMA schema_version")).scalar())
+        if dialect in ("mysql", "mariadb"):
+            row = conn.execute(text(
+                "SELECT COUNT(*), MAX(CREATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+            )).one()
+            ## column renames and type changes don't touch CREATE_TIME, so the columns themselves are hashed
+            columns = hashlib.sha256()
+            for column in conn.execute(text(
+                "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION"
+            )):
+                columns.update("\x00".join(str(value) for value in column).encode("utf-8") + b"\x01")
+            return "|".join([*(str(value) for value in row), columns.hexdigest()[:16]])
+    return None
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase whose table info is cached until the schema fingerprint changes.
+
+    The fingerprint is checked at most every `check_interval` seconds. For
+    dialects without a fingerprint the cache simply expires after `ttl` seconds.
+    Query results are capped at `max_rows` rows and about `max_bytes` of text;
+    larger ones are summarized (with their total row count if `count_truncated`,
+    counted up to `count_limit` rows).
+    """
+
+    def __init__(self, engine, check_interval=5.0, ttl=300.0, max_rows=DEFAULT_MAX_ROWS,
+                 max_bytes=DEFAULT_MAX_BYTES, count_truncated=True, count_limit=DEFAULT_COUNT_LIMIT, **kwargs):
+        super().__init__(engine, **kwargs)
+        self._db_kwargs = kwargs
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.count_truncated = count_truncated
+        self.count_limit = count_limit
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._fingerprint = schema_fingerprint(engine)
+        self._checked_at = self._built_at = time.monotonic()
+
+    def _refresh_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        fingerprint = schema_fingerprint(self._engine)
+        expired = fingerprint is None and now - self._built_at > self.ttl
+        if fingerprint != self._fingerprint or expired:
+            ## DDL changed: reflect the tables again and drop every cached schema
+            super().__init__(self._engine, **self._db_kwargs)
+            self._cache.clear()
+            self._fingerprint = fingerprint
+            self._built_at = now
+
+    @contextmanager
+    def scope_tables(self, table_names):
+        """Within the block, table listing and default table info only cover `table_names`."""
+        token = _scoped_tables.set(tuple(table_names))
+        try:
+            yield
+        finally:
+            _scoped_tables.reset(token)
+
+    def get_table_info(self, table_names=None):
+        if not table_names and _scoped_tables.get() is not None:
+            table_names = list(_scoped_tables.get())
+        with self._cache_lock:
+            self._refresh_if_changed()
+            key = tuple(sorted(table_names)) if table_names else None
+            if key in self._cache:
+                self.hits += 1
+                return self._cache[key]
+        self.misses += 1
+        info = super().get_table_info(table_names)
+        with self._cache_lock:
+            self._cache[key] = info
+        return info
+
+    def get_usable_table_names(self):
+        with self._cache_lock:
+            self._refresh_if_changed()
+        names = super().get_usable_table_names()
+        scoped = _scoped_tables.get()
+        if scoped is not None:
+            names = [name for name in names if name in scoped]
+        return names
+
+    def run(self, command, fetch="all", include_columns=False, **kwargs):
+        """Like SQLDatabase.run, but SELECTs are streamed with LIMIT injection and row/byte caps."""
+        guarded = (
+            fetch == "all" and isinstance(command, str) and is_select(command)
+            and self._schema is None and not kwargs.get("execution_options")
+        )
+        if not guarded:
+            return super().run(command, fetch, include_columns, **kwargs)
+        parameters = kwargs.get("parameters")
+        result = guarded_query(self._engine, command, self.max_rows, self.max_bytes, parameters=parameters)
+        if result.truncated:
+            total = count_rows(self._engine, command, parameters, limit=self.count_limit) if self.count_truncated else None
+            return summarize_result(result, total_rows=total, count_limit=self.count_limit, max_bytes=self.max_bytes)
+        if not result.rows:
+            return ""
+        rows = [
+            {column: truncate_word(value, length=self._max_string_length) for column, value in zip(result.columns, row)}
+            for row in result.rows
+        ]
+        if include_columns:
+            return str(rows)
+        return str([tuple(row.values()) for row in rows])
+
+    def cache_stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cached_entries": len(self._cache)}
+
+
+def get_database(uri, max_bytes=DEFAULT_MAX_BYTES, **engine_args):
+    """
+    Process-wide CachedSQLDatabase for `uri`, backed by one pooled engine.
+
+    `max_bytes` caps query results for the model using them, see result_guard.result_bytes_budget.
+    """
+    with _databases_lock:
+        db = _databases.get(uri)
+        if db is None:
+            engine_args.setdefault("pool_pre_ping", True)
+            engine_args.setdefault("pool_recycle", 3600)
+            db = _databases[uri] = CachedSQLDatabase.from_uri(uri, engine_args=engine_args, max_bytes=max_bytes)
+        db.max_bytes = max_bytes
+        return db
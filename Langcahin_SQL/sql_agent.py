@@ -0,0 +1,19 @@
+"""
+SQL agent construction, kept free of Streamlit so app.py and the offline
+benchmarks build exactly the same agent.
+"""
+from langchain.agents import create_sql_agent
+from langchain.agents.agent_types import AgentType
+from langchain.agents.agent_toolkits import SQLDatabaseToolkit
+
+
+def build_sql_agent(llm, db, verbose=True):
+    """Create SQL toolkit and ZERO_SHOT_REACT agent for `db`."""
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+    return create_sql_agent(
+        llm=llm,
+        toolkit=toolkit,
+        agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=verbose,
+        handle_parsing_errors=True
+    )
@@ -0,0 +1,323 @@
+"""
+Question-to-SQL plan cache and a single-shot fast path in front of the SQL agent.
+
+Repeated questions ("How many students are there per grade?") shouldn't pay
+for the full ReAct loop (list tables, get schema, check query, run query) every
+time. `SQLFastPath` answers in this order:
+
+1. plan cache: a previously validated SQL statement for the same normalized
+   question (or, with embeddings, a near-identical one using the same content
+   words) on the same database and schema fingerprint is run directly, with no
+   LLM call;
+2. single shot: one LLM call generates the SQL, which is executed and cached
+   if it is read-only and returns rows;
+3. otherwise the caller falls back to the agent, and its query is cached as
+   well when the run unambiguously answered with one (see `QueryRecorder`).
+
+Plans are stored in SQLite and keyed on the database identity plus the schema
+fingerprint from schema_cache.py (see `plan_scope`), so one cache file can
+serve several databases and plans stop matching as soon as the DDL changes.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from langchain.chains import create_sql_query_chain
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy.exc import SQLAlchemyError
+
+from result_guard import DEFAULT_MAX_BYTES, guarded_query, is_read_only
+from schema_cache import schema_fingerprint
+
+DEFAULT_PLAN_CACHE_PATH = "sql_plans.sqlite"
+
+## phrasing words a reworded question may add, drop or swap; every other word may be a filter value
+## ("section a" vs "section b", "top 5" vs "top 10"), so it must be the same for a semantic hit
+_FILLER = frozenset("""
+what which who how show me list give tell find get display return please can could you i want to know the
+is are was were do does there here of in on for from by per with all each every any their its
+""".split())
+
+SQLAnswer = namedtuple("SQLAnswer", ["sql", "columns", "rows", "source", "truncated"], defaults=(False,))
+
+
+def normalize_question(question):
+    """Lowercased words only, so punctuation, case and spacing don't matter."""
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+
+def content_terms(question):
+    """Words of a normalized question that aren't phrasing filler, e.g. column names and literal values."""
+    return frozenset(word for word in question.split() if word not in _FILLER)
+
+
+def database_identity(engine):
+    """Short stable id of the database behind `engine`: its URL without password, sqlite paths made absolute."""
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        url = url.set(database=os.path.realpath(url.database))
+    if url.password is not None:
+        url = url.set(password=None)
+    rendered = url.render_as_string(hide_password=False)
+    return hashlib.sha256(rendered.encode("utf-8")).hexdigest()[:16]
+
+
+def plan_scope(engine):
+    """Cache scope for plans run on `engine`: database identity plus schema fingerprint, or None."""
+    fingerprint = schema_fingerprint(engine)
+    if fingerprint is None:
+        return None
+    return f"{database_identity(engine)}:{fingerprint}"
+
+
+def clean_sql(generated):
+    """The SQL statement in an LLM reply, without code fences, 'SQLQuery:' prefixes or trailing ';'."""
+    sql = generated.strip()
+    fence = re.search(r"```(?:sql)?\s*(.*?)```", sql, re.DOTALL | re.IGNORECASE)
+    if fence:
+        sql = fence.group(1)
+    sql = re.split(r"SQLResult:|Answer:", sql)[0]
+    sql = re.sub(r"^\s*SQLQuery:\s*", "", sql, flags=re.IGNORECASE)
+    return sql.strip().rstrip(";").strip()
+
+
+class SQLPlanCache:
+    """
+    SQLite-backed map from (scope, normalized question) to validated SQL.
+
+    The scope (stored in the `fingerprint` column) is whatever identifies
+    the database and schema version, see `plan_scope`.
+
+    Args:
+        path: SQLite file, ":memory:" for a process-local cache
+        embeddings: optional embedding backend for matching reworded questions
+        min_similarity: cosine similarity needed for a semantic hit
+        max_entries: least recently used plans are evicted past this size
+    """
+
+    def __init__(self, path=DEFAULT_PLAN_CACHE_PATH, embeddings=None, min_similarity=0.95, max_entries=5000):
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        ## fingerprint -> (questions, unit vectors) for semantic lookups, loaded lazily
+        self._vectors = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " fingerprint TEXT NOT NULL, question TEXT NOT NULL, sql TEXT NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL,"
+            " PRIMARY KEY (fingerprint, question))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans(last_used)")
+        self._conn.commit()
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _semantic_index(self, fingerprint):
+        index = self._vectors.get(fingerprint)
+        if index is None:
+            questions = [row[0] for row in self._conn.execute(
+                "SELECT question FROM plans WHERE fingerprint = ?", (fingerprint,)
+            )]
+            vectors = np.stack([self._embed(q) for q in questions]) if questions else np.zeros((0, 0), np.float32)
+            index = self._vectors[fingerprint] = (questions, vectors)
+        return index
+
+    def _touch(self, fingerprint, question):
+        self._conn.execute(
+            "UPDATE plans SET hits = hits + 1, last_used = ? WHERE fingerprint = ? AND question = ?",
+            (time.time(), fingerprint, question),
+        )
+        self._conn.commit()
+
+    def lookup(self, fingerprint, question):
+        """Return (sql, "exact" | "semantic") for a cached plan, or (None, None)."""
+        key = normalize_question(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sql FROM plans WHERE fingerprint = ? AND question = ?", (fingerprint, key)
+            ).fetchone()
+            if row is not None:
+                self._touch(fingerprint, key)
+                self.hits["exact"] += 1
+                return row[0], "exact"
+            if self.embeddings is not None:
+                questions, vectors = self._semantic_index(fingerprint)
+                if questions:
+                    scores = vectors @ self._embed(key)
+                    terms = content_terms(key)
+                    ## the most similar question whose content words (and so its literal values) are the same
+                    match = next((
+                        questions[i] for i in np.argsort(-scores)
+                        if scores[i] >= self.min_similarity and content_terms(questions[i]) == terms
+                    ), None)
+                    if match is not None:
+                        row = self._conn.execute(
+                            "SELECT sql FROM plans WHERE fingerprint = ? AND question = ?", (fingerprint, match)
+                        ).fetchone()
+                        if row is not None:
+                            self._touch(fingerprint, match)
+                            self.hits["semantic"] += 1
+                            return row[0], "semantic"
+            self.misses += 1
+        return None, None
+
+    def store(self, fingerprint, question, sql):
+        key = normalize_question(question)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (fingerprint, question, sql, hits, last_used) VALUES (?, ?, ?, 0, ?)",
+                (fingerprint, key, sql, time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM plans WHERE rowid IN (SELECT rowid FROM plans ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self._vectors.clear()
+            elif fingerprint in self._vectors and self.embeddings is not None:
+                questions, vectors = self._vectors[fingerprint]
+                if key not in questions:
+                    vector = self._embed(key)[None, :]
+                    self._vectors[fingerprint] = (
+                        questions + [key], np.concatenate([vectors, vector]) if questions else vector
+                    )
+            self._conn.commit()
+
+    def forget(self, fingerprint, sql):
+        """Drop every plan using `sql`, e.g. after it stopped executing."""
+        with self._lock:
+            self._conn.execute("DELETE FROM plans WHERE fingerprint = ? AND sql = ?", (fingerprint, sql))
+            self._conn.commit()
+            self._vectors.pop(fingerprint, None)
+
+    def metrics(self):
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "entries": entries,
+            "exact_hits": self.hits["exact"],
+            "semantic_hits": self.hits["semantic"],
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else 0.0,
+        }
+
+
+class QueryRecorder(BaseCallbackHandler):
+    """
+    Records the `sql_db_query` calls of an agent run.
+
+    `last_sql` is the last read-only query that ran successfully (shown to the
+    user and paged through again, so statements that write are never kept).
+    `final_sql` is the query worth caching for the question: only set when
+    the run executed exactly one successful query and no tool ran after it,
+    so exploratory probes ("SELECT * FROM t LIMIT 3") are never cached.
+    """
+
+    def __init__(self):
+        self.last_sql = None
+        self.successful = []
+        self._pending = {}
+        self._last_tool_was_query = False
+
+    @property
+    def final_sql(self):
+        if len(self.successful) == 1 and self._last_tool_was_query:
+            return self.successful[0]
+        return None
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._last_tool_was_query = False
+        if (serialized or {}).get("name") == "sql_db_query":
+            self._pending[run_id] = input_str
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        sql = self._pending.pop(run_id, None)
+        if sql is not None and not str(output).startswith("Error"):
+            sql = clean_sql(sql)
+            if is_read_only(sql):
+                self.last_sql = sql
+            self.successful.append(sql)
+            self._last_tool_was_query = True
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._pending.pop(run_id, None)
+
+
+class SQLFastPath:
+    """Plan cache plus single-shot text-to-SQL for a CachedSQLDatabase; None means "use the agent"."""
+
+    def __init__(self, llm, db, cache, max_rows=100, max_bytes=DEFAULT_MAX_BYTES):
+        self.db = db
+        self.cache = cache
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.generate_sql = create_sql_query_chain(llm, db)
+
+    def execute(self, sql):
+        """Run a read-only statement, streaming at most max_rows rows / max_bytes of them."""
+        return guarded_query(self.db._engine, sql, self.max_rows, self.max_bytes)
+
+    def from_cache(self, question):
+        """Answer from a cached plan without calling the LLM, or None."""
+        scope = plan_scope(self.db._engine)
+        if scope is None:
+            return None
+        sql, how = self.cache.lookup(scope, question)
+        if sql is None:
+            return None
+        try:
+            result = self.execute(sql)
+        except SQLAlchemyError:
+            self.cache.forget(scope, sql)
+            return None
+        return SQLAnswer(sql, result.columns, result.rows, f"plan cache ({how})", result.truncated)
+
+    def single_shot(self, question, callbacks=None):
+        """One LLM call to write the SQL, then run it; None if it isn't safe or doesn't return rows."""
+        sql = clean_sql(self.generate_sql.invoke({"question": question}, config={"callbacks": callbacks}))
+        if not is_read_only(sql):
+            return None
+        try:
+            result = self.execute(sql)
+        except SQLAlchemyError:
+            return None
+        if not result.rows:
+            ## an empty result is as likely a wrong filter as a real answer, let the agent explore
+            return None
+        self.remember(question, sql)
+        return SQLAnswer(sql, result.columns, result.rows, "single-shot SQL", result.truncated)
+
+    def remember(self, question, sql):
+        """Cache `sql` for `question` if it is a read-only statement."""
+        if not sql or not is_read_only(sql):
+            return
+        scope = plan_scope(self.db._engine)
+        if scope is not None:
+            self.cache.store(scope, question, sql)
+
+
+def answer_markdown(answer):
+    """SQLAnswer as markdown: the SQL that ran and its rows as a table."""
+    lines = [f"```sql\n{answer.sql}\n```", ""]
+    if answer.columns:
+        lines.append("| " + " | ".join(str(c) for c in answer.columns) + " |")
+        lines.append("|" + " --- |" * len(answer.columns))
+        for row in answer.rows:
+            lines.append("| " + " | ".join(str(v) for v in row) + " |")
+    lines.append("")
+    shown = f"first {len(answer.rows)} rows" if answer.truncated else f"{len(answer.rows)} row(s)"
+    lines.append(f"_{shown}, answered by {answer.source}_")
+    return "\n".join(lines)
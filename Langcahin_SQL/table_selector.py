@@ -0,0 +1,82 @@
+"""
+Embedding-indexed table selection for the SQL agent.
+
+`TableSelector` builds a small local FAISS index with one entry per table
+(table name, column names and table/column comments). For each question it
+picks the top-k relevant tables, so the agent only sees those tables and gets
+their DDL up front instead of listing and describing the whole schema. The
+index is rebuilt when the schema fingerprint changes.
+"""
+import threading
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from sqlalchemy import inspect
+
+from schema_cache import schema_fingerprint
+
+SELECTED_TABLES_HINT = (
+    "\n\nOnly these tables are relevant, and their schema is already given below, "
+    "so there is no need to list tables or fetch their schema again:\n{table_info}"
+)
+
+
+def describe_tables(engine, table_names, schema=None):
+    """One Document per table with its name, columns and comments, for embedding."""
+    inspector = inspect(engine)
+    docs = []
+    for name in table_names:
+        parts = [f"table {name}"]
+        try:
+            comment = inspector.get_table_comment(name, schema=schema).get("text")
+        except NotImplementedError:
+            comment = None
+        if comment:
+            parts.append(comment)
+        for column in inspector.get_columns(name, schema=schema):
+            parts.append(f"column {column['name']}" + (f": {column['comment']}" if column.get("comment") else ""))
+        docs.append(Document(page_content="\n".join(parts), metadata={"table": name}))
+    return docs
+
+
+class TableSelector:
+    """Picks the tables most relevant to a question for a CachedSQLDatabase."""
+
+    def __init__(self, db, embeddings, k=5):
+        self.db = db
+        self.embeddings = embeddings
+        self.k = k
+        self._lock = threading.Lock()
+        self._index = None
+        self._fingerprint = None
+
+    def _ensure_index(self):
+        fingerprint = schema_fingerprint(self.db._engine)
+        with self._lock:
+            if self._index is None or (fingerprint is not None and fingerprint != self._fingerprint):
+                docs = describe_tables(self.db._engine, self.db.get_usable_table_names(), schema=self.db._schema)
+                self._index = FAISS.from_documents(docs, self.embeddings) if docs else None
+                self._fingerprint = fingerprint
+            return self._index
+
+    def select(self, question, k=None):
+        """Names of the top-k tables for `question` (all tables if there are no more than k)."""
+        k = k or self.k
+        names = self.db.get_usable_table_names()
+        if len(names) <= k:
+            return list(names)
+        index = self._ensure_index()
+        if index is None:
+            return []
+        return [doc.metadata["table"] for doc in index.similarity_search(question, k=k)]
+
+    def prepare(self, question, k=None):
+        """
+        Return (tables, question with their DDL attached).
+
+        Run the agent inside `db.scope_tables(tables)` so its tools only see these tables.
+        """
+        tables = self.select(question, k)
+        if not tables:
+            return tables, question
+        return tables, question + SELECTED_TABLES_HINT.format(table_info=self.db.get_table_info(tables))
@@ -5,6 +5,10 @@ from langchain_community.llms import Ollama
 import streamlit as st
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+import sys
+## shared helpers (instrumentation, ...) live in the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import StageCallbackHandler, StreamTimer
 
 load_dotenv()
 
@@ -26,12 +30,28 @@ st.title("Langchain Demo With Gemma Model")
 input_text=st.text_input("What question you have in mind?")
 
 
-## Ollama Llama2 model
-llm=Ollama(model="gemma:2b")
-output_parser=StrOutputParser()
-chain=prompt|llm|output_parser
+@st.cache_resource
+def get_chain(model):
+    """Model client and chain are built once per process, not on every rerun."""
+    ## Ollama Llama2 model
+    llm=Ollama(model=model)
+    output_parser=StrOutputParser()
+    return prompt|llm|output_parser
+
+chain=get_chain("gemma:2b")
 
 if input_text:
-    st.write(chain.invoke({"question":input_text}))
+    handler = StageCallbackHandler(app="ollama")
+    ## tokens show up as they are generated instead of after the whole answer
+    stream = StreamTimer(chain.stream({"question":input_text}, config={"callbacks":[handler]}), handler)
+    st.write_stream(stream)
+    stats = stream.stats()
+    if stats["first_token_s"] is not None:
+        st.caption(
+            f"Time to first token {stats['first_token_s']:.2f}s, "
+            f"{stats['tokens']} tokens at {stats['tokens_per_s']:.1f} tokens/s"
+        )
+    with st.expander("Stage timings"):
+        st.table(handler.rows())
 
 
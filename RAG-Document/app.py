@@ -3,21 +3,26 @@ import os
 import time
 from langchain_groq import ChatGroq
 from langchain_community.vectorstores import FAISS 
-from langchain_community.document_loaders import PyPDFDirectoryLoader 
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter  
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
-from langchain.prompts import ChatPromptTemplate 
+from index_store import sync_index
+from hybrid_retriever import BM25Index, HybridRetriever
+from ingest import iter_pdf_chunks
+from rag_chains import build_retrieval_chain
 
 import os.path
+import sys
 from dotenv import load_dotenv
 ## load groq api key 
 # Get the current file's directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
 # Get the parent directory
 parent_dir = os.path.dirname(current_dir)
+# Shared helpers (embedding cache, ...) live in the repo root
+sys.path.append(parent_dir)
+from embedding_cache import CachedEmbeddings
+from instrumentation import StageCallbackHandler, TimedEmbeddings
 # Specify the path to .env file
 env_path = os.path.join(parent_dir, '.env')
 
@@ -32,24 +37,13 @@ if not groq_api_key:
     st.stop() 
 
 llm = ChatGroq(groq_api_key=groq_api_key,model="Llama3-8b-8192")
-prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful AI assistant."),
-    ("human", """
-    Answer the question based on the provided context.
-    Response to the best of your ability for the question.
-    
-    Context:
-    {context}
-    
-    Question: {input}
-    """)
-])
 
 def create_vector_embeddings():
     if "vectors" not in st.session_state:
         try:
             # Check if Research Papers directory exists
             research_papers_path = os.path.join(os.path.dirname(__file__), "Research Papers")
+            index_path = os.path.join(os.path.dirname(__file__), "faiss_index")
             if not os.path.exists(research_papers_path):
                 st.error(f"Directory 'Research Papers' not found. Please create it and add PDF files.")
                 st.stop()
@@ -77,18 +71,48 @@ def create_vector_embeddings():
                     else:
                         st.error("Neither Ollama nor OpenAI embeddings are available. Please install Ollama or set OPENAI_API_KEY in your .env file.")
                         st.stop()
-            st.session_state.loader = PyPDFDirectoryLoader(research_papers_path)
-            
-            with st.spinner("Loading PDF documents..."):
-                st.session_state.docs = st.session_state.loader.load()
-                
-            if not st.session_state.docs:
+            ## only chunks that were never embedded with this model reach the backend
+            ingest_handler = StageCallbackHandler(app="rag_document")
+            st.session_state.embeddings = TimedEmbeddings(
+                CachedEmbeddings(
+                    st.session_state.embeddings,
+                    path=os.path.join(parent_dir, "embedding_cache.sqlite"),
+                ),
+                ingest_handler,
+            )
+            st.session_state.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+            ## load the saved index and only embed new or changed PDFs
+            failures = []
+            ## parse and split the PDFs (in a process pool with more than one worker), chunks arrive in
+            ## file order and unreadable PDFs are skipped and reported
+            load_chunks = lambda paths: iter_pdf_chunks(
+                paths, st.session_state.text_splitter, workers=ingest_workers, failures=failures,
+                handler=ingest_handler,
+            )
+            keyword_index = BM25Index.load(index_path)
+            with st.spinner("Syncing document index..."):
+                vectors, stats = sync_index(
+                    research_papers_path,
+                    index_path,
+                    st.session_state.embeddings,
+                    st.session_state.text_splitter,
+                    load_chunks=load_chunks,
+                    handler=ingest_handler,
+                    keyword_index=keyword_index,
+                )
+            st.session_state.ingest_timings = ingest_handler.rows()
+
+            for path, error in failures:
+                st.warning(f"Skipped {os.path.basename(path)}: {error}")
+
+            if vectors is None:
                 st.error("No content could be extracted from the PDF files.")
                 st.stop()
-                
-            st.session_state.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            st.session_state.final_documents = st.session_state.text_splitter.split_documents(st.session_state.docs[:50])
-            st.session_state.vectors = FAISS.from_documents(st.session_state.final_documents, st.session_state.embeddings)
+
+            st.session_state.vectors = vectors
+            st.session_state.keyword_index = keyword_index
+            st.session_state.index_stats = stats
             
         except ImportError as e:
             st.error("Missing required packages for PDF processing. Please install: pypdf, pdf2image")
@@ -100,9 +124,32 @@ def create_vector_embeddings():
          
 st.title("Research Paper Query Assistant")
 
+## number of processes used to parse PDFs, 1 parses them in the app process
+ingest_workers = st.sidebar.number_input(
+    "PDF ingestion workers",
+    min_value=1,
+    max_value=os.cpu_count() or 1,
+    value=min(int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1)), os.cpu_count() or 1),
+)
+
+## BM25 over the same chunks catches exact terms (acronyms, paper IDs) that embeddings blur
+hybrid_search = st.sidebar.checkbox("Hybrid BM25 + vector retrieval", value=True)
+
 if st.button("Initialize Document Embedding"):
     create_vector_embeddings()
-    st.success("Vector database is ready!")
+    stats = st.session_state.get("index_stats")
+    if stats:
+        st.success(
+            f"Vector database is ready! Embedded {stats['embedded']} new or changed PDFs, "
+            f"dropped {stats['dropped']}, reused {stats['unchanged']}, skipped {stats['skipped']}."
+        )
+    else:
+        st.success("Vector database is ready!")
+    if stats and stats.get("rebuilt"):
+        st.info("The embedding model changed, so the index was rebuilt from all PDFs.")
+    if st.session_state.get("ingest_timings"):
+        with st.expander("Ingestion stage timings"):
+            st.table(st.session_state.ingest_timings)
 
 user_query = st.text_input("Enter your query about the research paper:", key="user_query")
 
@@ -111,18 +158,27 @@ if st.button("Submit Query") and user_query:
         st.error("Please initialize document embedding first!")
     else:
         try:
-            document_chain = create_stuff_documents_chain(llm, prompt)
-            retriever = st.session_state.vectors.as_retriever()
-            retrieval_chain = create_retrieval_chain(retriever, document_chain)
+            if hybrid_search:
+                retriever = HybridRetriever(
+                    vectorstore=st.session_state.vectors,
+                    keyword_index=st.session_state.keyword_index,
+                )
+            else:
+                retriever = st.session_state.vectors.as_retriever()
+            retrieval_chain = build_retrieval_chain(llm, retriever)
             
             with st.spinner("Processing your query..."):
-                start = time.process_time()
-                response = retrieval_chain.invoke({'input': user_query})
-                process_time = time.process_time() - start
+                ## wall-clock time per stage (retriever, llm, parser) plus tokens
+                handler = StageCallbackHandler(app="rag_document")
+                start = time.perf_counter()
+                response = retrieval_chain.invoke({'input': user_query}, config={"callbacks": [handler]})
+                response_time = time.perf_counter() - start
                 
                 st.write("### Answer:")
                 st.write(response['answer'])  # Changed from 'write' to 'answer'
-                st.info(f"Response time: {process_time:.2f} seconds")
+                st.info(f"Response time: {response_time:.2f} seconds")
+                with st.expander("Stage timings"):
+                    st.table(handler.rows())
             
             with st.expander("Related Document Sections"):
                 for i, doc in enumerate(response['context']):
@@ -0,0 +1,208 @@
+"""
+History-aware retriever that avoids the question-rewrite LLM call when it can.
+
+`create_history_aware_retriever` rewrites every question with the LLM before
+retrieving, even on the first turn. The retriever built here skips the rewrite
+when the chat history is empty or the question already looks standalone
+(cheap local heuristic), and keeps an LRU cache of rewrites keyed on the hash
+of the recent history plus the question.
+
+The speculative variant also starts retrieving with the raw question while the
+rewrite is running, and only queries again if the rewrite differs enough. The
+run's config (callbacks, tags) and contextvars are handed to the background
+retrieval, so it is traced and timed like an inline one.
+"""
+import contextvars
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+
+## words that usually point back at something said earlier in the chat
+CONTEXT_WORDS = {
+    "it", "its", "it's", "this", "that", "these", "those", "they", "them", "their", "theirs",
+    "he", "him", "his", "she", "her", "hers", "above", "previous", "earlier", "former", "latter",
+    "same", "also", "again", "else", "more", "another", "other", "one", "ones",
+}
+CONTEXT_OPENERS = ("what about", "how about", "and ", "but ", "so ", "why not", "then ")
+MIN_STANDALONE_WORDS = 4
+
+## shared pool for speculative retrievals, so no thread is started per question
+_speculation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieval")
+
+
+def is_standalone(question):
+    """True if the question can probably be understood without the chat history."""
+    text = question.strip().lower()
+    words = re.findall(r"[a-z0-9']+", text)
+    if len(words) < MIN_STANDALONE_WORDS:
+        return False
+    if text.startswith(CONTEXT_OPENERS):
+        return False
+    return not any(word in CONTEXT_WORDS for word in words)
+
+
+def history_key(messages):
+    """sha256 of the type and content of `messages`."""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message.type}\x00{message.content}\x01".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RewriteCache:
+    """Thread-safe LRU cache of question rewrites."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+def create_question_rewriter(llm, prompt, cache=None, history_window=6):
+    """
+    Build a callable(inputs, config=None) -> (standalone question, how) for {"input", "chat_history"} inputs.
+
+    `how` is one of "no_history", "standalone", "cached" or "llm". Only the last
+    `history_window` messages are sent to the rewrite prompt and used in the cache key.
+    """
+    rewrite_chain = prompt | llm | StrOutputParser()
+    cache = cache if cache is not None else RewriteCache()
+
+    def rewrite(inputs, config=None):
+        question = inputs["input"]
+        history = list(inputs.get("chat_history") or [])[-history_window:]
+        if not history:
+            return question, "no_history"
+        if is_standalone(question):
+            return question, "standalone"
+        key = (history_key(history), question)
+        rewritten = cache.get(key)
+        if rewritten is not None:
+            return rewritten, "cached"
+        rewritten = rewrite_chain.invoke({"input": question, "chat_history": history}, config=config)
+        rewritten = rewritten.strip() or question
+        cache.put(key, rewritten)
+        return rewritten, "llm"
+
+    return rewrite
+
+
+def create_fast_history_aware_retriever(llm, retriever, prompt, cache=None, history_window=6):
+    """
+    Drop-in replacement for `create_history_aware_retriever`.
+
+    Takes {"input", "chat_history"} and returns the retrieved documents, but only
+    calls the LLM to rewrite the question when the heuristic and cache can't help.
+    """
+    rewrite = create_question_rewriter(llm, prompt, cache=cache, history_window=history_window)
+    return (
+        RunnableLambda(lambda inputs, config: rewrite(inputs, config)[0]) | retriever
+    ).with_config(run_name="chat_retriever_chain")
+
+
+def question_similarity(a, b):
+    """Jaccard similarity of the word sets of two questions."""
+    words_a = set(re.findall(r"[a-z0-9']+", a.lower()))
+    words_b = set(re.findall(r"[a-z0-9']+", b.lower()))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def merge_documents(primary, secondary):
+    """Interleave two ranked document lists, dropping duplicates, capped at the longer list's length."""
+    merged, seen = [], set()
+    limit = max(len(primary), len(secondary))
+    for pair in zip(primary, secondary):
+        for doc in pair:
+            key = (doc.page_content, doc.metadata.get("source"), doc.metadata.get("page"))
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+    longer = primary if len(primary) > len(secondary) else secondary
+    for doc in longer[min(len(primary), len(secondary)):]:
+        key = (doc.page_content, doc.metadata.get("source"), doc.metadata.get("page"))
+        if key not in seen:
+            seen.add(key)
+            merged.append(doc)
+    return merged[:limit]
+
+
+def create_speculative_history_aware_retriever(llm, retriever, prompt, cache=None, history_window=6,
+                                               min_similarity=0.6, timings=None):
+    """
+    Like `create_fast_history_aware_retriever`, but hides retrieval behind the rewrite.
+
+    Retrieval on the raw question starts in a background thread while the rewrite
+    runs. If the rewritten question is at least `min_similarity` similar to the raw
+    one the speculative results are used as is, otherwise it is retrieved again and
+    the two result lists are merged (rewritten results first).
+
+    If `timings` is a list, a dict with the path taken and the wall time of each
+    stage (in seconds) is appended to it for every question.
+    """
+    rewrite = create_question_rewriter(llm, prompt, cache=cache, history_window=history_window)
+
+    def retrieve(inputs, config):
+        start = time.perf_counter()
+        question = inputs["input"]
+        ## pool threads don't inherit contextvars, and the retriever needs this run's callbacks
+        context = contextvars.copy_context()
+        speculative = _speculation_pool.submit(context.run, _timed_invoke, retriever, question, config)
+
+        rewritten, how = rewrite(inputs, config)
+        rewrite_done = time.perf_counter()
+        docs, retrieval_s = speculative.result()
+        speculation_done = time.perf_counter()
+
+        requery_s = 0.0
+        if rewritten == question or question_similarity(rewritten, question) >= min_similarity:
+            path = "speculative"
+        else:
+            path = "requery"
+            rewritten_docs, requery_s = _timed_invoke(retriever, rewritten, config)
+            docs = merge_documents(rewritten_docs, docs)
+
+        if timings is not None:
+            timings.append({
+                "path": path,
+                "rewrite": how,
+                "rewrite_s": rewrite_done - start,
+                "speculative_retrieval_s": retrieval_s,
+                "wait_for_retrieval_s": speculation_done - rewrite_done,
+                "requery_s": requery_s,
+                "total_s": time.perf_counter() - start,
+            })
+        return docs
+
+    return RunnableLambda(retrieve).with_config(run_name="chat_retriever_chain")
+
+
+def _timed_invoke(retriever, query, config=None):
+    start = time.perf_counter()
+    docs = retriever.invoke(query, config=config)
+    return docs, time.perf_counter() - start
@@ -0,0 +1,197 @@
+"""
+Keyword (BM25) index kept next to the FAISS index, and a hybrid retriever.
+
+Dense search misses queries that hinge on exact terms: acronyms, protocol
+names, paper IDs. `BM25Index` is a small inverted index over the same chunks
+(same ids as the FAISS docstore), maintained incrementally by
+index_store.sync_index and saved as bm25.json in the index folder.
+`HybridRetriever` takes the top candidates of both, fuses them with reciprocal
+rank fusion and returns k chunks, so exact matches surface without raising k.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+BM25_FILE = "bm25.json"
+
+## keeps "2403.01234", "gpt-4o", "oauth2" and "mcp_server" as whole tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-_][a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Lowercased terms; compound tokens also contribute their parts ("gpt-4o" -> gpt-4o, gpt, 4o)."""
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        parts = re.split(r"[.\-_]", token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part)
+    return terms
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring, supporting adds and deletes by chunk id."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        ## term -> {chunk id: term frequency}
+        self.postings = {}
+        ## chunk id -> number of terms
+        self.lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def doc_ids(self):
+        return self.lengths.keys()
+
+    def add(self, doc_id, text):
+        if doc_id in self.lengths:
+            self.remove(doc_id)
+        terms = tokenize(text)
+        for term, tf in Counter(terms).items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+
+    def remove(self, doc_id):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        ## postings aren't indexed by document, so walk them; deletes only happen on re-sync
+        for term in list(self.postings):
+            docs = self.postings[term]
+            if docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def remove_many(self, doc_ids):
+        doc_ids = {doc_id for doc_id in doc_ids if doc_id in self.lengths}
+        if not doc_ids:
+            return
+        for doc_id in doc_ids:
+            self._total_length -= self.lengths.pop(doc_id)
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for doc_id in doc_ids.intersection(docs):
+                del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query, k=10):
+        """Top-k (chunk id, score) pairs for `query`."""
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = self._total_length / count or 1.0
+        scores = Counter()
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores.most_common(k)
+
+    def save(self, index_dir):
+        path = os.path.join(index_dir, BM25_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "postings": self.postings, "lengths": self.lengths}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, index_dir):
+        """The saved index of `index_dir`, or an empty one if there is none yet."""
+        path = os.path.join(index_dir, BM25_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = data["postings"]
+        index.lengths = data["lengths"]
+        index._total_length = sum(index.lengths.values())
+        return index
+
+    def clear(self):
+        self.postings = {}
+        self.lengths = {}
+        self._total_length = 0
+
+    def rebuild(self, vectors):
+        """Re-index every chunk of a FAISS docstore (e.g. an index saved before BM25 was added)."""
+        self.clear()
+        for doc_id in vectors.index_to_docstore_id.values():
+            self.add(doc_id, vectors.docstore.search(doc_id).page_content)
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """Fuse ranked id lists: score(id) = sum of 1 / (rrf_k + rank) over the lists it appears in."""
+    scores = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (rrf_k + rank)
+    return [doc_id for doc_id, _ in scores.most_common()]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 + dense retrieval over one FAISS store, fused with reciprocal rank fusion.
+
+    Args:
+        vectorstore: FAISS store with the chunks
+        keyword_index: BM25Index over the same chunk ids
+        k: chunks returned
+        fetch_k: candidates taken from each of the two rankings
+        rrf_k: RRF damping constant (60 is the usual choice)
+    """
+
+    vectorstore: Any
+    keyword_index: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def dense_ids(self, query, k):
+        """Chunk ids of the k nearest documents, best first, using the store's own distance strategy."""
+        embed = self.vectorstore.embedding_function
+        vector = embed.embed_query(query) if isinstance(embed, Embeddings) else embed(query)
+        results = self.vectorstore.similarity_search_with_score_by_vector(vector, k=k)
+        ids, by_object = [], None
+        for doc, _ in results:
+            doc_id = getattr(doc, "id", None)
+            if doc_id is None:
+                ## older stores don't set Document.id: the docstore hands back the stored objects themselves
+                if by_object is None:
+                    docstore = self.vectorstore.docstore
+                    by_object = {
+                        id(docstore.search(chunk_id)): chunk_id
+                        for chunk_id in self.vectorstore.index_to_docstore_id.values()
+                    }
+                doc_id = by_object.get(id(doc))
+            if doc_id is not None:
+                ids.append(doc_id)
+        return ids
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        dense = self.dense_ids(query, self.fetch_k)
+        keyword = [doc_id for doc_id, _ in self.keyword_index.search(query, self.fetch_k)]
+        fused = reciprocal_rank_fusion([dense, keyword], rrf_k=self.rrf_k)[:self.k]
+        docs = []
+        for doc_id in fused:
+            doc = self.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
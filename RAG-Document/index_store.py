@@ -0,0 +1,197 @@
+"""
+On-disk FAISS index for the research papers, kept in sync with the PDF folder.
+
+Every PDF is tracked in a small manifest by the sha256 of its bytes together
+with the ids of the chunks it produced. On startup the saved index is loaded,
+only new or changed PDFs are parsed and embedded, vectors belonging to deleted
+(or changed) files are dropped, and the index is saved again. An optional
+keyword index (hybrid_retriever.BM25Index) over the same chunk ids is updated
+in the same pass and saved next to the FAISS files.
+
+The manifest also records the embedding model and vector dimension; if the
+app ends up with a different model (e.g. the Ollama -> OpenAI fallback) the
+index is rebuilt instead of being extended with incompatible vectors. The
+manifest is written last, and chunks in the index that it doesn't list (left
+by a crash between the two writes) are dropped on the next sync.
+"""
+import hashlib
+import json
+import os
+from contextlib import nullcontext
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.vectorstores import FAISS
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_hash(path, block_size=1 << 20):
+    """sha256 of a file's content, read in blocks so big PDFs don't sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_pdf_chunks(path, text_splitter, handler=None):
+    """Parse one PDF and split it into chunks, timing both stages on `handler` if given."""
+    with handler.stage("loader") if handler else nullcontext():
+        docs = PyPDFLoader(path).load()
+    with handler.stage("splitter") if handler else nullcontext():
+        return text_splitter.split_documents(docs)
+
+
+def embedding_signature(embeddings):
+    """{"model", "dimension"} of an embedding backend, looking through wrappers such as CachedEmbeddings."""
+    backend = embeddings
+    while hasattr(backend, "backend"):
+        backend = backend.backend
+    model = type(backend).__name__
+    for attr in ("model", "model_name", "deployment"):
+        value = getattr(backend, attr, None)
+        if isinstance(value, str) and value:
+            model = f"{model}:{value}"
+            break
+    return {"model": model, "dimension": len(embeddings.embed_query("dimension probe"))}
+
+
+def _load_manifest(index_dir):
+    """(embedding signature or None, {file name: {"hash", "ids"}})."""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None, {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if "files" not in manifest:
+        ## manifests written before the embedding model was recorded
+        return None, manifest
+    return manifest.get("embedding"), manifest["files"]
+
+
+def _save_manifest(index_dir, manifest):
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def sync_index(pdf_dir, index_dir, embeddings, text_splitter, load_chunks=None, handler=None, keyword_index=None):
+    """
+    Bring the index in `index_dir` up to date with the PDFs in `pdf_dir`.
+
+    Args:
+        pdf_dir: folder with the PDF files
+        index_dir: folder the FAISS index and manifest are saved to
+        embeddings: embedding model used for new chunks
+        text_splitter: splitter applied to every parsed PDF
+        load_chunks: optional callable(paths) -> iterable of (path, chunks)
+            used instead of parsing the new PDFs one by one (see ingest.py);
+            files it doesn't yield are left out of the manifest and retried
+            on the next sync
+        handler: optional instrumentation.StageCallbackHandler that the
+            loader and splitter stages are timed on
+        keyword_index: optional BM25Index (usually BM25Index.load(index_dir))
+            kept in step with the vectors and saved to `index_dir`
+
+    Returns:
+        (vector store or None, dict with embedded (new or changed) / dropped
+        (deleted) / unchanged / skipped file counts, and whether the index was
+        rebuilt for a different embedding model)
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    signature, manifest = _load_manifest(index_dir)
+    current_signature = embedding_signature(embeddings)
+
+    vectors = None
+    rebuilt = False
+    if manifest and os.path.exists(os.path.join(index_dir, "index.faiss")):
+        vectors = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        if signature is None:
+            ## unknown model: keep the index only if its vectors at least have the right size
+            compatible = vectors.index.d == current_signature["dimension"]
+        else:
+            compatible = signature == current_signature
+        if not compatible:
+            vectors, manifest, rebuilt = None, {}, True
+    else:
+        manifest = {}
+
+    if vectors is not None:
+        ## chunks the manifest doesn't know about were saved by a sync that crashed before its manifest
+        known = {chunk_id for entry in manifest.values() for chunk_id in entry["ids"]}
+        orphans = [chunk_id for chunk_id in vectors.index_to_docstore_id.values() if chunk_id not in known]
+        if orphans:
+            vectors.delete(orphans)
+
+    current = {
+        name: file_hash(os.path.join(pdf_dir, name))
+        for name in sorted(os.listdir(pdf_dir))
+        if name.lower().endswith(".pdf")
+    }
+
+    ## files that were deleted or whose content changed lose their vectors
+    stale = [name for name, entry in manifest.items() if current.get(name) != entry["hash"]]
+    deleted = [name for name in stale if name not in current]
+    stale_ids = [chunk_id for name in stale for chunk_id in manifest[name]["ids"]]
+    if vectors is not None:
+        ## after a crash the saved index may already be missing some of them
+        present = set(vectors.index_to_docstore_id.values())
+        present_ids = [chunk_id for chunk_id in stale_ids if chunk_id in present]
+        if present_ids:
+            vectors.delete(present_ids)
+    if keyword_index is not None:
+        keyword_index.remove_many(stale_ids)
+    for name in stale:
+        del manifest[name]
+
+    ## only new or changed files get parsed and embedded
+    pending = [os.path.join(pdf_dir, name) for name in current if name not in manifest]
+    if load_chunks is None:
+        loaded = ((path, load_pdf_chunks(path, text_splitter, handler)) for path in pending)
+    else:
+        loaded = load_chunks(pending)
+
+    embedded = 0
+    for path, chunks in loaded:
+        embedded += 1
+        name = os.path.basename(path)
+        digest = current[name]
+        ids = [f"{name}:{digest[:12]}:{i}" for i in range(len(chunks))]
+        if chunks:
+            if vectors is None:
+                vectors = FAISS.from_documents(chunks, embeddings, ids=ids)
+            else:
+                vectors.add_documents(chunks, ids=ids)
+            if keyword_index is not None:
+                for chunk_id, chunk in zip(ids, chunks):
+                    keyword_index.add(chunk_id, chunk.page_content)
+        manifest[name] = {"hash": digest, "ids": ids}
+
+    if vectors is not None and len(vectors.index_to_docstore_id) == 0:
+        vectors = None
+    if vectors is not None:
+        vectors.save_local(index_dir)
+    elif os.path.exists(os.path.join(index_dir, "index.faiss")):
+        os.remove(os.path.join(index_dir, "index.faiss"))
+        os.remove(os.path.join(index_dir, "index.pkl"))
+
+    if keyword_index is not None:
+        if vectors is None:
+            keyword_index.clear()
+        elif set(keyword_index.doc_ids()) != set(vectors.index_to_docstore_id.values()):
+            ## index saved before the keyword index existed (or out of step): rebuild it from the docstore
+            keyword_index.rebuild(vectors)
+        keyword_index.save(index_dir)
+
+    ## last, so the manifest never lists chunks the saved index doesn't have
+    _save_manifest(index_dir, {"embedding": current_signature, "files": manifest})
+
+    return vectors, {
+        "embedded": embedded,
+        "dropped": len(deleted),
+        "unchanged": len(current) - len(pending),
+        "skipped": len(pending) - embedded,
+        "rebuilt": rebuilt,
+    }
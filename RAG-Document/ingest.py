@@ -0,0 +1,102 @@
+"""
+Parallel PDF ingestion: parse and split PDFs across a process pool.
+
+Chunks are streamed back in the same order as the input paths, so the
+embedder can start on the first file while later ones are still being parsed.
+A PDF that fails to parse (corrupt, encrypted, ...) is skipped and reported.
+Uploaded PDFs can also be parsed straight from memory with `load_pdf_bytes`.
+"""
+import hashlib
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+
+def _parse_and_split(path, text_splitter):
+    """Worker: parse one PDF and split it, timing both stages. Errors are returned, not raised."""
+    timings = {}
+    try:
+        start = time.perf_counter()
+        docs = PyPDFLoader(path).load()
+        timings["loader"] = time.perf_counter() - start
+        start = time.perf_counter()
+        chunks = text_splitter.split_documents(docs)
+        timings["splitter"] = time.perf_counter() - start
+        return path, chunks, None, timings
+    except Exception as e:
+        return path, [], f"{type(e).__name__}: {e}", timings
+
+
+def _parsed_in_pool(paths, text_splitter, workers):
+    """_parse_and_split results in input order, with a window of `2 * workers` files in flight."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(paths)
+        for path in remaining:
+            pending.append(pool.submit(_parse_and_split, path, text_splitter))
+            if len(pending) >= 2 * workers:
+                break
+
+        while pending:
+            result = pending.popleft().result()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append(pool.submit(_parse_and_split, next_path, text_splitter))
+            yield result
+
+
+def iter_pdf_chunks(paths, text_splitter, workers=None, failures=None, handler=None):
+    """
+    Parse and split `paths` and yield (path, chunks) in input order.
+
+    Args:
+        paths: PDF file paths
+        text_splitter: splitter applied to every parsed PDF (pickled to the
+            workers, so chunk size and overlap come from this one object)
+        workers: number of worker processes (defaults to the CPU count);
+            with 1 the files are parsed in this process
+        failures: optional list that (path, error) pairs are appended to for
+            PDFs that could not be parsed; those files are not yielded
+        handler: optional instrumentation.StageCallbackHandler that each
+            file's loader and splitter time is recorded on
+
+    At most `2 * workers` files are in flight at a time.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    if workers == 1:
+        results = (_parse_and_split(path, text_splitter) for path in paths)
+    else:
+        results = _parsed_in_pool(paths, text_splitter, workers)
+
+    for path, chunks, error, timings in results:
+        if handler is not None:
+            for stage, seconds in timings.items():
+                handler.record(stage, seconds)
+        if error is not None:
+            if failures is not None:
+                failures.append((path, error))
+            continue
+        yield path, chunks
+
+
+def load_pdf_bytes(name, data):
+    """Parse an in-memory PDF (e.g. a Streamlit upload) into one Document per page."""
+    reader = PdfReader(io.BytesIO(data))
+    return [
+        Document(page_content=page.extract_text() or "", metadata={"source": name, "page": i})
+        for i, page in enumerate(reader.pages)
+    ]
+
+
+def uploads_fingerprint(uploaded_files):
+    """Order-independent sha256 fingerprint of a set of uploaded files."""
+    return tuple(sorted(hashlib.sha256(f.getvalue()).hexdigest() for f in uploaded_files))
@@ -0,0 +1,87 @@
+"""
+Chain construction for the RAG apps, kept free of Streamlit so the same chains
+can be driven by app.py, withhistory.py and the offline benchmarks.
+"""
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+from history_retriever import create_fast_history_aware_retriever, create_speculative_history_aware_retriever
+
+## prompt of the research paper assistant (app.py)
+retrieval_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful AI assistant."),
+    ("human", """
+    Answer the question based on the provided context.
+    Response to the best of your ability for the question.
+
+    Context:
+    {context}
+
+    Question: {input}
+    """)
+])
+
+## contextualize the chat history (withhistory.py)
+contextual_q_system_prompt = (
+    "Given a chat history and the latest user question "
+    "which might reference context in the chat history, "
+    "formulate a standalone question which can be understood "
+    "without the chat history. Do NOT answer the question, "
+    "just reformulate it if needed and otherwise return it as is."
+)
+contextual_q_prompt = ChatPromptTemplate.from_messages([
+    ("system", contextual_q_system_prompt),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}")
+])
+
+## Answer question prompt (withhistory.py)
+system_prompt = (
+    "You are an assistant for question-answering tasks. "
+    "Use the following pieces of retrieved context to answer "
+    "the question. If you don't know the answer, say that you "
+    "don't know. Use three sentences maximum and keep the "
+    "answer concise."
+    "\n\n"
+    "{context}"
+)
+q_a_prompt = ChatPromptTemplate.from_messages([
+    ("system", system_prompt),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}")
+])
+
+
+def build_retrieval_chain(llm, retriever):
+    """Retrieval QA chain of the research paper assistant."""
+    document_chain = create_stuff_documents_chain(llm, retrieval_prompt)
+    return create_retrieval_chain(retriever, document_chain)
+
+
+def build_conversational_rag_chain(llm, retriever, get_session_history, speculative=False,
+                                   rewrite_cache=None, timings=None):
+    """
+    History-aware RAG chain of the document chatbot.
+
+    The question rewrite is skipped or cached where possible; with `speculative`
+    retrieval also runs while the question is being rewritten.
+    """
+    if speculative:
+        history_aware_retriever = create_speculative_history_aware_retriever(
+            llm, retriever, contextual_q_prompt, cache=rewrite_cache, timings=timings
+        )
+    else:
+        history_aware_retriever = create_fast_history_aware_retriever(
+            llm, retriever, contextual_q_prompt, cache=rewrite_cache
+        )
+    question_answer_chain = create_stuff_documents_chain(llm, q_a_prompt)
+    rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+    return RunnableWithMessageHistory(
+        rag_chain,
+        get_session_history,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+        output_messages_key="answer"
+    )
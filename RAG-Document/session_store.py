@@ -0,0 +1,172 @@
+"""
+Bounded chat history with a rolling summary, persisted to SQLite.
+
+Each session keeps at most `max_turns` recent question/answer turns within a
+token budget. Older turns are folded into a short running summary, which is
+sent to the prompts as a single system message, so the per-turn prompt size
+stays flat however long the chat gets. Sessions are written to a local SQLite
+file, loaded lazily on first use and dropped from memory once idle; on disk
+they are deleted once unused for `max_age` seconds.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage, messages_from_dict, messages_to_dict
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, adding onto the previous summary. "
+    "Keep names, numbers and facts the user may refer back to. Reply with the new summary only."
+    "\n\nPrevious summary:\n{summary}\n\nNew lines of conversation:\n{lines}"
+)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def llm_summarizer(llm):
+    """Build a summarizer(previous_summary, messages) -> str that asks `llm` to fold turns in."""
+    def summarize(summary, messages):
+        lines = "\n".join(f"{message.type}: {message.content}" for message in messages)
+        result = llm.invoke(SUMMARY_PROMPT.format(summary=summary or "(none)", lines=lines))
+        return getattr(result, "content", result)
+    return summarize
+
+
+class BudgetedChatMessageHistory(BaseChatMessageHistory):
+    """Chat history that keeps the last turns within a token budget plus a summary of the rest."""
+
+    def __init__(self, store, session_id, summary="", recent=None, summarizer=None):
+        self.store = store
+        self.session_id = session_id
+        self.summary = summary
+        self.recent = list(recent or [])
+        ## overrides the store's summarizer, e.g. an LLM built from this user's own API key
+        self.summarizer = summarizer
+
+    @property
+    def messages(self):
+        if not self.summary:
+            return list(self.recent)
+        return [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")] + self.recent
+
+    def add_messages(self, messages):
+        self.recent.extend(messages)
+        self._fold()
+        self.store.save(self)
+
+    def clear(self):
+        self.summary = ""
+        self.recent = []
+        self.store.save(self)
+
+    def _over_budget(self):
+        if len(self.recent) > 2 * self.store.max_turns:
+            return True
+        tokens = sum(self.store.count_tokens(str(message.content)) for message in self.recent)
+        return tokens > self.store.token_budget
+
+    def _fold(self):
+        folded = []
+        ## always keep the latest turn, even if it alone is over budget
+        while len(self.recent) > 2 and self._over_budget():
+            folded.extend(self.recent[:2])
+            del self.recent[:2]
+        summarizer = self.summarizer or self.store.summarizer
+        if folded and summarizer is not None:
+            self.summary = summarizer(self.summary, folded)
+
+
+class SQLiteSessionStore:
+    """
+    Process-wide store of BudgetedChatMessageHistory objects backed by SQLite.
+
+    Args:
+        path: SQLite file the sessions are saved to
+        max_turns: question/answer turns kept verbatim per session
+        token_budget: max estimated tokens for the verbatim turns
+        summarizer: callable(previous_summary, messages) -> str used to fold old
+            turns into the summary (see `llm_summarizer`); None just drops them
+        idle_timeout: seconds after which an unused session is dropped from memory
+        max_sessions: max sessions kept in memory at once
+        count_tokens: callable(text) -> int, defaults to `estimate_tokens`
+        max_age: seconds after its last message that a session is deleted from disk
+    """
+
+    def __init__(self, path="chat_sessions.sqlite", max_turns=6, token_budget=2000, summarizer=None,
+                 idle_timeout=1800, max_sessions=256, count_tokens=estimate_tokens, max_age=30 * 24 * 3600):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.count_tokens = count_tokens
+        self.max_age = max_age
+        self._sessions = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, messages TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        self._purge(time.time())
+        self._conn.commit()
+
+    def get(self, session_id, summarizer=None):
+        """Return the history for `session_id`, loading it from disk on first use.
+
+        `summarizer`, if given, is used for this session instead of the store's.
+        """
+        with self._lock:
+            now = time.time()
+            history = self._sessions.get(session_id)
+            if history is None:
+                row = self._conn.execute(
+                    "SELECT summary, messages FROM sessions WHERE session_id = ? AND updated >= ?",
+                    (session_id, now - self.max_age),
+                ).fetchone()
+                if row is None:
+                    history = BudgetedChatMessageHistory(self, session_id)
+                else:
+                    history = BudgetedChatMessageHistory(
+                        self, session_id, summary=row[0], recent=messages_from_dict(json.loads(row[1]))
+                    )
+                self._sessions[session_id] = history
+            if summarizer is not None:
+                history.summarizer = summarizer
+            self._sessions.move_to_end(session_id)
+            self._last_used[session_id] = now
+            ## after the insert, so at most max_sessions stay loaded; the current one is last in line
+            self._evict(now)
+            return history
+
+    def save(self, history):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, summary, messages, updated) VALUES (?, ?, ?, ?)",
+                (history.session_id, history.summary, json.dumps(messages_to_dict(history.recent)), now),
+            )
+            self._purge(now)
+            self._conn.commit()
+
+    def _purge(self, now):
+        ## abandoned sessions would otherwise stay on disk forever
+        self._conn.execute("DELETE FROM sessions WHERE updated < ?", (now - self.max_age,))
+
+    def _evict(self, now):
+        ## everything is already on disk, so eviction only frees memory
+        for session_id in list(self._sessions):
+            idle = now - self._last_used[session_id] > self.idle_timeout
+            if idle or len(self._sessions) > self.max_sessions:
+                del self._sessions[session_id]
+                del self._last_used[session_id]
+            else:
+                break
@@ -1,23 +1,66 @@
 import streamlit as st
-from langchain.chains import create_retrieval_chain, create_history_aware_retriever
-from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_community.vectorstores import FAISS
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_groq import ChatGroq
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.document_loaders import PyPDFLoader
+from ingest import load_pdf_bytes, uploads_fingerprint
+from session_store import SQLiteSessionStore, llm_summarizer
+from history_retriever import RewriteCache
+from rag_chains import build_conversational_rag_chain
 import os
+import sys
+import uuid
+from collections import deque
 
 from dotenv import load_dotenv
 load_dotenv()
 
+## shared helpers (embedding cache, ...) live in the repo root
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+from embedding_cache import CachedEmbeddings
+from instrumentation import StageCallbackHandler
+
 ## fetching in the environment variables
 os.environ["HF_TOKEN"]= os.getenv("HF_TOKEN")
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+
+@st.cache_resource
+def get_embeddings():
+    """One embedding model and cache connection per process, not one per rerun."""
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
+        path=os.path.join(parent_dir, "embedding_cache.sqlite"),
+    )
+
+## every cached index lives in process memory, so keep only the recent upload sets
+@st.cache_resource(show_spinner="Indexing uploaded documents...", max_entries=8, ttl=3600)
+def build_vector_store(fingerprint, _files):
+    """Parse, split and embed the uploads. Cached on the content hashes in `fingerprint`."""
+    documents = []
+    for name, data in _files:
+        documents.extend(load_pdf_bytes(name, data))
+
+    ## split and create the embeddings 
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=500)
+    split_docs = text_splitter.split_documents(documents)
+
+    # Create FAISS vector store (more compatible than Chroma)
+    return FAISS.from_documents(documents=split_docs, embedding=get_embeddings())
+
+@st.cache_resource
+def get_session_store():
+    """One process-wide session store, i.e. one SQLite connection per file; sessions are namespaced per browser."""
+    return SQLiteSessionStore(
+        path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_sessions.sqlite"),
+        max_turns=6,
+        token_budget=2000,
+    )
+
+@st.cache_resource
+def get_rewrite_cache():
+    """Process-wide LRU cache of question rewrites."""
+    return RewriteCache(maxsize=1024)
 
 ## setting the streamlit app
 st.title("Document Q&A chatbot with message history")
@@ -31,88 +74,55 @@ if api_key:
     llm = ChatGroq(groq_api_key=api_key, model="Gemma2-9b-It")
     
     ## chat interface 
-    session_id = st.text_input("session_id", value = "default_session")
-    ## Manage chat history
-    if 'store' not in st.session_state:
-        st.session_state.store ={}
+    ## every browser gets a random id kept in the URL (?sid=...), so a refresh, a bookmark or a
+    ## server restart finds the saved history again; the typed label only names conversations within it
+    if "sid" not in st.query_params:
+        st.query_params["sid"] = uuid.uuid4().hex
+    session_label = st.text_input("session_id", value = "default_session")
+    session_id = f"{st.query_params['sid']}:{session_label}"
+    ## Manage chat history: last turns within a token budget plus a rolling summary, kept on disk
+    store = get_session_store()
+    summarizer = llm_summarizer(llm)
     uploaded_files = st.file_uploader("Upload PDF files", type=["pdf"], accept_multiple_files=True)
     
     ## process the uploaded files
     if uploaded_files:
-        documents = []
-        for uploaded_file in uploaded_files:
-            temp_file = f"./temp.pdf"
-            with open(temp_file, "wb") as f:
-                f.write(uploaded_file.getvalue())
-                f_name= uploaded_file.name
-            loader = PyPDFLoader(file_path=temp_file)
-            docs=  loader.load()
-            documents.extend(docs)
-            
-        ## split and create the embeddings 
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=500)
-        split_docs = text_splitter.split_documents(documents)  
-        
-        # Create FAISS vector store (more compatible than Chroma)
-        vector_store = FAISS.from_documents(
-            documents=split_docs, 
-            embedding=embeddings
+        ## reruns reuse the index unless the set of uploaded files changed
+        vector_store = build_vector_store(
+            uploads_fingerprint(uploaded_files),
+            [(f.name, f.getvalue()) for f in uploaded_files],
         )
         retriever = vector_store.as_retriever()
         
-        ## contextualize the chat history
-        contextual_q_system_prompt = (
-            "Given a chat history and the latest user question "
-            "which might reference context in the chat history, "
-            "formulate a standalone question which can be understood "
-            "without the chat history. Do NOT answer the question, "
-            "just reformulate it if needed and otherwise return it as is."
-        )
-        contextual_q_prompt = ChatPromptTemplate.from_messages([
-            ("system", contextual_q_system_prompt),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}")
-        ])
-        
-        history_aware_retriever = create_history_aware_retriever(llm,retriever, contextual_q_prompt)
-        ## Answer question prompt 
-        system_prompt = (
-            "You are an assistant for question-answering tasks. "
-            "Use the following pieces of retrieved context to answer "
-            "the question. If you don't know the answer, say that you "
-            "don't know. Use three sentences maximum and keep the "
-            "answer concise."
-            "\n\n"
-            "{context}"
-        )
-        q_a_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}")
-        ])
-        question_answer_chain = create_stuff_documents_chain(llm,q_a_prompt)
-        rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
-        
+        speculative = st.checkbox("Speculative retrieval (retrieve while the question is rewritten)", value=True)
+        if 'retrieval_timings' not in st.session_state:
+            st.session_state.retrieval_timings = deque(maxlen=50)
+
         def get_session_history(session_id: str) -> BaseChatMessageHistory:
             """Retrieve the chat history for a given session."""
-            if session_id not in st.session_state.store:
-                st.session_state.store[session_id] = ChatMessageHistory()
-            return st.session_state.store[session_id]
-        
-        conversational_rag_chain = RunnableWithMessageHistory(
-            rag_chain,
+            return store.get(session_id, summarizer=summarizer)
+
+        conversational_rag_chain = build_conversational_rag_chain(
+            llm,
+            retriever,
             get_session_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-            output_messages_key="answer"
+            speculative=speculative,
+            ## skips the rewrite LLM call on the first turn, for standalone questions and for repeats
+            rewrite_cache=get_rewrite_cache(),
+            timings=st.session_state.retrieval_timings,
         )
         user_input = st.text_input("Ask a question about the document:")
         if user_input:
+            handler = StageCallbackHandler(app="withhistory")
             response = conversational_rag_chain.invoke(
                 {"input": user_input},
-                config={"configurable": {"session_id": session_id}}
+                config={"configurable": {"session_id": session_id}, "callbacks": [handler]}
             )
             st.write("Assistant:", response['answer'])
+            with st.expander("Stage timings"):
+                st.table(handler.rows())
+                if speculative and st.session_state.retrieval_timings:
+                    st.json(st.session_state.retrieval_timings[-1])
             
             # Display chat history
             session_history = get_session_history(session_id)
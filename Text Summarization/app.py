@@ -1,9 +1,14 @@
+import os
 import validators
 import streamlit as st
-from langchain.prompts import PromptTemplate
 from langchain_groq import ChatGroq
-from langchain.chains.summarize import load_summarize_chain
-from langchain_community.document_loaders import YoutubeLoader,UnstructuredURLLoader
+from summarizer import SummarizationEngine, prompt_template, map_prompt, combine_prompt
+from content_cache import ContentCache, content_hash
+from extractive import reduce_documents
+import sys
+## shared helpers (instrumentation, ...) live in the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import StageCallbackHandler
 
 
 
@@ -16,6 +21,11 @@ st.subheader("Summarize URL")
 
 with st.sidebar:
     groq_api_key = st.text_input("Enter your Groq API Key", type="password")
+    ## long transcripts are split and summarized in parallel, this caps the calls in flight
+    max_concurrency = st.slider("Parallel chunk summaries", min_value=1, max_value=16, value=4)
+    ## drop duplicate lines and low-ranked sentences locally before anything reaches the LLM
+    use_extractive = st.checkbox("Extractive pre-reduction", value=False)
+    keep_ratio = st.slider("Share of the text to keep", min_value=0.1, max_value=1.0, value=0.5, step=0.05)
     
     st.markdown("---")
     st.markdown("### 💡 Tips:")
@@ -39,10 +49,24 @@ with st.sidebar:
 
 genric_url = st.text_input("URL",label_visibility="collapsed")
 
-prompt_template = """Summarize the content of the URL in 300 words:
-context: {text}"""
 
-prompt = PromptTemplate(template=prompt_template, input_variables=["text"])
+MODEL = "Llama3-8b-8192"
+## summaries are reused only for the same content, prompts and model
+PROMPT_ID = "\n".join([prompt_template, map_prompt.template, combine_prompt.template])
+
+
+@st.cache_resource
+def get_content_cache():
+    """Fetched pages/transcripts and summaries, shared by all sessions."""
+    return ContentCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), "content_cache.sqlite"))
+
+
+@st.cache_resource
+def get_engine(groq_api_key, max_concurrency):
+    """LLM and summarization chains are built once, not on every click."""
+    llm = ChatGroq(groq_api_key=groq_api_key, model=MODEL)
+    return SummarizationEngine(llm, context_tokens=8192, max_concurrency=max_concurrency)
+
 
 if st.button("Summarize the content"):
     ## Validate all the inputs
@@ -55,44 +79,64 @@ if st.button("Summarize the content"):
         try:
             with st.spinner("Loading..."):
                 ## Initialize the LLM after validation
-                llm = ChatGroq(groq_api_key=groq_api_key, model="Llama3-8b-8192")
+                engine = get_engine(groq_api_key, max_concurrency)
                 
-                ## loading the website data 
-                if "youtube.com" in genric_url or "youtu.be" in genric_url:
-                    loader = YoutubeLoader.from_youtube_url(genric_url, add_video_info=True)
-                else:
-                    # Enhanced headers for better website compatibility
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                        "Accept-Language": "en-US,en;q=0.5",
-                        "Accept-Encoding": "gzip, deflate",
-                        "Connection": "keep-alive",
-                        "Upgrade-Insecure-Requests": "1"
-                    }
-                    loader = UnstructuredURLLoader(
-                        urls=[genric_url],
-                        ssl_verify=False,
-                        headers=headers
-                    )
-                docs = loader.load()
+                ## loading the website data (from the cache when the URL or video was seen before)
+                # Enhanced headers for better website compatibility
+                headers = {
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+                    "Accept-Language": "en-US,en;q=0.5",
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive",
+                    "Upgrade-Insecure-Requests": "1"
+                }
+                cache = get_content_cache()
+                handler = StageCallbackHandler(app="summarization")
+                with handler.stage("loader"):
+                    docs, fetch_status = cache.get_documents(genric_url, headers=headers)
                 
                 if not docs:
                     st.error("No content could be extracted from the URL. Please check if the URL is accessible.")
                     st.stop()
                 
-                ## chain For summarization 
-                chain = load_summarize_chain(
-                    llm=llm,
-                    chain_type="stuff",
-                    prompt=prompt,
-                    verbose=False  # Set to False to reduce console output
-                )
-                output_summary = chain.run(docs)
+                reduction = None
+                if use_extractive:
+                    with handler.stage("extractive"):
+                        docs, reduction = reduce_documents(docs, ratio=keep_ratio)
+                    if not docs:
+                        st.error("Nothing left after the extractive pre-reduction, try keeping a larger share.")
+                        st.stop()
+
+                ## unchanged content reuses its summary, even if the page had to be downloaded again
+                docs_hash = content_hash(docs)
+                output_summary = cache.get_summary(docs_hash, PROMPT_ID, MODEL)
+                report = None
+                if output_summary is None:
+                    ## "stuff" when it fits the context, parallel map-reduce otherwise
+                    output_summary, report = engine.summarize(docs, callbacks=[handler])
+                    cache.put_summary(docs_hash, PROMPT_ID, MODEL, output_summary)
 
                 st.success("Summary generated successfully!")
                 st.write("### Summary:")
                 st.write(output_summary)
+                with st.expander("Stage timings"):
+                    st.table(handler.rows())
+                    st.caption(f"Content: {fetch_status.replace('_', ' ')}")
+                    if reduction is not None:
+                        st.caption(
+                            f"Extractive pre-reduction: {reduction['input_tokens']} -> {reduction['output_tokens']} "
+                            f"tokens ({reduction['reduction']:.0%} fewer) in {reduction['seconds']}s"
+                        )
+                    if report is None:
+                        st.caption("Summary served from cache (same content, prompt and model).")
+                    else:
+                        st.caption(
+                            f"Strategy: {report['mode']}, {report['chunks']} chunks, "
+                            f"{report['reduce_levels']} reduce levels, {report['seconds']}s"
+                        )
+                        if report["timings"]:
+                            st.table(report["timings"])
                 
         except Exception as e:
             error_msg = str(e)
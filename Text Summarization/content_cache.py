@@ -0,0 +1,229 @@
+"""
+Two-level cache for the summarizer: fetched documents and finished summaries.
+
+Documents are stored per URL (per video ID for YouTube, so youtu.be and
+youtube.com links share an entry). A web page fetched less than
+`revalidate_after` seconds ago is returned without any request; after that it
+is revalidated with If-None-Match / If-Modified-Since and only downloaded
+again when the server says it changed. YouTube transcripts don't carry cache
+validators, so they are simply kept for `youtube_ttl` seconds.
+
+Summaries are stored by (content hash, prompt, model): a page that was
+re-downloaded but whose text didn't change reuses its summary, and a changed
+page or a new prompt/model gets a fresh one. They expire after `summary_ttl`
+seconds and the oldest are evicted past `max_summaries` rows.
+"""
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from langchain_core.documents import Document
+
+DEFAULT_CONTENT_CACHE_PATH = "content_cache.sqlite"
+
+
+def youtube_video_id(url):
+    """Video ID of a youtube.com/watch, youtu.be, /shorts/ or /embed/ URL, or None."""
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if host.endswith("youtu.be"):
+        video_id = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        video_id = parse_qs(parsed.query).get("v", [None])[0]
+        if not video_id:
+            match = re.match(r"^/(?:shorts|embed|live|v)/([^/?#]+)", parsed.path)
+            video_id = match.group(1) if match else None
+    else:
+        return None
+    return video_id or None
+
+
+def content_hash(docs):
+    """sha256 of the documents' text, independent of fetch metadata."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _dump_docs(docs):
+    return json.dumps([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs], default=str)
+
+
+def _load_docs(payload):
+    return [Document(page_content=item["page_content"], metadata=item["metadata"]) for item in json.loads(payload)]
+
+
+def response_to_documents(url, content, content_type=None):
+    """Same text extraction as UnstructuredURLLoader's default single mode, from an already fetched body."""
+    from unstructured.partition.auto import partition
+
+    elements = partition(file=io.BytesIO(content), content_type=content_type)
+    text = "\n\n".join(str(element) for element in elements)
+    return [Document(page_content=text, metadata={"source": url})] if text.strip() else []
+
+
+def load_youtube(url):
+    from langchain_community.document_loaders import YoutubeLoader
+
+    return YoutubeLoader.from_youtube_url(url, add_video_info=True).load()
+
+
+class ContentCache:
+    """
+    SQLite cache of fetched documents (with HTTP validators) and of summaries.
+
+    Args:
+        path: SQLite file
+        revalidate_after: seconds a fetched page is trusted without asking the server
+        youtube_ttl: seconds a transcript is kept before it is loaded again
+        summary_ttl: seconds a summary is reused
+        max_summaries: summary rows kept, the oldest are evicted first
+    """
+
+    def __init__(self, path=DEFAULT_CONTENT_CACHE_PATH, revalidate_after=300, youtube_ttl=7 * 24 * 3600,
+                 load_youtube=load_youtube, response_to_documents=response_to_documents,
+                 summary_ttl=30 * 24 * 3600, max_summaries=10_000):
+        self.revalidate_after = revalidate_after
+        self.youtube_ttl = youtube_ttl
+        self.summary_ttl = summary_ttl
+        self.max_summaries = max_summaries
+        self.load_youtube = load_youtube
+        self.response_to_documents = response_to_documents
+        self.counts = {"fresh": 0, "not_modified": 0, "fetched": 0, "summary_hits": 0, "summary_misses": 0}
+        self._lock = threading.Lock()
+        ## Streamlit runs sessions on several threads and requests.Session isn't documented as thread-safe
+        self._local = threading.local()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " key TEXT PRIMARY KEY, url TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+            " content_hash TEXT NOT NULL, docs TEXT NOT NULL, checked REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY, summary TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_created ON summaries(created)")
+        self._conn.commit()
+
+    @property
+    def _session(self):
+        """One pooled requests.Session per thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _row(self, key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, docs, checked FROM documents WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _save(self, key, url, docs, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (key, url, etag, last_modified, content_hash, docs, checked)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, content_hash(docs), _dump_docs(docs), time.time()),
+            )
+            self._conn.commit()
+
+    def _touch(self, key):
+        with self._lock:
+            self._conn.execute("UPDATE documents SET checked = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def get_documents(self, url, headers=None, verify=False, timeout=30):
+        """
+        Return (docs, status) for `url`.
+
+        status is "fresh" (served without a request), "not_modified" (server
+        answered 304) or "fetched" (downloaded and stored).
+        """
+        video_id = youtube_video_id(url)
+        if video_id:
+            key = f"youtube:{video_id}"
+            row = self._row(key)
+            if row is not None and time.time() - row[3] < self.youtube_ttl:
+                self._count("fresh")
+                return _load_docs(row[2]), "fresh"
+            docs = self.load_youtube(url)
+            if docs:
+                self._save(key, url, docs)
+            self._count("fetched")
+            return docs, "fetched"
+
+        key = f"url:{url}"
+        row = self._row(key)
+        request_headers = dict(headers or {})
+        if row is not None:
+            etag, last_modified, payload, checked = row
+            if time.time() - checked < self.revalidate_after:
+                self._count("fresh")
+                return _load_docs(payload), "fresh"
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = self._session.get(url, headers=request_headers, verify=verify, timeout=timeout)
+        if response.status_code == 304 and row is not None:
+            self._touch(key)
+            self._count("not_modified")
+            return _load_docs(row[2]), "not_modified"
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip() or None
+        docs = self.response_to_documents(url, response.content, content_type)
+        if docs:
+            self._save(key, url, docs, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        self._count("fetched")
+        return docs, "fetched"
+
+    @staticmethod
+    def summary_key(docs_hash, prompt, model):
+        return hashlib.sha256(f"{docs_hash}\0{prompt}\0{model}".encode("utf-8")).hexdigest()
+
+    def get_summary(self, docs_hash, prompt, model):
+        """Cached summary for this content, prompt and model, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE key = ? AND created >= ?",
+                (self.summary_key(docs_hash, prompt, model), time.time() - self.summary_ttl),
+            ).fetchone()
+            self.counts["summary_hits" if row else "summary_misses"] += 1
+        return row[0] if row else None
+
+    def put_summary(self, docs_hash, prompt, model, summary):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created) VALUES (?, ?, ?)",
+                (self.summary_key(docs_hash, prompt, model), summary, now),
+            )
+            ## a put follows an LLM call, so expiring and capping here is cheap in comparison
+            self._conn.execute("DELETE FROM summaries WHERE created < ?", (now - self.summary_ttl,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+            if count > self.max_summaries:
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE key IN "
+                    "(SELECT key FROM summaries ORDER BY created ASC LIMIT ?)",
+                    (count - self.max_summaries,),
+                )
+            self._conn.commit()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.counts)
@@ -0,0 +1,146 @@
+"""
+Local, CPU-only extractive pre-reduction before LLM summarization.
+
+Web pages repeat navigation and footer lines, and transcripts are full of
+filler. `extractive_reduce` drops duplicate lines, scores every sentence by
+TF-IDF similarity to the whole text (a centroid ranker: sentences about the
+main topics score high, boilerplate scores low) and keeps the best sentences,
+in their original order, within a token budget. Fewer input tokens means a
+cheaper and faster LLM call, or fewer map-reduce chunks for long content.
+"""
+import math
+import re
+import time
+from collections import Counter
+
+from langchain_core.documents import Document
+
+from summarizer import estimate_tokens
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how
+i if in into is it its itself just me more most my no nor not now of off on once only or other our out over own
+same she should so some such than that the their them then there these they this those through to too under until
+up very was we were what when where which while who whom why will with would you your yeah um uh like okay oh
+""".split())
+## transcripts often have no punctuation, so very long "sentences" are cut into windows of this many words
+MAX_SENTENCE_WORDS = 40
+
+
+def dedupe_lines(text):
+    """Text without repeated lines (compared case- and whitespace-insensitively); returns (text, removed)."""
+    seen = set()
+    kept = []
+    removed = 0
+    for line in text.splitlines():
+        key = " ".join(line.lower().split())
+        if key and key in seen:
+            removed += 1
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept), removed
+
+
+def split_sentences(text):
+    """Sentences of `text`; unpunctuated runs are cut into MAX_SENTENCE_WORDS-word windows."""
+    sentences = []
+    for part in re.split(r"(?<=[.!?])\s+|\n+", text):
+        words = part.split()
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentence = " ".join(words[start:start + MAX_SENTENCE_WORDS])
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _terms(sentence):
+    return [word for word in re.findall(r"[a-z0-9]+", sentence.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def score_sentences(sentences):
+    """TF-IDF cosine similarity of each sentence to the centroid of all sentences."""
+    term_lists = [_terms(sentence) for sentence in sentences]
+    document_frequency = Counter(term for terms in term_lists for term in set(terms))
+    count = len(sentences)
+    idf = {term: math.log((1 + count) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+    vectors = []
+    centroid = Counter()
+    for terms in term_lists:
+        vector = {term: tf * idf[term] for term, tf in Counter(terms).items()}
+        vectors.append(vector)
+        centroid.update(vector)
+    centroid_norm = math.sqrt(sum(v * v for v in centroid.values())) or 1.0
+
+    scores = []
+    for vector in vectors:
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        if not norm:
+            scores.append(0.0)
+            continue
+        scores.append(sum(weight * centroid[term] for term, weight in vector.items()) / (norm * centroid_norm))
+    return scores
+
+
+def extractive_reduce(text, ratio=0.5, max_tokens=None, count_tokens=estimate_tokens):
+    """
+    Keep the highest scoring sentences of `text` within a token budget.
+
+    Args:
+        text: content to reduce
+        ratio: target share of the (deduplicated) input tokens to keep
+        max_tokens: optional hard cap on the output tokens
+        count_tokens: token counter, estimate_tokens by default
+
+    Returns:
+        (reduced_text, stats) with input/output tokens, sentence counts,
+        removed duplicate lines and the time taken.
+    """
+    start = time.perf_counter()
+    input_tokens = count_tokens(text)
+    deduped, duplicates = dedupe_lines(text)
+    sentences = split_sentences(deduped)
+    budget = int(count_tokens(deduped) * ratio)
+    if max_tokens is not None:
+        budget = min(budget, max_tokens)
+
+    scores = score_sentences(sentences) if sentences else []
+    kept = set()
+    used = 0
+    for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        tokens = count_tokens(sentences[index])
+        if used + tokens > budget:
+            continue
+        kept.add(index)
+        used += tokens
+    reduced = " ".join(sentences[i] for i in sorted(kept))
+    return reduced, {
+        "input_tokens": input_tokens,
+        "output_tokens": count_tokens(reduced) if reduced else 0,
+        "sentences_total": len(sentences),
+        "sentences_kept": len(kept),
+        "duplicate_lines_removed": duplicates,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def reduce_documents(docs, ratio=0.5, max_tokens=None, count_tokens=estimate_tokens):
+    """`extractive_reduce` over every document; returns (documents, combined stats)."""
+    reduced_docs = []
+    totals = Counter()
+    total_tokens = sum(count_tokens(doc.page_content) for doc in docs) or 1
+    for doc in docs:
+        doc_max = None
+        if max_tokens is not None:
+            ## share the hard cap between documents in proportion to their size
+            doc_max = max(1, max_tokens * count_tokens(doc.page_content) // total_tokens)
+        text, stats = extractive_reduce(doc.page_content, ratio=ratio, max_tokens=doc_max, count_tokens=count_tokens)
+        if text:
+            reduced_docs.append(Document(page_content=text, metadata=dict(doc.metadata)))
+        totals.update(stats)
+    stats = dict(totals)
+    stats["seconds"] = round(stats.get("seconds", 0.0), 4)
+    stats["reduction"] = 1 - stats["output_tokens"] / stats["input_tokens"] if stats.get("input_tokens") else 0.0
+    return reduced_docs, stats
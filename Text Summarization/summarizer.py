@@ -0,0 +1,184 @@
+"""
+Summarization chain construction, kept free of Streamlit so app.py and the
+offline benchmarks build exactly the same chain.
+
+`SummarizationEngine` picks the strategy by token count: content that fits the
+model context goes through the "stuff" chain in one call; longer content is
+split by tokens, the chunks are summarized in parallel (at most
+`max_concurrency` at a time) and the partial summaries are reduced
+hierarchically until they fit one final call. Wall time is then roughly one
+chunk summary plus the reduce steps, instead of one huge (or failing) request.
+"""
+import asyncio
+import time
+
+from langchain.chains.summarize import load_summarize_chain
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+prompt_template = """Summarize the content of the URL in 300 words:
+context: {text}"""
+
+prompt = PromptTemplate(template=prompt_template, input_variables=["text"])
+
+map_prompt = PromptTemplate(
+    template="""Write a concise summary of this part of a longer content, keeping the key facts:
+context: {text}""",
+    input_variables=["text"],
+)
+
+combine_prompt = PromptTemplate(
+    template="""Combine these partial summaries of one content into a single concise summary:
+{text}""",
+    input_variables=["text"],
+)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def build_summarize_chain(llm, verbose=False):
+    """chain For summarization"""
+    return load_summarize_chain(
+        llm=llm,
+        chain_type="stuff",
+        prompt=prompt,
+        verbose=verbose  # Set to False to reduce console output
+    )
+
+
+class SummarizationEngine:
+    """
+    Token-aware summarization: "stuff" when it fits, parallel map-reduce otherwise.
+
+    Args:
+        llm: chat model or LLM
+        context_tokens: context window of the model
+        output_tokens: tokens kept free for the answer
+        chunk_tokens: size of the map chunks
+        chunk_overlap: token overlap between neighbouring chunks
+        max_concurrency: map/reduce calls in flight at once (stay under the provider's rate limit)
+        count_tokens: token counter, estimate_tokens by default
+    """
+
+    def __init__(self, llm, context_tokens=8192, output_tokens=1024, chunk_tokens=3000, chunk_overlap=100,
+                 max_concurrency=4, count_tokens=estimate_tokens):
+        self.count_tokens = count_tokens
+        self.max_concurrency = max_concurrency
+        ## room for the content itself once the prompt and the answer are accounted for
+        self.input_budget = context_tokens - output_tokens - count_tokens(prompt_template)
+        self.chunk_tokens = min(chunk_tokens, self.input_budget)
+        self.stuff_chain = build_summarize_chain(llm)
+        self.map_chain = map_prompt | llm | StrOutputParser()
+        self.combine_chain = combine_prompt | llm | StrOutputParser()
+        self.final_chain = prompt | llm | StrOutputParser()
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_tokens, chunk_overlap=chunk_overlap, length_function=count_tokens
+        )
+
+    def plan(self, docs):
+        """"stuff" if the documents fit in one call, otherwise "map_reduce"."""
+        total = sum(self.count_tokens(doc.page_content) for doc in docs)
+        return "stuff" if total <= self.input_budget else "map_reduce"
+
+    async def _timed(self, chain, text, semaphore, config, timings, step):
+        async with semaphore:
+            start = time.perf_counter()
+            summary = await chain.ainvoke({"text": text}, config=config)
+            timings.append({
+                "step": step,
+                "input_tokens": self.count_tokens(text),
+                "output_tokens": self.count_tokens(summary),
+                "seconds": round(time.perf_counter() - start, 3),
+            })
+            return summary
+
+    def _groups(self, summaries):
+        """Consecutive groups of summaries that each fit the input budget."""
+        groups, current, size = [], [], 0
+        for summary in summaries:
+            tokens = self.count_tokens(summary)
+            if current and size + tokens > self.input_budget:
+                groups.append(current)
+                current, size = [], 0
+            current.append(summary)
+            size += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def _truncate(self, text, budget):
+        """Longest prefix of `text` within `budget` tokens (binary search, works with any token counter)."""
+        if self.count_tokens(text) <= budget:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+    def _fit_final(self, summaries, report):
+        """
+        Join the summaries for the final call, trimming each to an equal share of the
+        input budget if they don't fit together (e.g. a single summary is already over it).
+        """
+        text = "\n\n".join(summaries)
+        if self.count_tokens(text) <= self.input_budget:
+            return text
+        share = (self.input_budget - self.count_tokens("\n\n") * (len(summaries) - 1)) // len(summaries)
+        trimmed = [self._truncate(summary, max(share, 0)) for summary in summaries]
+        report["truncated"] = sum(a != b for a, b in zip(summaries, trimmed))
+        text = "\n\n".join(trimmed)
+        if not text.strip() or self.count_tokens(text) > self.input_budget:
+            raise ValueError(
+                f"{len(summaries)} partial summaries cannot be fitted into the final call's "
+                f"{self.input_budget} token input budget; raise context_tokens or lower output_tokens"
+            )
+        return text
+
+    async def asummarize(self, docs, callbacks=None):
+        """Return (summary, report) with the strategy, chunk count and per-call timings."""
+        config = {"callbacks": callbacks}
+        start = time.perf_counter()
+        mode = self.plan(docs)
+        report = {"mode": mode, "chunks": 0, "reduce_levels": 0, "timings": []}
+        if mode == "stuff":
+            result = await self.stuff_chain.ainvoke({"input_documents": docs}, config=config)
+            report["seconds"] = round(time.perf_counter() - start, 3)
+            return result["output_text"], report
+
+        chunks = self.splitter.split_documents(docs)
+        report["chunks"] = len(chunks)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        timings = report["timings"]
+        summaries = await asyncio.gather(*(
+            self._timed(self.map_chain, chunk.page_content, semaphore, config, timings, f"map {i}")
+            for i, chunk in enumerate(chunks)
+        ))
+
+        ## collapse level by level until everything fits in the final call (or can't be grouped any further,
+        ## in which case _fit_final trims the summaries to the budget)
+        ## a summary over the budget on its own would overflow any combine call it is grouped into
+        summaries = [self._truncate(summary, self.input_budget) for summary in summaries]
+        groups = self._groups(summaries)
+        while 1 < len(groups) < len(summaries):
+            report["reduce_levels"] += 1
+            level = report["reduce_levels"]
+            summaries = await asyncio.gather(*(
+                self._timed(self.combine_chain, "\n\n".join(group), semaphore, config, timings, f"reduce {level}.{i}")
+                for i, group in enumerate(groups)
+            ))
+            summaries = [self._truncate(summary, self.input_budget) for summary in summaries]
+            groups = self._groups(summaries)
+        summary = await self._timed(self.final_chain, self._fit_final(summaries, report), semaphore, config, timings, "final")
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        return summary, report
+
+    def summarize(self, docs, callbacks=None):
+        return asyncio.run(self.asummarize(docs, callbacks=callbacks))
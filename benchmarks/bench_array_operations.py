@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of combine_arrays_remove_zeros in Langcahin_SQL/array_operations.py.
+
+Compares the five list-based methods of that file with the vectorized NumPy
+path and the chunked np.memmap path across input sizes. Each case is timed as
+the best of --repeats runs; list methods get Python lists (converting them is
+not timed), the NumPy paths get arrays.
+
+Usage:
+    python benchmarks/bench_array_operations.py
+    python benchmarks/bench_array_operations.py --sizes 1000 1000000 100000000 --max-list-size 10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "Langcahin_SQL"))
+
+import array_operations as ops  # noqa: E402
+
+LIST_METHODS = {
+    "method1_remove_then_combine": ops.remove_zeros_then_combine,
+    "method2_filter": ops.combine_with_filter,
+    "method3_numpy_concatenate": ops.combine_with_numpy,
+    "method4_oneliner": ops.combine_oneliner,
+    "method5_sorted": ops.combine_and_sort,
+}
+
+
+def best_of(func, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_inputs(size, zero_fraction, seed):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1000, size=size, dtype=np.int64)
+    a[rng.random(size) < zero_fraction] = 0
+    b = rng.integers(1, 1000, size=max(size // 2, 1), dtype=np.int64)
+    return a, b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--max-list-size", type=int, default=1_000_000, help="skip the list methods above this size")
+    parser.add_argument("--zero-fraction", type=float, default=0.5)
+    parser.add_argument("--chunk-size", type=int, default=ops.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="array-bench-")
+    print(f"{'size':>12}  {'method':30s} {'seconds':>10} {'Melem/s':>10}")
+    for size in args.sizes:
+        a, b = make_inputs(size, args.zero_fraction, args.seed)
+        expected = None
+        results = {}
+
+        if size <= args.max_list_size:
+            list_a, list_b = a.tolist(), b.tolist()
+            for name, method in LIST_METHODS.items():
+                results[name] = best_of(lambda: method(list_a, list_b), args.repeats)
+            expected = np.asarray(ops.combine_oneliner(list_a, list_b))
+
+        vectorized = ops.combine_arrays_remove_zeros_np(a, b)
+        results["vectorized_np"] = best_of(lambda: ops.combine_arrays_remove_zeros_np(a, b), args.repeats)
+        out = np.empty_like(vectorized)
+        results["vectorized_np_preallocated"] = best_of(
+            lambda: ops.combine_arrays_remove_zeros_np(a, b, out=out), args.repeats
+        )
+
+        ## the chunked path reads memmap inputs and writes a memmap output, like arrays larger than RAM
+        path_a, path_b = os.path.join(workdir, "a.bin"), os.path.join(workdir, "b.bin")
+        a.tofile(path_a)
+        b.tofile(path_b)
+        mm_a = ops.open_memmap_array(path_a, a.dtype)
+        mm_b = ops.open_memmap_array(path_b, b.dtype)
+        out_path = os.path.join(workdir, "out.bin")
+        results["chunked_memmap"] = best_of(
+            lambda: ops.combine_arrays_remove_zeros_chunked(mm_a, mm_b, out_path, chunk_size=args.chunk_size),
+            args.repeats,
+        )
+        chunked = ops.combine_arrays_remove_zeros_chunked(mm_a, mm_b, out_path, chunk_size=args.chunk_size)
+
+        assert np.array_equal(vectorized, chunked), "chunked result differs from the vectorized one"
+        if expected is not None:
+            assert np.array_equal(vectorized, expected), "vectorized result differs from the list methods"
+
+        for name, seconds in results.items():
+            rate = (a.size + b.size) / seconds / 1e6 if seconds else float("inf")
+            print(f"{size:>12,}  {name:30s} {seconds:>10.4f} {rate:>10.1f}")
+        del mm_a, mm_b, chunked
+        print()
+
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
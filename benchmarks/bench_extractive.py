@@ -0,0 +1,89 @@
+"""
+Benchmark of the extractive pre-reduction in Text Summarization/extractive.py.
+
+Builds a synthetic web page / transcript with repeated navigation lines and
+filler, then summarizes it with the real SummarizationEngine against the fake
+chat model, with and without the extractive stage. The fake model charges a
+simulated prefill cost per input token, so fewer tokens show up as less time.
+Reports input/output tokens, the reduction and end-to-end time per keep ratio.
+
+Usage:
+    python benchmarks/bench_extractive.py
+    python benchmarks/bench_extractive.py --paragraphs 2000 --ratios 0.3 0.5 0.7 --prompt-token-latency 0.0002
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(os.path.join(REPO_ROOT, "Text Summarization"))
+sys.path.insert(0, BENCH_DIR)
+
+from extractive import reduce_documents  # noqa: E402
+from fakes import FakeChatModel  # noqa: E402
+from run_benchmarks import TOPICS  # noqa: E402
+from summarizer import SummarizationEngine, estimate_tokens  # noqa: E402
+
+BOILERPLATE = [
+    "Home | About | Contact | Subscribe",
+    "Accept all cookies to continue",
+    "Share this article on social media",
+    "Related posts you might like",
+]
+FILLER = ["um so yeah", "you know what I mean", "okay so", "like I said", "right right"]
+
+
+def synthetic_content(paragraphs, seed=0):
+    """Page-like text: topic sentences mixed with repeated boilerplate lines and transcript filler."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(paragraphs):
+        if i % 5 == 0:
+            lines.extend(BOILERPLATE)
+        topic = rng.choice(TOPICS)
+        lines.append(f"{rng.choice(FILLER).capitalize()}, {topic}. In part {i} we look at how {rng.choice(TOPICS)}.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=1000)
+    parser.add_argument("--ratios", nargs="+", type=float, default=[0.3, 0.5, 0.7])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="simulated seconds per LLM call")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0001, help="simulated seconds per input token")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    from langchain_core.documents import Document
+
+    docs = [Document(page_content=synthetic_content(args.paragraphs), metadata={"source": "synthetic"})]
+    llm = FakeChatModel(latency=args.llm_latency, per_prompt_token_latency=args.prompt_token_latency)
+    engine = SummarizationEngine(llm)
+
+    def end_to_end(ratio):
+        best = float("inf")
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            inputs = docs if ratio is None else reduce_documents(docs, ratio=ratio)[0]
+            engine.summarize(inputs)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    input_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+    baseline = end_to_end(None)
+    print(f"{'ratio':>6} {'tokens in':>10} {'tokens out':>11} {'reduction':>10} {'extract s':>10} {'end-to-end s':>13} {'speedup':>8}")
+    print(f"{'off':>6} {input_tokens:>10} {input_tokens:>11} {0:>10.0%} {0:>10.4f} {baseline:>13.3f} {1:>8.2f}")
+    for ratio in args.ratios:
+        _, stats = reduce_documents(docs, ratio=ratio)
+        seconds = end_to_end(ratio)
+        print(
+            f"{ratio:>6.2f} {stats['input_tokens']:>10} {stats['output_tokens']:>11} {stats['reduction']:>10.0%}"
+            f" {stats['seconds']:>10.4f} {seconds:>13.3f} {baseline / seconds:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark of hybrid BM25 + vector retrieval (RAG-Document/hybrid_retriever.py)
+against dense-only retrieval at the same k.
+
+Builds a FAISS index over synthetic paper chunks with the fake embeddings; a
+share of the chunks mention an exact identifier (a paper ID, an RFC number or
+an acronym) that appears nowhere else. Each query asks about one identifier in
+otherwise generic wording, so the one chunk containing it is the relevant
+result. Reports recall@k and p50/p95 latency per query for both retrievers,
+plus the time to build the keyword index.
+
+Usage:
+    python benchmarks/bench_hybrid_retrieval.py
+    python benchmarks/bench_hybrid_retrieval.py --documents 20000 --queries 500 --k 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(os.path.join(REPO_ROOT, "RAG-Document"))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeEmbeddings  # noqa: E402
+from hybrid_retriever import BM25Index, HybridRetriever  # noqa: E402
+from run_benchmarks import TOPICS, synthetic_documents  # noqa: E402
+
+IDENTIFIERS = ["arXiv:2403.{:05d}", "RFC {:04d}", "MCP-{:04d}", "CVE-2025-{:05d}"]
+
+
+def labelled_corpus(count, tagged, seed=0):
+    """Synthetic chunks where `tagged` of them carry a unique identifier; returns (docs, {identifier: position})."""
+    rng = random.Random(seed)
+    docs = synthetic_documents(count)
+    targets = {}
+    for n, i in enumerate(rng.sample(range(count), tagged)):
+        identifier = IDENTIFIERS[n % len(IDENTIFIERS)].format(n)
+        docs[i].page_content += f" The method is described in {identifier}."
+        targets[identifier] = i
+    return docs, targets
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20, help="candidates taken from each ranking before fusion")
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import FAISS
+
+    docs, targets = labelled_corpus(args.documents, min(args.queries, args.documents))
+    ids = [f"chunk-{i}" for i in range(len(docs))]
+    vectors = FAISS.from_documents(docs, FakeEmbeddings(), ids=ids)
+
+    start = time.perf_counter()
+    keyword_index = BM25Index()
+    for chunk_id, doc in zip(ids, docs):
+        keyword_index.add(chunk_id, doc.page_content)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    queries = [(f"What does {identifier} say about {rng.choice(TOPICS)}?", docs[i].page_content)
+               for identifier, i in targets.items()]
+
+    dense = vectors.as_retriever(search_kwargs={"k": args.k})
+    hybrid = HybridRetriever(vectorstore=vectors, keyword_index=keyword_index, k=args.k, fetch_k=args.fetch_k)
+
+    print(f"{len(docs)} chunks, {len(queries)} queries, k={args.k}; BM25 index built in {build_seconds:.3f}s")
+    print(f"{'retriever':>10} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, retriever in (("dense", dense), ("hybrid", hybrid)):
+        hits = 0
+        latencies = []
+        for query, expected in queries:
+            start = time.perf_counter()
+            results = retriever.invoke(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += any(doc.page_content == expected for doc in results)
+        print(
+            f"{name:>10} {hits / len(queries):>9.2%} {statistics.median(latencies):>8.2f}"
+            f" {percentile(latencies, 0.95):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Deterministic local stand-ins for the chat models and embedders used by the apps.
+
+They let the real chains run offline (no Groq, Ollama or OpenAI keys) with a
+configurable simulated latency, so benchmark numbers only reflect our own code
+plus the latency we choose to simulate.
+"""
+import asyncio
+import hashlib
+import math
+import re
+import threading
+import time
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import Tool
+
+_calls_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """Rough token count used for the simulated usage metadata."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers from a script, or echoes a short deterministic reply.
+
+    Args:
+        responses: replies returned in turn (cycled); empty means echo mode
+        latency: simulated seconds per call
+        per_token_latency: extra simulated seconds per output token
+        per_prompt_token_latency: extra simulated seconds per input token (prefill)
+    """
+
+    responses: List[str] = []
+    latency: float = 0.0
+    per_token_latency: float = 0.0
+    per_prompt_token_latency: float = 0.0
+    model_name: str = "fake-chat"
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _next_reply(self, messages):
+        with _calls_lock:
+            index = self.calls
+            self.calls += 1
+        if self.responses:
+            return self.responses[index % len(self.responses)]
+        last = str(messages[-1].content) if messages else ""
+        return f"Reply {hashlib.sha256(last.encode('utf-8')).hexdigest()[:8]}: {last[:200]}"
+
+    def _result(self, messages, text):
+        prompt_tokens = sum(count_tokens(str(message.content)) for message in messages)
+        completion_tokens = count_tokens(text)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        message = AIMessage(content=text, response_metadata={"token_usage": usage})
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+    def _delay(self, messages, text):
+        prompt_tokens = sum(count_tokens(str(message.content)) for message in messages) if self.per_prompt_token_latency else 0
+        return self.latency + self.per_token_latency * count_tokens(text) + self.per_prompt_token_latency * prompt_tokens
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._next_reply(messages)
+        time.sleep(self._delay(messages, text))
+        return self._result(messages, text)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._next_reply(messages)
+        await asyncio.sleep(self._delay(messages, text))
+        return self._result(messages, text)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings: deterministic, and texts sharing words end up close.
+
+    Args:
+        size: vector dimension
+        latency: simulated seconds per backend call
+        per_text_latency: extra simulated seconds per embedded text
+    """
+
+    def __init__(self, size=384, latency=0.0, per_text_latency=0.0, model="fake-embeddings"):
+        self.size = size
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.model = model
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            bucket = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+            vector[bucket % self.size] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def fake_tool(name, latency=0.0, reply=None, sync=False):
+    """
+    Local stand-in for a search tool (DuckDuckGo, Wikipedia, Arxiv) with a simulated latency.
+
+    Replies are deterministic per query, so cached and uncached runs see the same text.
+    With `sync` the tool has no coroutine, like the real (blocking) tools.
+    """
+    def respond(query):
+        return reply or f"{name} result for {query!r}: " + " ".join(query.split()[:20])
+
+    def run(query):
+        time.sleep(latency)
+        return respond(query)
+
+    async def arun(query):
+        await asyncio.sleep(latency)
+        return respond(query)
+
+    return Tool(
+        name=name, func=run, coroutine=None if sync else arun, description=f"Offline stand-in for the {name} tool."
+    )
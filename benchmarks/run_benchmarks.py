@@ -0,0 +1,430 @@
+"""
+Offline end-to-end benchmarks for the apps in this repo.
+
+Drives the real chains (serve.py translation chain and FastAPI app, the RAG
+retrieval chain, the history-aware RAG chain, the SQL agent, the search agent
+and parallel research mode, and the summarize chain) against the deterministic
+fakes in benchmarks/fakes.py, so no API keys or local model servers are
+needed. Each stage runs in its own process and reports wall-clock p50/p95/p99,
+throughput and the peak RSS of that process.
+
+Usage:
+    python benchmarks/run_benchmarks.py --llm-latency 0.05 --iterations 50
+    python benchmarks/run_benchmarks.py --stages rag_retrieval sql_agent --output before.json
+    python benchmarks/run_benchmarks.py --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+## the apps are plain scripts in folders, so their helper modules are imported by path
+for folder in ("", "RAG-Document", "Langcahin_SQL", "Text Summarization", "search engine with langcahin"):
+    path = os.path.join(REPO_ROOT, folder)
+    if path not in sys.path:
+        sys.path.append(path)
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+## serve.py builds a ChatGroq at import; it is never called in the benchmarks
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+TOPICS = [
+    "Model Context Protocol servers expose tools and resources to LLM clients",
+    "tool poisoning attacks hide malicious instructions in MCP tool descriptions",
+    "retrieval augmented generation grounds answers in retrieved documents",
+    "FAISS performs approximate nearest neighbour search over dense vectors",
+    "prompt injection manipulates the model through untrusted content",
+    "OAuth authorization protects remote MCP servers from unauthorized access",
+    "sandboxing limits what a compromised tool can do on the host",
+    "rate limiting and quotas protect upstream model providers",
+]
+
+STAGES = {}
+
+
+def stage(name):
+    """Register a benchmark stage. The function returns the operation to time, op(i)."""
+    def register(func):
+        STAGES[name] = func
+        return func
+    return register
+
+
+def synthetic_documents(count):
+    from langchain_core.documents import Document
+    return [
+        Document(
+            page_content=" ".join(TOPICS[(i + j) % len(TOPICS)] for j in range(6)) + f" section {i}.",
+            metadata={"source": f"paper-{i % 20}.pdf", "page": i},
+        )
+        for i in range(count)
+    ]
+
+
+@stage("serve_chain")
+def bench_serve_chain(args):
+    import serve
+    from fakes import FakeChatModel
+
+    chain = serve.build_chain(FakeChatModel(latency=args.llm_latency))
+    return lambda i: chain.invoke({"language": "French", "text": f"hello number {i}"})
+
+
+@stage("serve_app")
+def bench_serve_app(args):
+    import httpx
+    import serve
+    from fakes import FakeChatModel
+    from response_cache import ResponseCache
+
+    ## unique texts and an empty cache tier, so every request reaches the model
+    app = serve.create_app(FakeChatModel(latency=args.llm_latency), cache=ResponseCache(maxsize=1))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async def op(i):
+        response = await client.post("/chain/invoke", json={"input": {"language": "French", "text": f"text {i}"}})
+        response.raise_for_status()
+    return op
+
+
+@stage("rag_index_build")
+def bench_rag_index_build(args):
+    from langchain_community.vectorstores import FAISS
+    from fakes import FakeEmbeddings
+
+    docs = synthetic_documents(args.documents)
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    return lambda i: FAISS.from_documents(docs, embeddings)
+
+
+@stage("rag_retrieval")
+def bench_rag_retrieval(args):
+    from langchain_community.vectorstores import FAISS
+    from fakes import FakeChatModel, FakeEmbeddings
+    from rag_chains import build_retrieval_chain
+
+    vectors = FAISS.from_documents(synthetic_documents(args.documents), FakeEmbeddings(latency=args.embed_latency))
+    chain = build_retrieval_chain(FakeChatModel(latency=args.llm_latency), vectors.as_retriever())
+    return lambda i: chain.invoke({"input": f"How do {TOPICS[i % len(TOPICS)].split()[0]} attacks work?"})
+
+
+def _history_rag(args, speculative):
+    from langchain_community.vectorstores import FAISS
+    from fakes import FakeChatModel, FakeEmbeddings
+    from rag_chains import build_conversational_rag_chain
+    from session_store import SQLiteSessionStore
+
+    vectors = FAISS.from_documents(synthetic_documents(args.documents), FakeEmbeddings(latency=args.embed_latency))
+    store = SQLiteSessionStore(path=os.path.join(args.workdir, f"sessions-{speculative}.sqlite"))
+    chain = build_conversational_rag_chain(
+        FakeChatModel(latency=args.llm_latency), vectors.as_retriever(), store.get, speculative=speculative
+    )
+    ## first question, a follow-up that needs rewriting, then a standalone question
+    turns = [
+        "How does tool poisoning affect MCP servers?",
+        "What about its mitigations?",
+        "How does OAuth authorization protect remote MCP servers?",
+    ]
+
+    def op(i):
+        chain.invoke({"input": turns[i % len(turns)]}, config={"configurable": {"session_id": f"s{i // len(turns)}"}})
+    return op
+
+
+@stage("history_rag")
+def bench_history_rag(args):
+    return _history_rag(args, speculative=False)
+
+
+@stage("history_rag_speculative")
+def bench_history_rag_speculative(args):
+    return _history_rag(args, speculative=True)
+
+
+@stage("sql_agent")
+def bench_sql_agent(args):
+    from fakes import FakeChatModel
+    from result_guard import result_bytes_budget
+    from schema_cache import get_database
+    from sql_agent import build_sql_agent
+
+    if args.students_db:
+        ## large fixtures from Langcahin_SQL/load_students.py are only read, so they aren't copied
+        db_path = os.path.abspath(args.students_db)
+    else:
+        db_path = os.path.join(args.workdir, "students.db")
+        shutil.copy(os.path.join(REPO_ROOT, "Langcahin_SQL", "students.db"), db_path)
+    ## same factory as Langcahin_SQL/app.py, so the schema cache and result guard are measured too
+    db = get_database(f"sqlite:///{db_path}", max_bytes=result_bytes_budget(8192))
+    llm = FakeChatModel(latency=args.llm_latency, responses=[
+        "Thought: I should look at the tables.\nAction: sql_db_list_tables\nAction Input: ",
+        "Thought: I should check the schema.\nAction: sql_db_schema\nAction Input: STUDENTS",
+        "Thought: I can count the rows per class.\nAction: sql_db_query\n"
+        "Action Input: SELECT CLASS, COUNT(*) FROM STUDENTS GROUP BY CLASS",
+        "Thought: I now know the final answer\nFinal Answer: Data Science has 2 students, the others 1 each.",
+    ])
+    agent = build_sql_agent(llm, db, verbose=False)
+    return lambda i: agent.invoke({"input": "How many students are there per class?"})
+
+
+def _search_tools(args, cached=False):
+    from fakes import fake_tool
+    from tool_cache import CachedTool, ToolResultCache
+
+    tools = [
+        fake_tool("search", latency=args.tool_latency),
+        fake_tool("wikipedia", latency=args.tool_latency),
+        fake_tool("arxiv", latency=args.tool_latency),
+    ]
+    if cached:
+        cache = ToolResultCache(os.path.join(args.workdir, "tool_cache.sqlite"))
+        tools = [CachedTool.wrap(tool, cache) for tool in tools]
+    return tools
+
+
+@stage("search_agent")
+def bench_search_agent(args):
+    from fakes import FakeChatModel
+    from research import build_search_agent
+
+    llm = FakeChatModel(latency=args.llm_latency, responses=[
+        "Thought: I should search the web.\nAction: search\nAction Input: model context protocol",
+        "Thought: Wikipedia may have more.\nAction: wikipedia\nAction Input: model context protocol",
+        "Thought: Let me check papers.\nAction: arxiv\nAction Input: model context protocol",
+        "Thought: I now know the final answer\nFinal Answer: MCP connects LLM clients to tools.",
+    ])
+    agent = build_search_agent(llm, _search_tools(args))
+    return lambda i: agent.invoke({"input": "What is the Model Context Protocol?"})
+
+
+def _search_parallel(args, cached, queries=None):
+    from fakes import FakeChatModel
+    from research import ParallelResearcher
+
+    researcher = ParallelResearcher(FakeChatModel(latency=args.llm_latency), _search_tools(args, cached=cached))
+
+    async def op(i):
+        ## with `queries` set, questions repeat like popular queries do
+        await researcher.ainvoke(f"What is the Model Context Protocol? ({i % queries if queries else i})")
+    return op
+
+
+@stage("search_parallel")
+def bench_search_parallel(args):
+    return _search_parallel(args, cached=False)
+
+
+@stage("search_parallel_cached")
+def bench_search_parallel_cached(args):
+    return _search_parallel(args, cached=True, queries=5)
+
+
+@stage("search_parallel_sync_timeout")
+def bench_search_parallel_sync_timeout(args):
+    from fakes import FakeChatModel, fake_tool
+    from research import ParallelResearcher
+
+    ## blocking tools like the real ones, and an arxiv call far past its timeout:
+    ## invoke() should return after ~2x tool latency + 1 LLM call, not after the slow tool
+    tools = [
+        fake_tool("search", latency=args.tool_latency, sync=True),
+        fake_tool("wikipedia", latency=args.tool_latency, sync=True),
+        fake_tool("arxiv", latency=args.tool_latency * 10, sync=True),
+    ]
+    researcher = ParallelResearcher(
+        FakeChatModel(latency=args.llm_latency), tools, timeouts={"arxiv": args.tool_latency * 2}
+    )
+    return lambda i: researcher.invoke(f"What is the Model Context Protocol? ({i})")
+
+
+@stage("summarize")
+def bench_summarize(args):
+    from fakes import FakeChatModel
+    from summarizer import build_summarize_chain
+
+    chain = build_summarize_chain(FakeChatModel(latency=args.llm_latency))
+    docs = synthetic_documents(args.documents // 4 or 1)
+    return lambda i: chain.invoke({"input_documents": docs})
+
+
+@stage("summarize_long")
+def bench_summarize_long(args):
+    from fakes import FakeChatModel
+    from summarizer import SummarizationEngine
+
+    ## well past the 8k context, so the engine takes the parallel map-reduce path
+    engine = SummarizationEngine(FakeChatModel(latency=args.llm_latency), context_tokens=8192)
+    docs = synthetic_documents(args.documents)
+
+    async def op(i):
+        await engine.asummarize(docs)
+    return op
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _time_sync(op, iterations, offset):
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        op(offset + i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _time_async(op, iterations, offset, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await op(offset + i)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    return latencies
+
+
+def run_stage(name, args):
+    """Run one stage in the current process and return its summary."""
+    os.makedirs(args.workdir, exist_ok=True)
+    op = STAGES[name](args)
+    is_async = asyncio.iscoroutinefunction(op)
+    iterations = args.build_iterations if name == "rag_index_build" else args.iterations
+
+    if is_async:
+        async def run():
+            await _time_async(op, args.warmup, 0, args.concurrency)
+            start = time.perf_counter()
+            latencies = await _time_async(op, iterations, args.warmup, args.concurrency)
+            return latencies, time.perf_counter() - start
+        latencies, wall = asyncio.run(run())
+    else:
+        _time_sync(op, args.warmup, 0)
+        start = time.perf_counter()
+        latencies = _time_sync(op, iterations, args.warmup)
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "concurrency": args.concurrency if is_async else 1,
+        "wall_s": wall,
+        "throughput_per_s": iterations / wall if wall else 0.0,
+        "mean_ms": 1000 * sum(latencies) / len(latencies),
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+        ## ru_maxrss is in KiB on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def _run_isolated(name, args):
+    """Run a stage in a fresh process so its peak RSS isn't mixed with other stages."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_stage, name, args).result()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(previous_path, results):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)["stages"]
+    print(f"\nCompared with {previous_path}:")
+    for name, current in results["stages"].items():
+        before = previous.get(name)
+        if not before or "p50_ms" not in before or "p50_ms" not in current:
+            continue
+        print(
+            f"  {name:26s} p50 {before['p50_ms']:9.2f} -> {current['p50_ms']:9.2f} ms"
+            f"  p95 {before['p95_ms']:9.2f} -> {current['p95_ms']:9.2f} ms"
+            f"  throughput {before['throughput_per_s']:8.2f} -> {current['throughput_per_s']:8.2f}/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--build-iterations", type=int, default=3, help="iterations of rag_index_build")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent requests for async stages")
+    parser.add_argument("--documents", type=int, default=400, help="synthetic document chunks to index")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="simulated seconds per LLM call")
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="simulated seconds per search tool call")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="simulated seconds per embedding call")
+    parser.add_argument("--students-db", default=None, help="students database for sql_agent (e.g. a 10M-row fixture)")
+    parser.add_argument("--output", default=None, help="JSON results path (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    args.workdir = tempfile.mkdtemp(prefix="genai-bench-")
+    results = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key != "workdir"},
+        },
+        "stages": {},
+    }
+    try:
+        for name in args.stages:
+            try:
+                summary = _run_isolated(name, args)
+            except Exception as e:
+                summary = {"error": f"{type(e).__name__}: {e}"}
+            results["stages"][name] = summary
+            if "error" in summary:
+                print(f"{name:26s} FAILED {summary['error']}")
+            else:
+                print(
+                    f"{name:26s} p50 {summary['p50_ms']:9.2f} ms  p95 {summary['p95_ms']:9.2f} ms"
+                    f"  p99 {summary['p99_ms']:9.2f} ms  {summary['throughput_per_s']:8.2f}/s"
+                    f"  peak RSS {summary['peak_rss_mb']:7.1f} MB"
+                )
+    finally:
+        shutil.rmtree(args.workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(BENCH_DIR, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
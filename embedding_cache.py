@@ -0,0 +1,151 @@
+"""
+Content-addressed embedding cache that wraps any LangChain embedding backend.
+
+Vectors are stored in a local SQLite file keyed on (model name, sha256 of the
+text), so OllamaEmbeddings, HuggingFaceEmbeddings and OpenAIEmbeddings can all
+share one cache file without mixing up their vectors. Only cache misses are
+sent to the backend, in batches, and the least recently used entries are
+evicted once the cache grows past `max_entries`.
+
+Vectors are stored as float32. Freshly embedded vectors are rounded the same
+way before they are returned, so a text gets identical values whether it was a
+cache hit or a miss.
+
+Usage:
+    embeddings = CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text"))
+    FAISS.from_documents(docs, embeddings)
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = "embedding_cache.sqlite"
+
+
+def model_name_of(embeddings):
+    """Best effort name of the model behind an embedding backend."""
+    for attr in ("model", "model_name", "deployment"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            return f"{type(embeddings).__name__}:{value}"
+    return type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the backend for texts it hasn't seen."""
+
+    def __init__(self, backend, path=DEFAULT_CACHE_PATH, max_entries=1_000_000, batch_size=64, model_name=None):
+        self.backend = backend
+        self.model_name = model_name or model_name_of(backend)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        ## upper bound on the row count, so stores don't need a COUNT(*) until the cap may be reached
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def _key(self, text, kind):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}|{kind}|{digest}"
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            ## sqlite limits the number of bound parameters, so look up in slices
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update((key, array("f", blob).tolist()) for key, blob in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _store(self, items):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+            self._count += len(items)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        ## replaced keys and other processes sharing the file make the running count approximate
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            count = self.max_entries
+        self._count = count
+
+    def embed_documents(self, texts):
+        keys = [self._key(text, "doc") for text in texts]
+        cached = self._lookup(list(set(keys)))
+
+        ## identical texts in one call are only embedded once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self._record(len(texts) - len(missing), len(missing))
+
+        missing_items = list(missing.items())
+        for start in range(0, len(missing_items), self.batch_size):
+            batch = missing_items[start:start + self.batch_size]
+            vectors = self.backend.embed_documents([text for _, text in batch])
+            new = [(key, array("f", vector).tolist()) for (key, _), vector in zip(batch, vectors)]
+            self._store(new)
+            cached.update(new)
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text):
+        key = self._key(text, "query")
+        cached = self._lookup([key])
+        if key in cached:
+            self._record(1, 0)
+            return cached[key]
+        self._record(0, 1)
+        vector = array("f", self.backend.embed_query(text)).tolist()
+        self._store([(key, vector)])
+        return vector
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
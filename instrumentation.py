@@ -0,0 +1,372 @@
+"""
+Per-stage latency, token and call-count instrumentation for every chain.
+
+`StageCallbackHandler` is a LangChain callback handler that times the LLM,
+retriever, output parser and tool stages of a run and reads token usage from
+the LLM results. Stages LangChain doesn't report on (PDF loading, splitting,
+embedding) are timed with `handler.stage("loader")` or by wrapping the
+embedding backend in `TimedEmbeddings`. Attach it next to any other handler:
+
+    handler = StageCallbackHandler(app="sql_agent")
+    agent.run(prompt, callbacks=[st_callback, handler])
+    handler.summary()   # per-stage wall time, calls and tokens of this run
+
+For streamed answers, wrap the chunk iterator in `StreamTimer` to also record
+time to first token and tokens per second.
+
+Every event is also added to the process-wide `METRICS`, which renders the
+totals in the Prometheus text format for serve.py's /metrics endpoint. Setting
+GENAI_METRICS_JSONL to a path also writes every event to that JSONL file, from
+a background thread and rotated past GENAI_METRICS_JSONL_MAX_BYTES (10 MB by
+default), so recording never blocks on disk.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class JSONLSink:
+    """
+    Appends one JSON object per event to a local file, off the caller's thread.
+
+    `write` only queues the event; a daemon thread writes queued events in
+    batches and rotates the file to `path.1` ... `path.<backups>` once it is
+    larger than `max_bytes`. Events are dropped (and counted) if the queue is full.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=3, max_queue=10_000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._drain, name="metrics-jsonl", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=2.0):
+        """Flush what is queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = "".join(json.dumps(event, default=str) + "\n" for event in batch if event is not None)
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    size = f.tell()
+                if size > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                self.dropped += len(batch)
+            if stop:
+                return
+
+
+class StageMetrics:
+    """Process-wide totals per (app, stage), optionally mirrored to a sink."""
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, event):
+        key = (event["app"], event["stage"])
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = {
+                    "calls": 0, "errors": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                }
+            totals["calls"] += 1
+            totals["errors"] += int(bool(event.get("error")))
+            totals["seconds"] += event["seconds"]
+            totals["prompt_tokens"] += event.get("prompt_tokens", 0)
+            totals["completion_tokens"] += event.get("completion_tokens", 0)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if event["seconds"] <= bound:
+                    totals["buckets"][i] += 1
+        if self.sink is not None:
+            self.sink.write(event)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(totals, buckets=list(totals["buckets"])) for key, totals in self._totals.items()}
+
+    def render_prometheus(self, extra=None):
+        """
+        Totals in the Prometheus text exposition format.
+
+        `extra` maps a name prefix to a dict of numbers (e.g. the serve.py cache
+        metrics); each numeric value is exported as a gauge genai_<prefix>_<key>.
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("genai_stage_calls_total", "counter", "Calls per pipeline stage.")
+        for (app, stage), totals in sorted(snapshot.items()):
+            lines.append(f'genai_stage_calls_total{{app="{app}",stage="{stage}"}} {totals["calls"]}')
+        family("genai_stage_errors_total", "counter", "Failed calls per pipeline stage.")
+        for (app, stage), totals in sorted(snapshot.items()):
+            lines.append(f'genai_stage_errors_total{{app="{app}",stage="{stage}"}} {totals["errors"]}')
+        family("genai_stage_tokens_total", "counter", "LLM tokens per pipeline stage.")
+        for (app, stage), totals in sorted(snapshot.items()):
+            for kind in ("prompt", "completion"):
+                lines.append(
+                    f'genai_stage_tokens_total{{app="{app}",stage="{stage}",kind="{kind}"}} {totals[kind + "_tokens"]}'
+                )
+        family("genai_stage_seconds", "histogram", "Wall time per pipeline stage call.")
+        for (app, stage), totals in sorted(snapshot.items()):
+            labels = f'app="{app}",stage="{stage}"'
+            for bound, count in zip(LATENCY_BUCKETS, totals["buckets"]):
+                lines.append(f'genai_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'genai_stage_seconds_bucket{{{labels},le="+Inf"}} {totals["calls"]}')
+            lines.append(f"genai_stage_seconds_sum{{{labels}}} {totals['seconds']}")
+            lines.append(f"genai_stage_seconds_count{{{labels}}} {totals['calls']}")
+
+        for prefix, values in (extra or {}).items():
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"genai_{prefix}_{key}"
+                family(name, "gauge", f"{prefix} {key}.")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+## opt-in: events only go to disk when GENAI_METRICS_JSONL names a file
+_jsonl_path = os.getenv("GENAI_METRICS_JSONL")
+METRICS = StageMetrics(sink=JSONLSink(
+    _jsonl_path, max_bytes=int(os.getenv("GENAI_METRICS_JSONL_MAX_BYTES", 10 * 1024 * 1024))
+) if _jsonl_path else None)
+
+
+class StageCallbackHandler(BaseCallbackHandler):
+    """Records wall time, tokens and call counts per stage for the runs it is attached to."""
+
+    def __init__(self, app="default", metrics=METRICS, keep_events=True):
+        self.app = app
+        self.metrics = metrics
+        ## long-lived handlers (e.g. in serve.py) only feed METRICS, so memory stays flat
+        self.keep_events = keep_events
+        self.events = []
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, error=None, prompt_tokens=0, completion_tokens=0):
+        event = {
+            "ts": time.time(),
+            "app": self.app,
+            "stage": stage,
+            "seconds": seconds,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        if error is not None:
+            event["error"] = f"{type(error).__name__}: {error}"
+        if self.keep_events:
+            with self._lock:
+                self.events.append(event)
+        if self.metrics is not None:
+            self.metrics.record(event)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code as stage `name`, e.g. `with handler.stage("loader"):`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.record(name, time.perf_counter() - start, error=e)
+            raise
+        self.record(name, time.perf_counter() - start)
+
+    def summary(self):
+        """Totals per stage for the events seen by this handler."""
+        with self._lock:
+            events = list(self.events)
+        summary = {}
+        for event in events:
+            totals = summary.setdefault(event["stage"], {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0})
+            totals["calls"] += 1
+            totals["seconds"] += event["seconds"]
+            totals["prompt_tokens"] += event["prompt_tokens"]
+            totals["completion_tokens"] += event["completion_tokens"]
+        return summary
+
+    def rows(self):
+        """`summary()` as a list of rows, e.g. for st.table."""
+        return [
+            {"stage": stage, **totals, "seconds": round(totals["seconds"], 3)}
+            for stage, totals in self.summary().items()
+        ]
+
+    ## run bookkeeping
+
+    def _start(self, run_id, stage):
+        with self._lock:
+            self._runs[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id, error=None, **tokens):
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is not None:
+            stage, start = started
+            self.record(stage, time.perf_counter() - start, error=error, **tokens)
+
+    ## LangChain callbacks
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, **token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retriever")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        ## output parsers report through the chain callbacks
+        name = kwargs.get("name") or (serialized or {}).get("name") or ""
+        if "Parser" in name:
+            self._start(run_id, "parser")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+def token_usage(response):
+    """Prompt/completion token counts of an LLMResult, from llm_output or the messages' usage metadata."""
+    usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage") or {}
+    if usage:
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0) or 0,
+            "completion_tokens": usage.get("completion_tokens", 0) or 0,
+        }
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper that records every backend call as the "embedder" stage."""
+
+    def __init__(self, backend, handler):
+        self.backend = backend
+        self.handler = handler
+
+    def embed_documents(self, texts):
+        with self.handler.stage("embedder"):
+            return self.backend.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self.handler.stage("embedder"):
+            return self.backend.embed_query(text)
+
+
+class StreamTimer:
+    """
+    Passes a stream of chunks through while timing it, e.g. `st.write_stream(StreamTimer(chain.stream(...)))`.
+
+    Once the stream is exhausted, `stats()` has the time to first token and the
+    generation rate, and both are recorded on `handler` as the "first_token"
+    and "generation" stages. Each non-empty chunk counts as one token, which
+    matches how Ollama and most providers stream.
+    """
+
+    def __init__(self, chunks, handler=None):
+        self.chunks = chunks
+        self.handler = handler
+        self.tokens = 0
+        self.first_token_s = None
+        self.seconds = None
+
+    def __iter__(self):
+        start = time.perf_counter()
+        for chunk in self.chunks:
+            if chunk and self.first_token_s is None:
+                self.first_token_s = time.perf_counter() - start
+                if self.handler is not None:
+                    self.handler.record("first_token", self.first_token_s)
+            self.tokens += bool(chunk)
+            yield chunk
+        self.seconds = time.perf_counter() - start
+        if self.handler is not None:
+            self.handler.record("generation", self.seconds, completion_tokens=self.tokens)
+
+    def stats(self):
+        generating = (self.seconds or 0.0) - (self.first_token_s or 0.0)
+        return {
+            "first_token_s": self.first_token_s,
+            "seconds": self.seconds,
+            "tokens": self.tokens,
+            ## rate after the first token, so prompt processing doesn't count against it
+            "tokens_per_s": (self.tokens - 1) / generating if self.tokens > 1 and generating > 0 else 0.0,
+        }
@@ -0,0 +1,116 @@
+"""
+Server-side micro-batching for LangChain runnables.
+
+`MicroBatcher` wraps a runnable (e.g. the `/chain` translation chain in
+serve.py). Concurrent `ainvoke` calls are collected for up to `max_wait_ms`
+or until `max_batch_size` inputs are waiting, then sent through the wrapped
+runnable's `abatch` in one go, each input with its own config (callbacks,
+tags, configurable), so per-request handlers and tracing still fire. Every
+caller still gets its own result (or its own exception back).
+
+Usage:
+    batched = MicroBatcher(prompt | model | parser, max_batch_size=16, max_wait_ms=5)
+    add_routes(app, batched, path="/chain")
+"""
+import asyncio
+import time
+
+from langchain_core.runnables import Runnable
+
+
+class MicroBatcher(Runnable):
+    """Runnable that groups concurrent async calls into batches for the wrapped runnable."""
+
+    def __init__(self, runnable, max_batch_size=16, max_wait_ms=5.0):
+        self.runnable = runnable
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+        ## in-flight batch tasks; the loop only keeps weak references to tasks
+        self._tasks = set()
+        ## metrics
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.batch_size_counts = {}
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        return self.runnable.OutputType
+
+    def get_input_schema(self, config=None):
+        return self.runnable.get_input_schema(config)
+
+    def get_output_schema(self, config=None):
+        return self.runnable.get_output_schema(config)
+
+    def invoke(self, input, config=None, **kwargs):
+        ## sync callers have no event loop to wait on, so they go straight through
+        return self.runnable.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((input, config, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        waits = [now - queued_at for _, _, _, queued_at in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+        self.total_queue_wait += sum(waits)
+        self.max_queue_wait = max(self.max_queue_wait, max(waits))
+
+        try:
+            results = await self.runnable.abatch(
+                [input for input, _, _, _ in batch],
+                config=[config for _, config, _, _ in batch],
+                return_exceptions=True,
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, _, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def metrics(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "queued": len(self._pending),
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.items if self.items else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_queue_wait,
+        }
@@ -0,0 +1,226 @@
+"""
+Response cache for deterministic LangChain runnables (e.g. the serve.py translation chain).
+
+`ResponseCache` is an in-process LRU with a TTL, optionally backed by a SQLite
+file so entries survive restarts. `CachedRunnable` puts it in front of a
+runnable for `invoke`, `ainvoke`, `batch` and `abatch`: hits are answered
+locally, only misses reach the wrapped runnable, and concurrent identical
+requests share a single in-flight call.
+
+Usage:
+    cached = CachedRunnable(chain, ResponseCache(maxsize=10_000, ttl=3600, path="responses.sqlite"))
+    add_routes(app, cached, path="/chain")
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.runnables import Runnable
+
+
+def default_key(input):
+    """sha256 of the input serialized as sorted JSON."""
+    return hashlib.sha256(json.dumps(input, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache in memory with an optional on-disk tier."""
+
+    def __init__(self, maxsize=10_000, ttl=3600, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            self._conn.commit()
+
+    def get(self, key):
+        """Return (True, value) on a hit and (False, None) on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires >= now:
+                    self._items.move_to_end(key)
+                    self.memory_hits += 1
+                    return True, value
+                del self._items[key]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires FROM responses WHERE key = ? AND expires >= ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.disk_hits += 1
+                    return True, value
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires),
+                )
+                self._conn.commit()
+
+    def _remember(self, key, value, expires):
+        self._items[key] = (expires, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def metrics(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "size": len(self._items),
+        }
+
+
+class CachedRunnable(Runnable):
+    """Runnable that answers repeated inputs from a ResponseCache."""
+
+    def __init__(self, runnable, cache, key_fn=default_key):
+        self.runnable = runnable
+        self.cache = cache
+        self.key_fn = key_fn
+        self.shared_calls = 0
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._async_in_flight = {}
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        return self.runnable.OutputType
+
+    def get_input_schema(self, config=None):
+        return self.runnable.get_input_schema(config)
+
+    def get_output_schema(self, config=None):
+        return self.runnable.get_output_schema(config)
+
+    def invoke(self, input, config=None, **kwargs):
+        key = self.key_fn(input)
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            self.shared_calls += 1
+            return future.result()
+        try:
+            value = self.runnable.invoke(input, config, **kwargs)
+            self.cache.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        key = self.key_fn(input)
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        future = self._async_in_flight.get(key)
+        if future is not None:
+            self.shared_calls += 1
+            return await asyncio.shield(future)
+        future = self._async_in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await self.runnable.ainvoke(input, config, **kwargs)
+            self.cache.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            ## the exception is re-raised here, so don't warn about it never being retrieved
+            future.exception()
+            raise
+        finally:
+            del self._async_in_flight[key]
+
+    def _split(self, inputs):
+        """Look every input up; return the results so far and the unique misses by key."""
+        keys = [self.key_fn(input) for input in inputs]
+        results, misses = {}, {}
+        for i, (key, input) in enumerate(zip(keys, inputs)):
+            if key in results or key in misses:
+                continue
+            hit, value = self.cache.get(key)
+            if hit:
+                results[key] = value
+            else:
+                misses[key] = (i, input)
+        return keys, results, misses
+
+    @staticmethod
+    def _miss_args(misses, config):
+        inputs = [input for _, input in misses.values()]
+        if isinstance(config, list):
+            config = [config[i] for i, _ in misses.values()]
+        return inputs, config
+
+    def _collect(self, keys, results, misses, outputs, return_exceptions):
+        for key, output in zip(misses, outputs):
+            if not isinstance(output, Exception):
+                self.cache.put(key, output)
+            results[key] = output
+        values = [results[key] for key in keys]
+        if not return_exceptions:
+            for value in values:
+                if isinstance(value, Exception):
+                    raise value
+        return values
+
+    def batch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        keys, results, misses = self._split(inputs)
+        outputs = []
+        if misses:
+            outputs = self.runnable.batch(*self._miss_args(misses, config), return_exceptions=True, **kwargs)
+        return self._collect(keys, results, misses, outputs, return_exceptions)
+
+    async def abatch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        keys, results, misses = self._split(inputs)
+        outputs = []
+        if misses:
+            outputs = await self.runnable.abatch(*self._miss_args(misses, config), return_exceptions=True, **kwargs)
+        return self._collect(keys, results, misses, outputs, return_exceptions)
+
+    def metrics(self):
+        return {**self.cache.metrics(), "shared_in_flight": self.shared_calls}
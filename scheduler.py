@@ -0,0 +1,306 @@
+"""
+Admission control for upstream model calls.
+
+`UpstreamScheduler` caps how many calls are in flight to the model provider
+(sync and async callers share one `SlotLimiter`), keeps a bounded wait queue
+with a per-request deadline, rejects immediately with `OverloadedError` when
+the queue is full, and retries rate-limited (429) calls with jittered
+exponential backoff. `ScheduledRunnable` routes a runnable (e.g. ChatGroq in
+serve.py) through it and takes each request's deadline from its config
+(`configurable["deadline"]`, an absolute `time.time()` value).
+
+Under overload requests are turned away early (serve.py maps OverloadedError
+to a 503) instead of every request slowing down together.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+from langchain_core.runnables import Runnable
+
+
+class OverloadedError(Exception):
+    """The wait queue is full or the request's deadline passed before a slot was free."""
+
+
+def is_rate_limited(error):
+    """True if `error` is an HTTP 429 from the provider, by status code or by exception type."""
+    for source in (error, getattr(error, "response", None)):
+        if getattr(source, "status_code", None) == 429 or getattr(source, "status", None) == 429:
+            return True
+    ## groq.RateLimitError, openai.RateLimitError, ...
+    return any(cls.__name__ == "RateLimitError" for cls in type(error).__mro__)
+
+
+def _grant(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class _Waiter:
+    __slots__ = ("granted", "event", "loop", "future")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.granted = False
+        self.event = event
+        self.loop = loop
+        self.future = future
+
+
+class SlotLimiter:
+    """
+    Counting semaphore shared by threads and event loops.
+
+    A released slot is handed straight to the oldest waiter, whether it is a
+    thread or a coroutine, so sync and async callers together never exceed
+    `slots` and are served in arrival order.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._free = slots
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            return False
+
+    def _settle(self, waiter):
+        """True if `waiter` got a slot, otherwise take it out of the queue."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def acquire(self, timeout):
+        waiter = _Waiter(event=threading.Event())
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+        waiter.event.wait(timeout)
+        return self._settle(waiter)
+
+    async def aacquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop=loop, future=loop.create_future())
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            ## a slot handed over at the same moment must not leak
+            if self._settle(waiter):
+                self.release()
+            raise
+        return self._settle(waiter)
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        if waiter.future is not None:
+            waiter.loop.call_soon_threadsafe(_grant, waiter.future)
+        else:
+            waiter.event.set()
+
+
+class UpstreamScheduler:
+    """
+    Args:
+        max_in_flight: max concurrent upstream calls
+        max_queue: max requests waiting for a slot before new ones are rejected
+        deadline: seconds a request may wait for a slot
+        max_retries: retries of a rate-limited call
+        backoff_base, backoff_max: bounds (seconds) of the jittered exponential backoff
+    """
+
+    def __init__(self, max_in_flight=8, max_queue=64, deadline=10.0, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._slots = SlotLimiter(max_in_flight)
+        self._lock = threading.Lock()
+        ## metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.retries = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _enqueue(self):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise OverloadedError(f"upstream queue is full ({self.max_queue} waiting)")
+            self.waiting += 1
+
+    def _admit_now(self):
+        with self._lock:
+            self.admitted += 1
+            self.in_flight += 1
+
+    def _dequeue(self, started, admitted):
+        wait = time.perf_counter() - started
+        with self._lock:
+            self.waiting -= 1
+            if admitted:
+                self.admitted += 1
+                self.in_flight += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            else:
+                self.timed_out += 1
+
+    def _done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _backoff(self, attempt):
+        ## "full jitter": uniform between 0 and the capped exponential delay
+        with self._lock:
+            self.retries += 1
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _timeout(self, deadline):
+        """Seconds this request may wait: its own remaining time, capped by the scheduler's deadline."""
+        if deadline is None:
+            return self.deadline
+        if deadline <= 0:
+            with self._lock:
+                self.timed_out += 1
+            raise OverloadedError("request deadline already passed")
+        return min(deadline, self.deadline)
+
+    async def _aacquire(self, deadline):
+        timeout = self._timeout(deadline)
+        if self._slots.try_acquire():
+            ## a slot is free: no queueing
+            self._admit_now()
+            return
+        self._enqueue()
+        started = time.perf_counter()
+        try:
+            admitted = await self._slots.aacquire(timeout)
+        except BaseException:
+            self._dequeue(started, admitted=False)
+            raise
+        self._dequeue(started, admitted=admitted)
+        if not admitted:
+            raise OverloadedError("deadline passed while waiting for an upstream slot")
+
+    def _acquire(self, deadline):
+        timeout = self._timeout(deadline)
+        if self._slots.try_acquire():
+            self._admit_now()
+            return
+        self._enqueue()
+        started = time.perf_counter()
+        admitted = self._slots.acquire(timeout)
+        self._dequeue(started, admitted=admitted)
+        if not admitted:
+            raise OverloadedError("deadline passed while waiting for an upstream slot")
+
+    async def arun(self, call, deadline=None):
+        """Await `call()` once a slot is free, retrying on 429.
+
+        `deadline` is the seconds this request may still wait for a slot (None: the scheduler's default).
+        """
+        await self._aacquire(deadline)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await call()
+                except Exception as e:
+                    if attempt == self.max_retries or not is_rate_limited(e):
+                        raise
+                    await asyncio.sleep(self._backoff(attempt))
+        finally:
+            self._done()
+            self._slots.release()
+
+    def run(self, call, deadline=None):
+        """Blocking version of `arun` for sync callers."""
+        self._acquire(deadline)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return call()
+                except Exception as e:
+                    if attempt == self.max_retries or not is_rate_limited(e):
+                        raise
+                    time.sleep(self._backoff(attempt))
+        finally:
+            self._done()
+            self._slots.release()
+
+    def metrics(self):
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "retries": self.retries,
+            "avg_wait_ms": 1000 * self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+
+
+class ScheduledRunnable(Runnable):
+    """Runnable whose every call goes through an UpstreamScheduler."""
+
+    def __init__(self, runnable, scheduler):
+        self.runnable = runnable
+        self.scheduler = scheduler
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        return self.runnable.OutputType
+
+    def get_input_schema(self, config=None):
+        return self.runnable.get_input_schema(config)
+
+    def get_output_schema(self, config=None):
+        return self.runnable.get_output_schema(config)
+
+    @staticmethod
+    def remaining(config):
+        """Seconds left until the request's `configurable["deadline"]` (absolute time.time()), or None."""
+        deadline = ((config or {}).get("configurable") or {}).get("deadline")
+        return None if deadline is None else float(deadline) - time.time()
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.scheduler.run(lambda: self.runnable.invoke(input, config, **kwargs), self.remaining(config))
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self.scheduler.arun(
+            lambda: self.runnable.ainvoke(input, config, **kwargs), self.remaining(config)
+        )
@@ -1,21 +1,41 @@
 import streamlit as st
 from langchain_groq import ChatGroq
-from langchain_community.utilities import ArxivAPIWrapper,WikipediaAPIWrapper
-from langchain_community.tools import ArxivQueryRun, WikipediaQueryRun,DuckDuckGoSearchRun 
-from langchain.agents import initialize_agent, AgentType
 from langchain.callbacks import StreamlitCallbackHandler
 from dotenv import load_dotenv
 import os 
+import sys
+## shared helpers (instrumentation, ...) live in the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import StageCallbackHandler
+from research import ParallelResearcher, build_search_agent, build_tools
+from tool_cache import CachedTool, ToolResultCache
 
-## wikipedia api wrapper
-api_wrapper_wiki = WikipediaAPIWrapper(top_k_results=1,content_length=1000)
-wiki= WikipediaQueryRun(api_wrapper=api_wrapper_wiki)
 
-## arxiv api wrapper
-api_wrapper_arxiv = ArxivAPIWrapper(top_k_results=1,content_length=1000)
-arxiv = ArxivQueryRun(api_wrapper=api_wrapper_arxiv)
+@st.cache_resource
+def get_tool_cache():
+    """Results of repeated lookups are served from disk until their per-tool TTL runs out."""
+    return ToolResultCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_cache.sqlite"))
 
-search = DuckDuckGoSearchRun(name="search")
+
+@st.cache_resource
+def get_tools():
+    """Wikipedia, Arxiv and DuckDuckGo tools, built once per process."""
+    return [CachedTool.wrap(tool, get_tool_cache()) for tool in build_tools()]
+
+
+@st.cache_resource
+def get_llm(api_key):
+    return ChatGroq(groq_api_key=api_key, model_name="llama3-8b-8192", streaming=True)
+
+
+@st.cache_resource
+def get_search_agent(api_key):
+    return build_search_agent(get_llm(api_key), get_tools())
+
+
+@st.cache_resource
+def get_researcher(api_key):
+    return ParallelResearcher(get_llm(api_key), get_tools())
 
 st.title("Search Engine with LangChain ")
 """ IN this app, you can search for information using Wikipedia, Arxiv, and DuckDuckGo.i have also used streamlitcallback handler to stream the response from the LLM.
@@ -27,6 +47,10 @@ st.title("Search Engine with LangChain ")
 ## slider bar
 st.sidebar.title("Settings")
 api_key = st.sidebar.text_input("Enter your Groq API Key", type="password") 
+## parallel research: all tools at once + one LLM call, instead of one LLM round trip per tool
+mode = st.sidebar.radio("Mode", ["Parallel research", "Agent (step by step)"])
+with st.sidebar.expander("Tool cache"):
+    st.json(get_tool_cache().metrics())
 
 if "messages" not in st.session_state:
     st.session_state["messages"] = [
@@ -41,17 +65,22 @@ for msg in st.session_state["messages"]:
 if prompt:=st.chat_input(placeholder="What is Machine learning?"):
     st.session_state["messages"].append({"role":"user", "content":prompt})
     st.chat_message("user").write(prompt)
-    llm= ChatGroq(
-        groq_api_key=api_key,
-        model_name="llama3-8b-8192",streaming=True)
-    tools = [search, wiki, arxiv]
-    
-    
-    search_agent = initialize_agent(tools=tools,llm=llm,agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,handle_parsing_errors=True)
     
     with st.chat_message("assistant"):
-        st_cb = StreamlitCallbackHandler(st.container(),expand_new_thoughts=False)
-        response= search_agent.run(prompt,callbacks=[st_cb])
+        handler = StageCallbackHandler(app="search_engine")
+        if mode == "Parallel research":
+            response, findings = get_researcher(api_key).invoke(prompt, callbacks=[handler])
+            with st.expander("Sources"):
+                for finding in findings:
+                    status = "ok" if finding["ok"] else finding["error"]
+                    st.markdown(f"**{finding['tool']}** ({finding['seconds']:.2f}s, {status})")
+                    if finding["ok"]:
+                        st.text(finding["result"])
+        else:
+            st_cb = StreamlitCallbackHandler(st.container(),expand_new_thoughts=False)
+            response= get_search_agent(api_key).run(prompt,callbacks=[st_cb, handler])
         st.session_state.messages.append({"role":"assistant","content":response})
         st.write(response)
+        with st.expander("Stage timings"):
+            st.table(handler.rows())
         
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Search tools, the search agent and a parallel research mode, kept free of
+Streamlit so Search_engine.py and the offline benchmarks share them.
+
+The ZERO_SHOT_REACT agent calls `search`, `wiki` and `arxiv` one after
+another with an LLM round trip between each call. `ParallelResearcher` sends
+the question to every tool at once with asyncio (each with its own timeout)
+and answers from the combined findings in a single LLM call, so latency is
+max(tool latency) + 1 LLM call instead of the sum.
+
+The real tools are synchronous. Left to `BaseTool.ainvoke` they would run on
+the event loop's default executor, which `asyncio.run` waits for on exit, so
+a hung tool would hold `invoke` past its timeout. Synchronous tools therefore
+run on `TOOL_EXECUTOR`, a dedicated pool nobody waits for: a tool that times
+out finishes (or hangs) in the background while the answer goes out.
+
+Tools are plain LangChain tools passed in by the caller, so tests and
+benchmarks can swap them for local stubs (see benchmarks/fakes.py `fake_tool`).
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.agents import AgentType, initialize_agent
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+
+## seconds each tool may take in parallel mode before its findings are dropped
+DEFAULT_TIMEOUTS = {"search": 8.0, "wikipedia": 8.0, "arxiv": 10.0}
+## synchronous tool calls; sized so a few hung calls don't starve the next requests
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="research-tool")
+
+research_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a research assistant. Answer the user's question using the findings "
+            "below from web search, Wikipedia and Arxiv. Prefer the findings over your own "
+            "knowledge, mention which source an answer comes from, and say so if the findings "
+            "don't contain the answer.\n\n{findings}",
+        ),
+        ("human", "{question}"),
+    ]
+)
+
+
+def build_tools():
+    """DuckDuckGo, Wikipedia and Arxiv tools with the app's wrapper settings."""
+    from langchain_community.tools import ArxivQueryRun, DuckDuckGoSearchRun, WikipediaQueryRun
+    from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper
+
+    ## wikipedia api wrapper
+    api_wrapper_wiki = WikipediaAPIWrapper(top_k_results=1, content_length=1000)
+    wiki = WikipediaQueryRun(api_wrapper=api_wrapper_wiki)
+
+    ## arxiv api wrapper
+    api_wrapper_arxiv = ArxivAPIWrapper(top_k_results=1, content_length=1000)
+    arxiv = ArxivQueryRun(api_wrapper=api_wrapper_arxiv)
+
+    search = DuckDuckGoSearchRun(name="search")
+    return [search, wiki, arxiv]
+
+
+def build_search_agent(llm, tools):
+    """ZERO_SHOT_REACT agent over `tools`."""
+    return initialize_agent(
+        tools=tools, llm=llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, handle_parsing_errors=True
+    )
+
+
+def has_native_async(tool):
+    """True if the tool implements its own coroutine instead of BaseTool's run-in-executor fallback."""
+    if isinstance(tool, (Tool, StructuredTool)):
+        return tool.coroutine is not None
+    return type(tool)._arun is not BaseTool._arun
+
+
+async def ainvoke_tool(tool, query, config=None):
+    """`tool.ainvoke`, except that synchronous tools run on TOOL_EXECUTOR (with the caller's contextvars)."""
+    if has_native_async(tool):
+        return await tool.ainvoke(query, config=config)
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, tool.invoke, query, config=config)
+    return await asyncio.get_running_loop().run_in_executor(TOOL_EXECUTOR, call)
+
+
+async def _run_tool(tool, query, timeout, callbacks):
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(ainvoke_tool(tool, query, config={"callbacks": callbacks}), timeout)
+        return {"tool": tool.name, "ok": True, "seconds": time.perf_counter() - start, "result": str(result)}
+    except asyncio.TimeoutError:
+        error = f"timed out after {timeout:g}s"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"tool": tool.name, "ok": False, "seconds": time.perf_counter() - start, "error": error}
+
+
+async def gather_findings(query, tools, timeouts=None, default_timeout=10.0, callbacks=None):
+    """Run every tool on `query` concurrently; one dict per tool with its result or error and wall time."""
+    timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    return await asyncio.gather(
+        *(_run_tool(tool, query, timeouts.get(tool.name, default_timeout), callbacks) for tool in tools)
+    )
+
+
+def format_findings(findings):
+    """Findings as prompt text; failed or timed-out tools are listed as unavailable."""
+    parts = []
+    for finding in findings:
+        body = finding["result"] if finding["ok"] else f"(unavailable: {finding['error']})"
+        parts.append(f"## {finding['tool']}\n{body}")
+    return "\n\n".join(parts)
+
+
+class ParallelResearcher:
+    """All tools at once, then one LLM call over their combined findings."""
+
+    def __init__(self, llm, tools, timeouts=None):
+        self.tools = list(tools)
+        self.timeouts = timeouts
+        self.chain = research_prompt | llm | StrOutputParser()
+
+    async def ainvoke(self, question, callbacks=None):
+        """Return (answer, findings)."""
+        findings = await gather_findings(question, self.tools, self.timeouts, callbacks=callbacks)
+        answer = await self.chain.ainvoke(
+            {"question": question, "findings": format_findings(findings)}, config={"callbacks": callbacks}
+        )
+        return answer, findings
+
+    def invoke(self, question, callbacks=None):
+        return asyncio.run(self.ainvoke(question, callbacks=callbacks))
@@ -0,0 +1,202 @@
+"""
+TTL disk cache for the search engine's external tools.
+
+`CachedTool` wraps a LangChain tool (DuckDuckGo, Wikipedia, Arxiv, or a local
+stub) and answers repeated lookups from a `ToolResultCache` instead of the
+network. Entries are keyed on (tool name, normalized query, API wrapper
+parameters such as top_k_results and content_length), expire after a per-tool
+TTL (papers change rarely, web results often) and the least recently used
+entries are evicted once the cache file holds more than `max_bytes` of results.
+Failures and empty results are never cached, including the ones the API
+wrappers return as text instead of raising (see `is_cacheable`).
+
+Usage:
+    cache = ToolResultCache("tool_cache.sqlite")
+    tools = [CachedTool.wrap(tool, cache) for tool in build_tools()]
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from langchain_core.tools import BaseTool
+
+from research import ainvoke_tool
+
+DEFAULT_TOOL_CACHE_PATH = "tool_cache.sqlite"
+## seconds a result stays fresh, per tool name
+DEFAULT_TTLS = {
+    "arxiv": 7 * 24 * 3600,
+    "wikipedia": 24 * 3600,
+    "search": 15 * 60,
+}
+DEFAULT_TTL = 3600
+## replies the wrappers return instead of raising: ArxivAPIWrapper reports errors as
+## "Arxiv exception: ...", and the wrappers answer "No good ... Result was found" for nothing found
+_UNCACHEABLE_PREFIXES = ("arxiv exception", "no good ")
+
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+
+def wrapper_params(tool):
+    """Scalar settings of the tool's API wrapper (top_k_results, content_length, region, ...)."""
+    wrapper = getattr(tool, "api_wrapper", None)
+    if wrapper is None:
+        return {}
+    return {
+        key: value for key, value in sorted(vars(wrapper).items())
+        if not key.startswith("_") and isinstance(value, (str, int, float, bool, type(None)))
+    }
+
+
+def is_cacheable(value):
+    """False for empty results and for errors a tool returned as text."""
+    text = str(value).strip()
+    return bool(text) and not text.lower().startswith(_UNCACHEABLE_PREFIXES)
+
+
+def tool_cache_key(tool, query):
+    payload = json.dumps([tool.name, normalize_query(query), wrapper_params(tool)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    SQLite-backed tool results with per-tool TTLs and size-bounded LRU eviction.
+
+    Args:
+        path: SQLite file shared by all tools
+        ttls: seconds per tool name, merged over DEFAULT_TTLS
+        default_ttl: seconds for tools without an entry in `ttls`
+        max_bytes: total size of stored results before LRU eviction
+    """
+
+    def __init__(self, path=DEFAULT_TOOL_CACHE_PATH, ttls=None, default_ttl=DEFAULT_TTL, max_bytes=50 * 1024 * 1024):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_results ("
+            " key TEXT PRIMARY KEY, tool TEXT NOT NULL, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tool_results_last_used ON tool_results(last_used)")
+        self._conn.commit()
+        (self._bytes,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tool_results").fetchone()
+
+    def ttl_for(self, tool_name):
+        return self.ttls.get(tool_name, self.default_ttl)
+
+    def _count(self, tool_name, outcome):
+        counts = self._counts.setdefault(tool_name, {"hits": 0, "misses": 0, "expired": 0})
+        counts[outcome] += 1
+
+    def get(self, tool_name, key):
+        """Return (True, value) for a fresh entry and (False, None) otherwise."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, created FROM tool_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(tool_name, "misses")
+                return False, None
+            value, size, created = row
+            if created + self.ttl_for(tool_name) < now:
+                self._conn.execute("DELETE FROM tool_results WHERE key = ?", (key,))
+                self._conn.commit()
+                self._bytes -= size
+                self._count(tool_name, "expired")
+                return False, None
+            self._conn.execute("UPDATE tool_results SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._count(tool_name, "hits")
+            return True, value
+
+    def put(self, tool_name, key, value):
+        value = str(value)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM tool_results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_results (key, tool, value, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool_name, value, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        ## least recently used first, until the cache is back under 90% of max_bytes
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM tool_results ORDER BY last_used").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= target:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM tool_results WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def metrics(self):
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()
+            per_tool = {}
+            for tool_name, counts in self._counts.items():
+                lookups = sum(counts.values())
+                per_tool[tool_name] = {**counts, "hit_rate": counts["hits"] / lookups if lookups else 0.0}
+        hits = sum(counts["hits"] for counts in per_tool.values())
+        lookups = sum(counts["hits"] + counts["misses"] + counts["expired"] for counts in per_tool.values())
+        return {
+            "entries": entries,
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "tools": per_tool,
+        }
+
+
+class CachedTool(BaseTool):
+    """A tool that answers from a ToolResultCache before calling the wrapped tool."""
+
+    tool: Any
+    cache: Any
+
+    @classmethod
+    def wrap(cls, tool, cache):
+        return cls(
+            name=tool.name, description=tool.description, args_schema=tool.args_schema, tool=tool, cache=cache
+        )
+
+    def _run(self, query, run_manager=None, **kwargs):
+        key = tool_cache_key(self.tool, query)
+        hit, value = self.cache.get(self.name, key)
+        if hit:
+            return value
+        ## raised or returned errors are not cached, so a flaky upstream is retried next time
+        value = self.tool.run(query, callbacks=run_manager.get_child() if run_manager else None)
+        if is_cacheable(value):
+            self.cache.put(self.name, key, value)
+        return value
+
+    async def _arun(self, query, run_manager=None, **kwargs):
+        key = tool_cache_key(self.tool, query)
+        hit, value = self.cache.get(self.name, key)
+        if hit:
+            return value
+        ## a synchronous wrapped tool runs on research.TOOL_EXECUTOR, not on the loop's default executor
+        callbacks = run_manager.get_child() if run_manager else None
+        value = await ainvoke_tool(self.tool, query, config={"callbacks": callbacks})
+        if is_cacheable(value):
+            self.cache.put(self.name, key, value)
+        return value
@@ -1,14 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers  import StrOutputParser
 from langchain_groq import ChatGroq
-import os 
+import os
+import time
 from langserve import add_routes
-from dotenv import load_dotenv 
+from dotenv import load_dotenv
+from microbatch import MicroBatcher
+from response_cache import CachedRunnable, ResponseCache
+from scheduler import OverloadedError, ScheduledRunnable, UpstreamScheduler
+from instrumentation import METRICS, StageCallbackHandler
 load_dotenv()
 
 groq_api_key = os.getenv("GROQ_API_KEY")
-model = ChatGroq(model="Gemma2-9b-It",groq_api_key=groq_api_key)
 ##parser for getting the required output after fet response from llms
 parser = StrOutputParser()
 ## create template
@@ -16,25 +21,107 @@ temp = "Translate the following into {language}"
 ##prompt
 prompt = ChatPromptTemplate(
     [("system",temp),("user","{text}")]
-    
+
 )
-## creating a chain for the model
-chain = prompt|model|parser
 
 
+def build_chain(model):
+    """creating a chain for the model"""
+    return prompt|model|parser
 
-app = FastAPI(title="langchain server",
-              version= "1.0",
-              description="A simple application for practising the functioning of langchain"
-              )
-add_routes(
-    app,
-    chain,
-    path = "/chain"
-    
-)
+
+def create_app(model, max_batch_size=None, max_wait_ms=None, cache=None, scheduler=None):
+    """
+    Build the FastAPI app serving the translation chain on /chain.
+
+    Any chat model can be passed in, e.g. a local stub such as
+    langchain_core's FakeListChatModel to exercise the server without Groq.
+    Repeated (language, text) pairs are answered from `cache`, which defaults
+    to an in-process LRU/TTL cache with an optional disk tier at RESPONSE_CACHE_PATH.
+    Model calls go through `scheduler`, which caps in-flight upstream calls and
+    answers 503 when its wait queue is full or a request's deadline passes.
+    Clients can set their own deadline with an X-Request-Timeout header (seconds).
+    """
+    if max_batch_size is None:
+        max_batch_size = int(os.getenv("MICROBATCH_MAX_SIZE", "16"))
+    if max_wait_ms is None:
+        max_wait_ms = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+
+    if cache is None:
+        cache = ResponseCache(
+            maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "86400")),
+            path=os.getenv("RESPONSE_CACHE_PATH") or None,
+        )
+
+    if scheduler is None:
+        scheduler = UpstreamScheduler(
+            max_in_flight=int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", "8")),
+            max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", "64")),
+            deadline=float(os.getenv("UPSTREAM_DEADLINE_S", "10")),
+        )
+
+    ## concurrent /chain/invoke requests are grouped and sent through chain.abatch
+    scheduled_model = ScheduledRunnable(model, scheduler)
+    ## per-stage timings and tokens of every run, exported on /metrics
+    handler = StageCallbackHandler(app="serve", keep_events=False)
+    batcher = MicroBatcher(
+        build_chain(scheduled_model).with_config(callbacks=[handler]),
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+    )
+    ## repeats are answered from the cache and never reach the batcher
+    chain = CachedRunnable(batcher, cache)
+
+    app = FastAPI(title="langchain server",
+                  version= "1.0",
+                  description="A simple application for practising the functioning of langchain"
+                  )
+
+    @app.exception_handler(OverloadedError)
+    async def overloaded(request: Request, exc: OverloadedError):
+        """shed load early instead of letting every request slow down"""
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+    def request_deadline(config, request):
+        """X-Request-Timeout (seconds) becomes an absolute deadline the upstream scheduler honours."""
+        timeout = request.headers.get("x-request-timeout")
+        if timeout:
+            try:
+                deadline = time.time() + float(timeout)
+            except ValueError:
+                return config
+            config = {**config, "configurable": {**config.get("configurable", {}), "deadline": deadline}}
+        return config
+
+    add_routes(
+        app,
+        chain,
+        path = "/chain",
+        per_req_config_modifier=request_deadline,
+    )
+
+    @app.get("/chain/metrics")
+    def chain_metrics():
+        """cache hit/miss counters, micro-batcher and upstream scheduler metrics"""
+        return {"cache": chain.metrics(), "batcher": batcher.metrics(), "upstream": scheduler.metrics()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        """per-stage latency/token counters plus the serving metrics, in Prometheus text format"""
+        return METRICS.render_prometheus(extra={
+            "serve_cache": chain.metrics(),
+            "serve_batcher": batcher.metrics(),
+            "serve_upstream": scheduler.metrics(),
+        })
+
+    return app
+
+
+## retries on 429 are done by the upstream scheduler, with jittered backoff
+model = ChatGroq(model="Gemma2-9b-It",groq_api_key=groq_api_key,max_retries=0)
+app = create_app(model)
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app,host="localhost",port =8000)
-    
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+The apps are plain scripts in folders, so their helper modules are imported by
+path, the same way benchmarks/run_benchmarks.py does; benchmarks/fakes.py
+provides the offline models and tools.
+"""
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+for folder in ("", "RAG-Document", "Langcahin_SQL", "Text Summarization", "search engine with langcahin", "benchmarks"):
+    path = os.path.join(REPO_ROOT, folder)
+    if path not in sys.path:
+        sys.path.append(path)
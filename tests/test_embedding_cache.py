@@ -0,0 +1,67 @@
+"""CachedEmbeddings: only misses reach the backend, LRU eviction, and identical vectors on hits and misses."""
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from embedding_cache import CachedEmbeddings  # noqa: E402
+
+
+class CountingEmbeddings(Embeddings):
+    """Vectors with values float32 can't represent exactly, counting every text sent."""
+
+    def __init__(self, model="counting"):
+        self.model = model
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return [[len(text) / 3, 0.1] for text in texts]
+
+    def embed_query(self, text):
+        self.texts.append(text)
+        return [len(text) / 3, 0.2]
+
+
+def test_only_misses_reach_the_backend(tmp_path):
+    backend = CountingEmbeddings()
+    cached = CachedEmbeddings(backend, path=str(tmp_path / "cache.sqlite"))
+
+    cached.embed_documents(["alpha", "beta"])
+    cached.embed_documents(["alpha", "gamma", "gamma"])
+
+    assert backend.texts == ["alpha", "beta", "gamma"]
+    assert cached.stats()["hits"] == 2 and cached.stats()["misses"] == 3
+
+
+def test_hits_and_misses_return_the_same_values(tmp_path):
+    cached = CachedEmbeddings(CountingEmbeddings(), path=str(tmp_path / "cache.sqlite"))
+
+    assert cached.embed_documents(["alpha"]) == cached.embed_documents(["alpha"])
+    assert cached.embed_query("alpha") == cached.embed_query("alpha")
+
+
+def test_models_and_query_vectors_are_kept_apart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = CachedEmbeddings(CountingEmbeddings("first"), path=path)
+    second_backend = CountingEmbeddings("second")
+    second = CachedEmbeddings(second_backend, path=path)
+
+    first.embed_documents(["alpha"])
+    second.embed_documents(["alpha"])
+    assert second_backend.texts == ["alpha"]
+    assert first.embed_query("alpha") != first.embed_documents(["alpha"])[0]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    backend = CountingEmbeddings()
+    cached = CachedEmbeddings(backend, path=str(tmp_path / "cache.sqlite"), max_entries=2)
+
+    cached.embed_documents(["a"])
+    cached.embed_documents(["b"])
+    cached.embed_documents(["a"])
+    cached.embed_documents(["c"])
+    backend.texts.clear()
+    cached.embed_documents(["a", "b", "c"])
+
+    assert backend.texts == ["b"]
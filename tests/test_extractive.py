@@ -0,0 +1,63 @@
+"""Extractive pre-reduction: deduplication, sentence windows and the token budget."""
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_text_splitters")
+from langchain_core.documents import Document  # noqa: E402
+
+from extractive import MAX_SENTENCE_WORDS, dedupe_lines, extractive_reduce, reduce_documents, split_sentences  # noqa: E402
+from summarizer import estimate_tokens  # noqa: E402
+
+ARTICLE = "\n".join([
+    "Home | About | Contact",
+    "Kalam was an Indian aerospace scientist who led the missile programme.",
+    "He later served as the President of India from 2002 to 2007.",
+    "Subscribe to our newsletter",
+    "As a scientist Kalam worked on the satellite launch vehicle and the missile programme.",
+    "Home | About | Contact",
+    "Cookies help us deliver our services.",
+    "Kalam was known as the People's President of India.",
+])
+
+
+def test_dedupe_lines_ignores_case_and_spacing():
+    text, removed = dedupe_lines("Menu\nBody text\n  menu \nbody   TEXT\n\n\nEnd")
+    assert text.splitlines() == ["Menu", "Body text", "", "", "End"]
+    assert removed == 2
+
+
+def test_split_sentences_windows_unpunctuated_runs():
+    run = " ".join(f"word{i}" for i in range(2 * MAX_SENTENCE_WORDS + 5))
+    sentences = split_sentences(f"First one. Second one!\n{run}")
+    assert sentences[:2] == ["First one.", "Second one!"]
+    assert [len(s.split()) for s in sentences[2:]] == [MAX_SENTENCE_WORDS, MAX_SENTENCE_WORDS, 5]
+
+
+def test_extractive_reduce_stays_within_budget_and_in_order():
+    reduced, stats = extractive_reduce(ARTICLE, ratio=0.6)
+
+    assert stats["duplicate_lines_removed"] == 1
+    assert stats["output_tokens"] <= int(estimate_tokens(dedupe_lines(ARTICLE)[0]) * 0.6)
+    assert 0 < stats["sentences_kept"] < stats["sentences_total"]
+    sentences = split_sentences(dedupe_lines(ARTICLE)[0])
+    positions = [sentences.index(s) for s in split_sentences(reduced)]
+    assert positions == sorted(positions)
+    assert "Kalam" in reduced
+
+
+def test_extractive_reduce_respects_max_tokens():
+    reduced, stats = extractive_reduce(ARTICLE, ratio=1.0, max_tokens=20)
+    assert stats["output_tokens"] <= 20
+
+
+def test_reduce_documents_shares_the_cap_and_keeps_metadata():
+    docs = [
+        Document(page_content=ARTICLE, metadata={"source": "long"}),
+        Document(page_content="Kalam was born in Rameswaram. He studied physics.", metadata={"source": "short"}),
+    ]
+    reduced, stats = reduce_documents(docs, ratio=1.0, max_tokens=40)
+
+    assert [doc.metadata["source"] for doc in reduced] == ["long", "short"][:len(reduced)]
+    assert sum(estimate_tokens(doc.page_content) for doc in reduced) <= 40 + len(reduced)
+    assert stats["input_tokens"] == sum(estimate_tokens(doc.page_content) for doc in docs)
+    assert 0 < stats["reduction"] < 1
@@ -0,0 +1,130 @@
+"""History-aware retrieval: the question rewrite is skipped or cached whenever possible, and speculative retrieval hides it."""
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from history_retriever import (  # noqa: E402
+    RewriteCache,
+    create_question_rewriter,
+    create_speculative_history_aware_retriever,
+    history_key,
+    is_standalone,
+    merge_documents,
+    question_similarity,
+)
+
+HISTORY = [HumanMessage(content="What is the Model Context Protocol?"), AIMessage(content="A protocol for tools.")]
+
+
+class FakePrompt:
+    """Stands in for the rewrite prompt: passes the inputs on and counts LLM calls via the model below."""
+
+    def __or__(self, other):
+        return RunnableLambda(lambda inputs: inputs) | other
+
+
+def counting_llm(calls, reply="What are the security risks of the Model Context Protocol?"):
+    def llm(inputs):
+        calls.append(inputs)
+        return reply
+    return RunnableLambda(llm)
+
+
+@pytest.mark.parametrize("question, standalone", [
+    ("What are the security risks of the Model Context Protocol?", True),
+    ("What about its security?", False),
+    ("And the latter?", False),
+    ("Tell me more", False),
+    ("How do transformers use attention?", True),
+])
+def test_is_standalone(question, standalone):
+    assert is_standalone(question) is standalone
+
+
+def test_rewrite_cache_is_lru():
+    cache = RewriteCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_history_key_depends_on_type_and_content():
+    assert history_key(HISTORY) == history_key(list(HISTORY))
+    assert history_key(HISTORY) != history_key([HumanMessage(content=m.content) for m in HISTORY])
+
+
+def test_rewrite_is_skipped_cached_or_called():
+    calls = []
+    rewrite = create_question_rewriter(counting_llm(calls), FakePrompt())
+
+    assert rewrite({"input": "What about its security?", "chat_history": []}) == (
+        "What about its security?", "no_history")
+    standalone = "How do transformers use attention?"
+    assert rewrite({"input": standalone, "chat_history": HISTORY}) == (standalone, "standalone")
+    assert not calls
+
+    follow_up = {"input": "What about its security?", "chat_history": HISTORY}
+    rewritten, how = rewrite(follow_up)
+    assert how == "llm" and rewritten.startswith("What are the security risks")
+    assert rewrite(follow_up) == (rewritten, "cached")
+    assert len(calls) == 1
+
+
+def doc(text, page=0):
+    return Document(page_content=text, metadata={"source": "paper.pdf", "page": page})
+
+
+def test_question_similarity():
+    assert question_similarity("What is MCP?", "what is mcp") == 1.0
+    assert question_similarity("What is MCP?", "Explain attention") == 0.0
+
+
+def test_merge_documents_interleaves_without_duplicates():
+    a, b, c, d = doc("a"), doc("b"), doc("c"), doc("d")
+    assert merge_documents([a, b, c], [b, d]) == [a, b, d]
+    assert merge_documents([a], [doc("a"), b]) == [a, b]
+    assert merge_documents([], [c]) == [c]
+
+
+def recording_retriever(queries, configs):
+    def retrieve(query, config):
+        queries.append(query)
+        configs.append(config)
+        return [doc(query)]
+    return RunnableLambda(retrieve)
+
+
+def test_speculative_results_are_used_when_the_rewrite_is_close():
+    calls, queries, configs, timings = [], [], [], []
+    retriever = create_speculative_history_aware_retriever(
+        counting_llm(calls, reply="What is the Model Context Protocol security?"), recording_retriever(queries, configs),
+        FakePrompt(), min_similarity=0.0, timings=timings,
+    )
+
+    docs = retriever.invoke({"input": "What about the Model Context Protocol security?", "chat_history": HISTORY})
+
+    assert queries == ["What about the Model Context Protocol security?"]
+    assert [d.page_content for d in docs] == queries
+    assert timings[0]["path"] == "speculative" and timings[0]["rewrite"] == "llm"
+
+
+def test_a_distant_rewrite_is_retrieved_again_and_merged():
+    calls, queries, configs, timings = [], [], [], []
+    retriever = create_speculative_history_aware_retriever(
+        counting_llm(calls), recording_retriever(queries, configs), FakePrompt(), timings=timings,
+    )
+
+    docs = retriever.invoke({"input": "What about it?", "chat_history": HISTORY}, config={"tags": ["chat"]})
+
+    assert sorted(queries) == sorted(["What about it?", "What are the security risks of the Model Context Protocol?"])
+    ## the merge keeps the retriever's k, rewritten results first
+    assert [d.page_content for d in docs] == ["What are the security risks of the Model Context Protocol?"]
+    assert timings[0]["path"] == "requery"
+    assert all("chat" in (config or {}).get("tags", []) for config in configs)
@@ -0,0 +1,89 @@
+"""Incremental FAISS sync: only changed PDFs are embedded, and the manifest matches the saved index."""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+fakes = pytest.importorskip("fakes")
+from langchain_core.documents import Document  # noqa: E402
+
+from index_store import MANIFEST_FILE, sync_index  # noqa: E402
+
+
+def load_chunks(paths):
+    """Stand-in for PDF parsing: the file's text is its only chunk."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            yield path, [Document(page_content=f.read(), metadata={"source": path})]
+
+
+def write(pdf_dir, name, text):
+    with open(os.path.join(pdf_dir, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def sync(pdf_dir, index_dir, embeddings):
+    return sync_index(str(pdf_dir), str(index_dir), embeddings, text_splitter=None, load_chunks=load_chunks)
+
+
+def manifest_ids(index_dir):
+    with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    return {chunk_id for entry in files.values() for chunk_id in entry["ids"]}
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    pdf_dir, index_dir = tmp_path / "pdfs", tmp_path / "index"
+    pdf_dir.mkdir()
+    write(pdf_dir, "a.pdf", "model context protocol servers")
+    write(pdf_dir, "b.pdf", "tool poisoning attacks")
+    return pdf_dir, index_dir
+
+
+def test_only_new_changed_and_deleted_files_are_touched(dirs):
+    pdf_dir, index_dir = dirs
+    embeddings = fakes.FakeEmbeddings(size=32)
+    vectors, stats = sync(pdf_dir, index_dir, embeddings)
+    assert stats["embedded"] == 2 and not stats["rebuilt"]
+
+    _, stats = sync(pdf_dir, index_dir, embeddings)
+    assert stats == {"embedded": 0, "dropped": 0, "unchanged": 2, "skipped": 0, "rebuilt": False}
+
+    write(pdf_dir, "b.pdf", "tool poisoning attacks, revised")
+    write(pdf_dir, "c.pdf", "retrieval augmented generation")
+    os.remove(os.path.join(pdf_dir, "a.pdf"))
+    vectors, stats = sync(pdf_dir, index_dir, embeddings)
+    assert stats["embedded"] == 2 and stats["dropped"] == 1 and stats["unchanged"] == 0
+
+    saved = set(vectors.index_to_docstore_id.values())
+    assert saved == manifest_ids(index_dir)
+    assert {chunk_id.split(":")[0] for chunk_id in saved} == {"b.pdf", "c.pdf"}
+
+
+def test_chunks_missing_from_the_manifest_are_dropped(dirs):
+    pdf_dir, index_dir = dirs
+    embeddings = fakes.FakeEmbeddings(size=32)
+    sync(pdf_dir, index_dir, embeddings)
+
+    ## a crash between saving the index and the manifest leaves the old manifest behind
+    with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    del manifest["files"]["b.pdf"]
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    vectors, stats = sync(pdf_dir, index_dir, embeddings)
+    assert stats["embedded"] == 1
+    assert set(vectors.index_to_docstore_id.values()) == manifest_ids(index_dir)
+
+
+def test_a_different_embedding_model_rebuilds_the_index(dirs):
+    pdf_dir, index_dir = dirs
+    sync(pdf_dir, index_dir, fakes.FakeEmbeddings(size=32, model="old-model"))
+
+    vectors, stats = sync(pdf_dir, index_dir, fakes.FakeEmbeddings(size=64, model="new-model"))
+    assert stats["rebuilt"] and stats["embedded"] == 2
+    assert vectors.index.d == 64
@@ -0,0 +1,78 @@
+"""MicroBatcher: concurrent calls share one abatch, each with its own config and its own result or error."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.runnables import Runnable  # noqa: E402
+
+from microbatch import MicroBatcher  # noqa: E402
+
+
+class RecordingRunnable(Runnable):
+    """Upper-cases its input, fails on "boom", and records every abatch call."""
+
+    def __init__(self):
+        self.batches = []
+
+    def invoke(self, input, config=None, **kwargs):
+        if input == "boom":
+            raise ValueError("boom")
+        return input.upper()
+
+    async def abatch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        self.batches.append((list(inputs), config))
+        results = []
+        for input in inputs:
+            try:
+                results.append(self.invoke(input))
+            except ValueError as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+def run_concurrently(batcher, inputs, configs=None):
+    async def main():
+        configs_ = configs or [None] * len(inputs)
+        return await asyncio.gather(
+            *(batcher.ainvoke(input, config) for input, config in zip(inputs, configs_)), return_exceptions=True
+        )
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_are_batched():
+    inner = RecordingRunnable()
+    batcher = MicroBatcher(inner, max_batch_size=16, max_wait_ms=20)
+
+    assert run_concurrently(batcher, ["a", "b", "c"]) == ["A", "B", "C"]
+    assert len(inner.batches) == 1
+    assert batcher.metrics()["max_batch_size"] == 3
+
+
+def test_batches_are_capped_at_max_batch_size():
+    inner = RecordingRunnable()
+    batcher = MicroBatcher(inner, max_batch_size=2, max_wait_ms=20)
+
+    assert run_concurrently(batcher, list("abcde")) == list("ABCDE")
+    assert [len(inputs) for inputs, _ in inner.batches] == [2, 2, 1]
+
+
+def test_each_input_keeps_its_config():
+    inner = RecordingRunnable()
+    batcher = MicroBatcher(inner, max_wait_ms=20)
+    configs = [{"tags": ["first"]}, {"tags": ["second"]}]
+
+    run_concurrently(batcher, ["a", "b"], configs)
+    (_, batch_configs), = inner.batches
+    assert [config["tags"] for config in batch_configs] == [["first"], ["second"]]
+
+
+def test_an_error_only_fails_its_own_caller():
+    batcher = MicroBatcher(RecordingRunnable(), max_wait_ms=20)
+
+    ok, failed = run_concurrently(batcher, ["a", "boom"])
+    assert ok == "A"
+    assert isinstance(failed, ValueError)
+    assert not batcher._tasks
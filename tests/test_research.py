@@ -0,0 +1,34 @@
+"""Per-tool timeouts must also bound blocking (sync-only) tools."""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+fakes = pytest.importorskip("fakes")
+research = pytest.importorskip("research")
+
+
+def test_sync_tool_timeout_does_not_block_the_answer():
+    tools = [fakes.fake_tool("search", sync=True), fakes.fake_tool("arxiv", latency=3.0, sync=True)]
+    researcher = research.ParallelResearcher(fakes.FakeChatModel(), tools, timeouts={"arxiv": 0.2})
+
+    start = time.perf_counter()
+    _, findings = researcher.invoke("What is the Model Context Protocol?")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.0
+    by_tool = {finding["tool"]: finding for finding in findings}
+    assert by_tool["search"]["ok"]
+    assert not by_tool["arxiv"]["ok"]
+    assert "timed out" in by_tool["arxiv"]["error"]
+
+
+def test_sync_tools_run_concurrently():
+    tools = [fakes.fake_tool(name, latency=0.3, sync=True) for name in ("search", "wikipedia", "arxiv")]
+
+    start = time.perf_counter()
+    findings = asyncio.run(research.gather_findings("mcp", tools))
+
+    assert all(finding["ok"] for finding in findings)
+    assert time.perf_counter() - start < 0.8
@@ -0,0 +1,103 @@
+"""ResponseCache LRU/TTL and disk tier, and CachedRunnable's in-flight call sharing."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.runnables import Runnable  # noqa: E402
+
+from response_cache import CachedRunnable, ResponseCache  # noqa: E402
+
+
+class SlowUpper(Runnable):
+    """Upper-cases its input after `delay` seconds, counting calls."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, input, config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return input.upper()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return input.upper()
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.put("a", 1)
+    time.sleep(0.1)
+    assert cache.get("a") == (False, None)
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(ttl=60, path=path).put("a", {"text": "hola"})
+
+    cache = ResponseCache(ttl=60, path=path)
+    assert cache.get("a") == (True, {"text": "hola"})
+    assert cache.metrics()["disk_hits"] == 1
+
+
+def test_repeats_are_answered_from_the_cache():
+    inner = SlowUpper()
+    cached = CachedRunnable(inner, ResponseCache())
+
+    assert cached.invoke("hi") == "HI"
+    assert cached.invoke("hi") == "HI"
+    assert inner.calls == 1
+
+
+def test_concurrent_identical_sync_calls_share_one_upstream_call():
+    inner = SlowUpper(delay=0.2)
+    cached = CachedRunnable(inner, ResponseCache())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cached.invoke("hi"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["HI"] * 5
+    assert inner.calls == 1
+    assert cached.metrics()["shared_in_flight"] == 4
+
+
+def test_concurrent_identical_async_calls_share_one_upstream_call():
+    inner = SlowUpper(delay=0.1)
+    cached = CachedRunnable(inner, ResponseCache())
+
+    async def main():
+        return await asyncio.gather(*(cached.ainvoke("hi") for _ in range(5)))
+
+    assert asyncio.run(main()) == ["HI"] * 5
+    assert inner.calls == 1
+
+
+def test_batch_only_sends_unique_misses():
+    inner = SlowUpper()
+    cached = CachedRunnable(inner, ResponseCache())
+    cached.invoke("a")
+
+    assert cached.batch(["a", "b", "b", "c"]) == ["A", "B", "B", "C"]
+    assert inner.calls == 3
@@ -0,0 +1,137 @@
+"""Result guardrails: LIMIT handling, streamed truncation, bounded counting and read-only paging."""
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from result_guard import (  # noqa: E402
+    QueryResult,
+    count_rows,
+    fetch_page,
+    guarded_query,
+    inject_limit,
+    is_read_only,
+    result_bytes_budget,
+    split_limit,
+    strip_limit,
+    summarize_result,
+    with_window,
+)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM STUDENTS", "SELECT * FROM STUDENTS LIMIT 10"),
+    ("SELECT * FROM STUDENTS;", "SELECT * FROM STUDENTS LIMIT 10"),
+    ("SELECT * FROM STUDENTS LIMIT 5", "SELECT * FROM STUDENTS LIMIT 5"),
+    ("SELECT * FROM STUDENTS limit 500 ;", "SELECT * FROM STUDENTS limit 10"),
+    ("SELECT * FROM STUDENTS LIMIT 500 OFFSET 20", "SELECT * FROM STUDENTS LIMIT 10 OFFSET 20"),
+    ("SELECT * FROM STUDENTS LIMIT 20, 500", "SELECT * FROM STUDENTS LIMIT 20, 10"),
+    ("SELECT * FROM (SELECT * FROM STUDENTS LIMIT 500) s", "SELECT * FROM (SELECT * FROM STUDENTS LIMIT 500) s LIMIT 10"),
+])
+def test_inject_limit(sql, expected):
+    assert inject_limit(sql, 10) == expected
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM STUDENTS", ("SELECT * FROM STUDENTS", None, 0)),
+    ("SELECT * FROM STUDENTS LIMIT 5;", ("SELECT * FROM STUDENTS", 5, 0)),
+    ("SELECT * FROM STUDENTS LIMIT 5 OFFSET 15", ("SELECT * FROM STUDENTS", 5, 15)),
+    ("SELECT * FROM STUDENTS LIMIT 15, 5", ("SELECT * FROM STUDENTS", 5, 15)),
+])
+def test_split_and_strip_limit(sql, expected):
+    assert split_limit(sql) == expected
+    assert strip_limit(sql) == expected[0]
+
+
+@pytest.mark.parametrize("sql, limit, offset, expected", [
+    ("SELECT NAME FROM STUDENTS", 50, 100, "SELECT NAME FROM STUDENTS LIMIT 50 OFFSET 100"),
+    ("SELECT NAME FROM STUDENTS LIMIT 120", 50, 100, "SELECT NAME FROM STUDENTS LIMIT 20 OFFSET 100"),
+    ("SELECT NAME FROM STUDENTS LIMIT 120", 50, 150, "SELECT NAME FROM STUDENTS LIMIT 0 OFFSET 150"),
+    ("SELECT NAME FROM STUDENTS LIMIT 10 OFFSET 5", 3, 0, "SELECT NAME FROM STUDENTS LIMIT 3 OFFSET 5"),
+    ("SELECT NAME FROM STUDENTS LIMIT 10", 10001, 0, "SELECT NAME FROM STUDENTS LIMIT 10"),
+])
+def test_with_window_stays_inside_the_statement_limit(sql, limit, offset, expected):
+    assert with_window(sql, limit, offset) == expected
+
+
+@pytest.mark.parametrize("sql, read_only", [
+    ("SELECT * FROM STUDENTS", True),
+    ("WITH top AS (SELECT * FROM STUDENTS) SELECT * FROM top;", True),
+    ("DELETE FROM STUDENTS", False),
+    ("SELECT * FROM STUDENTS; DROP TABLE STUDENTS", False),
+    ("WITH gone AS (DELETE FROM STUDENTS RETURNING *) SELECT * FROM gone", False),
+    ("PRAGMA table_info(STUDENTS)", False),
+])
+def test_is_read_only(sql, read_only):
+    assert is_read_only(sql) is read_only
+
+
+def test_result_bytes_budget():
+    assert result_bytes_budget(8192) == 8192
+    assert result_bytes_budget(8192, share=0.5) == 16384
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'students.db'}")
+    with engine.connect() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE STUDENTS (NAME TEXT, MARKS INT)"))
+        for i in range(300):
+            conn.execute(sqlalchemy.text("INSERT INTO STUDENTS VALUES (:name, :marks)"), {"name": f"student {i}", "marks": i})
+        if hasattr(conn, "commit"):
+            conn.commit()
+    return engine
+
+
+def test_guarded_query_stops_at_the_row_cap(engine):
+    result = guarded_query(engine, "SELECT * FROM STUDENTS", max_rows=50)
+    assert result.columns == ["NAME", "MARKS"]
+    assert len(result.rows) == 50 and result.truncated
+
+    exact = guarded_query(engine, "SELECT * FROM STUDENTS LIMIT 50", max_rows=50)
+    assert len(exact.rows) == 50 and not exact.truncated
+
+
+def test_guarded_query_stops_at_the_byte_cap(engine):
+    result = guarded_query(engine, "SELECT * FROM STUDENTS", max_rows=300, max_bytes=200)
+    assert result.truncated and 0 < len(result.rows) < 300
+    assert result.size_bytes <= 200
+
+
+def test_an_oversized_first_row_is_shortened(engine):
+    result = guarded_query(engine, "SELECT printf('%.5000c', 'x') AS BLOB, 1 AS ONE", max_bytes=100)
+    assert result.truncated and len(result.rows) == 1
+    assert len(result.rows[0][0]) < 100 and result.rows[0][1] == 1
+
+
+def test_count_rows_is_bounded_and_keeps_the_statement_limit(engine):
+    assert count_rows(engine, "SELECT * FROM STUDENTS") == 300
+    assert count_rows(engine, "SELECT * FROM STUDENTS", limit=100) == 101
+    assert count_rows(engine, "SELECT * FROM STUDENTS LIMIT 40") == 40
+    assert count_rows(engine, "SELECT * FROM STUDENTS LIMIT 40 OFFSET 280") == 20
+
+
+def test_fetch_page_pages_within_the_statement_limit(engine):
+    sql = "SELECT MARKS FROM STUDENTS ORDER BY MARKS LIMIT 120"
+    columns, rows = fetch_page(engine, sql, page=1, page_size=50)
+    assert columns == ["MARKS"]
+    assert rows == [(i,) for i in range(50, 100)]
+    assert fetch_page(engine, sql, page=2, page_size=50)[1] == [(i,) for i in range(100, 120)]
+    assert fetch_page(engine, sql, page=3, page_size=50)[1] == []
+
+
+def test_counting_and_paging_refuse_writes(engine):
+    with pytest.raises(ValueError):
+        count_rows(engine, "DELETE FROM STUDENTS")
+    with pytest.raises(ValueError):
+        fetch_page(engine, "SELECT 1; DELETE FROM STUDENTS", page=0)
+    assert count_rows(engine, "SELECT * FROM STUDENTS") == 300
+
+
+def test_summarize_result_truncates_the_preview():
+    rows = [("x" * 1000, i) for i in range(20)]
+    summary = summarize_result(QueryResult(["TEXT", "N"], rows, True, 0), total_rows=20001, max_bytes=600)
+
+    assert "more than 10000 rows" in summary
+    assert "First 2 rows:" in summary
+    assert "x" * 101 not in summary
+    assert "N: numeric, min 0, max 19" in summary
@@ -0,0 +1,152 @@
+"""UpstreamScheduler: 429 retries, deadline shedding and one in-flight cap for sync and async callers."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from scheduler import OverloadedError, ScheduledRunnable, UpstreamScheduler, is_rate_limited  # noqa: E402
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class RateLimitError(Exception):
+    """Named like groq.RateLimitError / openai.RateLimitError."""
+
+
+def flaky(failures, error=RateLimited):
+    calls = []
+
+    def call():
+        calls.append(time.perf_counter())
+        if len(calls) <= failures:
+            raise error("slow down")
+        return "ok"
+
+    return call, calls
+
+
+def test_rate_limits_are_recognized():
+    assert is_rate_limited(RateLimited())
+    assert is_rate_limited(RateLimitError())
+    assert not is_rate_limited(ValueError())
+
+
+def test_429_is_retried_with_backoff():
+    scheduler = UpstreamScheduler(max_retries=3, backoff_base=0.001, backoff_max=0.01)
+    call, calls = flaky(2)
+
+    assert scheduler.run(call) == "ok"
+    assert len(calls) == 3
+    assert scheduler.metrics()["retries"] == 2
+
+
+def test_429_gives_up_after_max_retries():
+    scheduler = UpstreamScheduler(max_retries=2, backoff_base=0.001, backoff_max=0.01)
+    call, calls = flaky(10)
+
+    with pytest.raises(RateLimited):
+        scheduler.run(call)
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried():
+    scheduler = UpstreamScheduler(max_retries=3, backoff_base=0.001)
+    call, calls = flaky(1, error=ValueError)
+
+    with pytest.raises(ValueError):
+        scheduler.run(call)
+    assert len(calls) == 1
+
+
+def hold_slot(scheduler, seconds):
+    """Occupy one slot from another thread; returns once the slot is taken."""
+    taken = threading.Event()
+
+    def call():
+        taken.set()
+        time.sleep(seconds)
+
+    thread = threading.Thread(target=scheduler.run, args=(call,))
+    thread.start()
+    taken.wait()
+    return thread
+
+
+def test_deadline_sheds_a_waiting_request():
+    scheduler = UpstreamScheduler(max_in_flight=1, deadline=5.0)
+    holder = hold_slot(scheduler, 0.5)
+
+    start = time.perf_counter()
+    with pytest.raises(OverloadedError):
+        scheduler.run(lambda: "late", deadline=0.1)
+    assert time.perf_counter() - start < 0.4
+    assert scheduler.metrics()["timed_out"] == 1
+    holder.join()
+
+
+def test_passed_deadline_never_calls_upstream():
+    scheduler = UpstreamScheduler()
+    called = []
+
+    with pytest.raises(OverloadedError):
+        scheduler.run(lambda: called.append(1), deadline=-1.0)
+    assert not called
+
+
+def test_full_queue_is_rejected_immediately():
+    scheduler = UpstreamScheduler(max_in_flight=1, max_queue=0)
+    holder = hold_slot(scheduler, 0.3)
+
+    with pytest.raises(OverloadedError):
+        scheduler.run(lambda: "queued")
+    assert scheduler.metrics()["rejected"] == 1
+    holder.join()
+
+
+def test_sync_and_async_callers_share_the_cap():
+    scheduler = UpstreamScheduler(max_in_flight=2, max_queue=100)
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def enter():
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+
+    def leave():
+        with lock:
+            state["now"] -= 1
+
+    def sync_call():
+        enter()
+        time.sleep(0.02)
+        leave()
+
+    async def async_call():
+        enter()
+        await asyncio.sleep(0.02)
+        leave()
+
+    async def async_callers():
+        await asyncio.gather(*(scheduler.arun(async_call) for _ in range(6)))
+
+    threads = [threading.Thread(target=scheduler.run, args=(sync_call,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(async_callers())
+    for thread in threads:
+        thread.join()
+
+    assert state["peak"] <= 2
+    assert scheduler.metrics()["admitted"] == 12
+
+
+def test_deadline_comes_from_the_config():
+    assert ScheduledRunnable.remaining(None) is None
+    assert ScheduledRunnable.remaining({"configurable": {}}) is None
+    assert 9 < ScheduledRunnable.remaining({"configurable": {"deadline": time.time() + 10}}) <= 10
@@ -0,0 +1,80 @@
+"""SQLiteSessionStore: budgeted history with a rolling summary, persisted across restarts and expired on disk."""
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: E402
+
+from session_store import SQLiteSessionStore  # noqa: E402
+
+
+def turn(i):
+    return [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+
+
+def joining_summarizer(summary, messages):
+    return " ".join(filter(None, [summary, *(message.content for message in messages)]))
+
+
+def test_old_turns_are_folded_into_the_summary(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.sqlite"), max_turns=2, summarizer=joining_summarizer)
+    history = store.get("s")
+    for i in range(4):
+        history.add_messages(turn(i))
+
+    messages = history.messages
+    assert isinstance(messages[0], SystemMessage)
+    assert "question 0" in messages[0].content and "answer 1" in messages[0].content
+    assert [message.content for message in messages[1:]] == ["question 2", "answer 2", "question 3", "answer 3"]
+
+
+def test_the_latest_turn_is_kept_even_over_the_token_budget(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.sqlite"), token_budget=5)
+    history = store.get("s")
+    history.add_messages(turn(0))
+    history.add_messages([HumanMessage(content="a long question " * 20), AIMessage(content="a long answer " * 20)])
+
+    assert len(history.messages) == 2
+    assert history.messages[0].content.startswith("a long question")
+
+
+def test_sessions_survive_a_restart(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    SQLiteSessionStore(path=path).get("s").add_messages(turn(0))
+
+    history = SQLiteSessionStore(path=path).get("s")
+    assert [message.content for message in history.messages] == ["question 0", "answer 0"]
+
+
+def test_a_per_session_summarizer_overrides_the_store_one(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.sqlite"), max_turns=1, summarizer=lambda s, m: "store")
+    history = store.get("s", summarizer=lambda s, m: "session")
+    history.add_messages(turn(0))
+    history.add_messages(turn(1))
+
+    assert history.summary == "session"
+
+
+def test_idle_sessions_expire_on_disk(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SQLiteSessionStore(path=path, max_age=0.05)
+    store.get("old").add_messages(turn(0))
+    time.sleep(0.1)
+    store.get("new").add_messages(turn(1))
+
+    (count,) = store._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+    assert count == 1
+    assert SQLiteSessionStore(path=path, max_age=0.05).get("old").messages == []
+
+
+def test_evicted_sessions_are_reloaded_from_disk(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.sqlite"), max_sessions=1)
+    first = store.get("a")
+    first.add_messages(turn(0))
+    store.get("b")
+
+    assert "a" not in store._sessions
+    reloaded = store.get("a")
+    assert reloaded is not first
+    assert [message.content for message in reloaded.messages] == ["question 0", "answer 0"]
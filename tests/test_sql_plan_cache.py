@@ -0,0 +1,59 @@
+"""Plan cache keys: one cache file shared by several databases must never mix their plans."""
+import pytest
+
+pytest.importorskip("numpy")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+pytest.importorskip("langchain")
+
+from sql_plan_cache import SQLPlanCache, content_terms, normalize_question, plan_scope  # noqa: E402
+
+
+def make_engine(path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE students (name TEXT, section TEXT)"))
+    return engine
+
+
+def test_same_schema_version_on_two_databases_gets_two_scopes(tmp_path):
+    first = make_engine(tmp_path / "first.db")
+    second = make_engine(tmp_path / "second.db")
+
+    ## same DDL history, so PRAGMA schema_version alone would collide
+    assert plan_scope(first).split(":")[-1] == plan_scope(second).split(":")[-1]
+    assert plan_scope(first) != plan_scope(second)
+
+
+def test_scope_changes_with_the_schema(tmp_path):
+    engine = make_engine(tmp_path / "students.db")
+    before = plan_scope(engine)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("ALTER TABLE students ADD COLUMN age INTEGER"))
+    assert plan_scope(engine) != before
+
+
+def test_lookup_is_isolated_per_scope(tmp_path):
+    cache = SQLPlanCache(path=str(tmp_path / "plans.sqlite"))
+    cache.store("db-a:1", "How many students are there?", "SELECT COUNT(*) FROM students")
+
+    assert cache.lookup("db-a:1", "how many students are there") == ("SELECT COUNT(*) FROM students", "exact")
+    assert cache.lookup("db-b:1", "How many students are there?") == (None, None)
+    assert cache.lookup("db-a:2", "How many students are there?") == (None, None)
+
+
+def test_literal_values_keep_questions_apart():
+    section_a = content_terms(normalize_question("Show me the students in section A"))
+    section_b = content_terms(normalize_question("Show me the students in section B"))
+    reworded = content_terms(normalize_question("List all students in section A"))
+
+    assert section_a != section_b
+    assert section_a == reworded
+
+
+def test_semantic_hit_requires_the_same_content_terms(tmp_path):
+    fakes = pytest.importorskip("fakes")
+    cache = SQLPlanCache(path=str(tmp_path / "plans.sqlite"), embeddings=fakes.FakeEmbeddings(), min_similarity=0.5)
+    cache.store("db:1", "Show me the students in section A", "SELECT * FROM students WHERE section = 'A'")
+
+    assert cache.lookup("db:1", "List all students in section A")[1] == "semantic"
+    assert cache.lookup("db:1", "Show me the students in section B") == (None, None)
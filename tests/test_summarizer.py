@@ -0,0 +1,75 @@
+"""SummarizationEngine budgeting: strategy choice, truncation and fitting the final call."""
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_text_splitters")
+fakes = pytest.importorskip("fakes")
+from langchain_core.documents import Document  # noqa: E402
+
+from summarizer import SummarizationEngine, estimate_tokens, prompt_template  # noqa: E402
+
+
+def engine_with_budget(input_budget, **kwargs):
+    output_tokens = 100
+    context_tokens = input_budget + output_tokens + estimate_tokens(prompt_template)
+    engine = SummarizationEngine(
+        fakes.FakeChatModel(responses=["A short summary."]), context_tokens=context_tokens, output_tokens=output_tokens,
+        **kwargs,
+    )
+    assert engine.input_budget == input_budget
+    return engine
+
+
+def test_plan_picks_stuff_only_when_the_content_fits():
+    engine = engine_with_budget(100)
+    assert engine.plan([Document(page_content="x" * 200)]) == "stuff"
+    assert engine.plan([Document(page_content="x" * 200), Document(page_content="x" * 300)]) == "map_reduce"
+
+
+def test_truncate_keeps_the_longest_prefix_within_budget():
+    engine = engine_with_budget(100)
+    text = "abcdefghij" * 10
+    assert engine._truncate(text, 100) == text
+    truncated = engine._truncate(text, 10)
+    assert text.startswith(truncated)
+    assert estimate_tokens(truncated) <= 10 < estimate_tokens(text[:len(truncated) + 1])
+
+
+def test_fit_final_joins_summaries_that_fit():
+    engine = engine_with_budget(100)
+    report = {}
+    assert engine._fit_final(["first", "second"], report) == "first\n\nsecond"
+    assert "truncated" not in report
+
+
+def test_fit_final_trims_each_summary_to_an_equal_share():
+    engine = engine_with_budget(100)
+    summaries = ["a" * 1000, "b" * 20, "c" * 1000]
+    report = {}
+
+    text = engine._fit_final(summaries, report)
+
+    assert estimate_tokens(text) <= 100
+    assert report["truncated"] == 2
+    parts = text.split("\n\n")
+    assert parts[1] == "b" * 20
+    assert parts[0] and set(parts[0]) == {"a"} and parts[2] and set(parts[2]) == {"c"}
+
+
+def test_fit_final_raises_when_nothing_fits():
+    engine = engine_with_budget(3)
+    with pytest.raises(ValueError, match="token input budget"):
+        engine._fit_final(["x" * 100] * 5, {})
+
+
+def test_map_reduce_ends_with_one_final_call():
+    engine = engine_with_budget(200, chunk_tokens=50, chunk_overlap=0)
+    docs = [Document(page_content="Sentence about the topic. " * 200)]
+
+    summary, report = engine.summarize(docs)
+
+    assert summary == "A short summary."
+    assert report["mode"] == "map_reduce" and report["chunks"] > 1
+    steps = [timing["step"] for timing in report["timings"]]
+    assert sum(step.startswith("map") for step in steps) == report["chunks"]
+    assert steps[-1] == "final"